@@ -79,3 +79,93 @@ def list_users():
                 'message': '获取用户列表失败'
             }
         }), 500
+
+
+@admin_bp.route('/metrics', methods=['GET'])
+@admin_required
+def get_metrics():
+    """
+    Get runtime metrics of the current worker process
+    
+    GET /api/admin/metrics
+    Headers: Authorization: Bearer <admin_token>
+    """
+    try:
+        from services.http_client import http_client
+        from services.background_executor import executor_stats
+        from services.access_counter import access_counter
+        import services.video_preheat_service  # noqa: F401 - registers the preheat executor
+        
+        return jsonify({
+            'success': True,
+            'metrics': {
+                'http_pool': http_client.stats(),
+                'executors': executor_stats(),
+                'access_counter': access_counter.stats()
+            }
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f'Error getting metrics: {str(e)}')
+        return jsonify({
+            'error': {
+                'code': 'INTERNAL_ERROR',
+                'message': '获取运行指标失败'
+            }
+        }), 500
+
+
+@admin_bp.route('/preheat-jobs', methods=['GET'])
+@admin_required
+def list_preheat_jobs():
+    """
+    Get transcode preheat queue state and jobs with pagination
+    
+    GET /api/admin/preheat-jobs?status=failed&page=1&per_page=50
+    Headers: Authorization: Bearer <admin_token>
+    """
+    try:
+        from files.preheat_models import PreheatJob
+        from services.preheat_job_service import preheat_job_service
+        
+        status = request.args.get('status')
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 50, type=int)
+        
+        if page < 1:
+            page = 1
+        if per_page < 1 or per_page > 100:
+            per_page = 50
+        
+        query = PreheatJob.query
+        if status:
+            query = query.filter(PreheatJob.status == status)
+        
+        pagination = query.order_by(PreheatJob.updated_at.desc()).paginate(
+            page=page,
+            per_page=per_page,
+            error_out=False
+        )
+        
+        return jsonify({
+            'success': True,
+            'stats': preheat_job_service.queue_stats(),
+            'jobs': [job.to_dict() for job in pagination.items],
+            'pagination': {
+                'page': pagination.page,
+                'per_page': pagination.per_page,
+                'total': pagination.total,
+                'pages': pagination.pages,
+                'has_next': pagination.has_next,
+                'has_prev': pagination.has_prev
+            }
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f'Error listing preheat jobs: {str(e)}')
+        return jsonify({
+            'error': {
+                'code': 'INTERNAL_ERROR',
+                'message': '获取预热队列失败'
+            }
+        }), 500
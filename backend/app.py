@@ -142,7 +142,13 @@ def create_app(config_name=None):
         from auth.models import User
         from files.models import File, TagPreset
         from files.request_models import FileRequest
-        from logs.models import FileLog
+        from files.preheat_models import PreheatJob
+        from files.upload_models import UploadSession
+        from files.naming_models import FileNameSequence
+        from files.move_models import FileMove
+        from files.job_models import Job, JobItem
+        from files.cache_models import CacheVersion
+        from logs.models import FileLog, FileAccessStat
     
     # Register error handlers
     register_error_handlers(app)
@@ -155,6 +161,7 @@ def create_app(config_name=None):
     from admin.routes import admin_bp
     from tags.routes import tags_bp
     from file_requests.routes import requests_bp
+    from jobs.routes import jobs_bp
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(files_bp, url_prefix='/api/files')
     app.register_blueprint(logs_bp, url_prefix='/api/logs')
@@ -162,6 +169,7 @@ def create_app(config_name=None):
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
     app.register_blueprint(tags_bp, url_prefix='/api/tags')
     app.register_blueprint(requests_bp, url_prefix='/api/requests')
+    app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
     
     # Health check endpoint
     @app.route('/')
@@ -182,6 +190,24 @@ def create_app(config_name=None):
     from scripts.preheat_videos import register_commands
     register_commands(app)
     
+    from scripts.backfill_thumbhash import register_commands as register_thumbhash_commands
+    register_thumbhash_commands(app)
+    
+    from scripts.cleanup_multipart import register_commands as register_multipart_commands
+    register_multipart_commands(app)
+    
+    from scripts.backfill_content_hash import register_commands as register_content_hash_commands
+    register_content_hash_commands(app)
+    
+    from scripts.cleanup_moves import register_commands as register_move_commands
+    register_move_commands(app)
+    
+    from scripts.job_worker import register_commands as register_job_commands
+    register_job_commands(app)
+    
+    from scripts.verify_tag_counts import register_commands as register_tag_count_commands
+    register_tag_count_commands(app)
+    
     return app
 
 
@@ -10,6 +10,7 @@ from flask_jwt_extended import (
     jwt_required,
     get_jwt_identity,
 )
+from services.http_client import http_client
 
 # Create blueprint
 auth_bp = Blueprint('auth', __name__)
@@ -47,7 +48,7 @@ def sso_login():
         sso_api_url = current_app.config.get('SSO_AUTH_API_URL', 'https://auth-api.funk-and.love')
         
         try:
-            verify_response = requests.post(
+            verify_response = http_client.post(
                 f'{sso_api_url}/api/auth/verify-token',
                 json={'token': sso_token},
                 timeout=10
@@ -32,6 +32,7 @@ class Config:
     AWS_SECRET_ACCESS_KEY = os.environ.get('AWS_SECRET_ACCESS_KEY')
     S3_BUCKET = os.environ.get('S3_BUCKET', 'funkandlove-cloud')
     AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
+    S3_MAX_POOL_CONNECTIONS = int(os.environ.get('S3_MAX_POOL_CONNECTIONS', 32))  # boto3 连接池大小（并行分段读取/批量操作）
     
     # S3 - 公共资源桶（头像、备份等）
     S3_PUBLIC_BUCKET = os.environ.get('S3_PUBLIC_BUCKET', 'funkandlove-cloud-public')
@@ -42,6 +43,66 @@ class Config:
     S3_TOKEN_KEY = os.environ.get('S3_TOKEN_KEY')  # 缤纷云后台设置的鉴权 Key
     S3_URL_EXPIRATION = int(os.environ.get('S3_URL_EXPIRATION', 3600))  # 签名 URL 有效期（秒）
     
+    # Outbound HTTP (Bitiful 转码/thumbhash、SSO 校验) 连接池
+    HTTP_POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS', 10))  # 缓存的主机连接池数量
+    HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 20))  # 每个主机保持的最大连接数
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 5))  # 建连超时（秒）
+    HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 30))  # 默认读取超时（秒）
+    HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', 2))  # 幂等请求的重试次数（建连失败和 502/503/504，读取超时不重试）
+    HTTP_RETRY_BACKOFF = float(os.environ.get('HTTP_RETRY_BACKOFF', 0.5))  # 重试退避系数（秒）
+    
+    # 后台任务执行器（每个 worker 进程独立）
+    PREHEAT_EXECUTOR_WORKERS = int(os.environ.get('PREHEAT_EXECUTOR_WORKERS', 2))  # 上传后转码预热并发数
+    PREHEAT_EXECUTOR_QUEUE_SIZE = int(os.environ.get('PREHEAT_EXECUTOR_QUEUE_SIZE', 100))  # 等待队列上限
+    UPLOAD_POSTPROCESS_EXECUTOR_WORKERS = int(os.environ.get('UPLOAD_POSTPROCESS_EXECUTOR_WORKERS', 4))  # 上传确认后 S3 打标签并发数
+    UPLOAD_POSTPROCESS_EXECUTOR_QUEUE_SIZE = int(os.environ.get('UPLOAD_POSTPROCESS_EXECUTOR_QUEUE_SIZE', 1000))  # 等待队列上限
+    UPLOAD_TAGGING_BATCH_SIZE = int(os.environ.get('UPLOAD_TAGGING_BATCH_SIZE', 20))  # 每个后台打标签任务处理的文件数
+    UPLOAD_TAGGING_RETRIES = int(os.environ.get('UPLOAD_TAGGING_RETRIES', 2))  # 打标签失败的重试次数
+    
+    # 大文件分片上传（S3 multipart，可断点续传）
+    MULTIPART_PART_SIZE = int(os.environ.get('MULTIPART_PART_SIZE', 16 * 1024 * 1024))  # 分片大小（字节），不小于 5MB
+    MULTIPART_URL_EXPIRATION = int(os.environ.get('MULTIPART_URL_EXPIRATION', 3600))  # 分片上传 URL 有效期（秒）
+    MULTIPART_SESSION_TTL_HOURS = float(os.environ.get('MULTIPART_SESSION_TTL_HOURS', 24))  # 超过该时长未续签的上传由 flask cleanup-multipart 中止
+    MULTIPART_MAX_SIZE = int(os.environ.get('MULTIPART_MAX_SIZE', 20 * 1024 * 1024 * 1024))  # 分片上传的文件大小上限（字节）
+    
+    # 修改日期/类型/文件名时移动 S3 对象（并行复制，提交后批量删除旧对象）
+    MOVE_COPY_WORKERS = int(os.environ.get('MOVE_COPY_WORKERS', 8))  # 并行复制线程数，不超过 S3_MAX_POOL_CONNECTIONS
+    
+    # 批量操作后台任务（jobs 表，超过阈值的批量删除/更新/打标签转为后台执行）
+    JOB_ASYNC_THRESHOLD = int(os.environ.get('JOB_ASYNC_THRESHOLD', 200))  # 文件数超过该值的批量操作转为后台任务
+    JOB_CHUNK_SIZE = int(os.environ.get('JOB_CHUNK_SIZE', 100))  # 每次提交处理的文件数
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))  # 出错后最多尝试次数，超过后标记为 failed
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', 300))  # 心跳超过该时长的 running 任务可被重新领取
+    JOB_EXECUTOR_WORKERS = int(os.environ.get('JOB_EXECUTOR_WORKERS', 2))  # 每个 worker 进程同时执行的任务数
+    JOB_EXECUTOR_QUEUE_SIZE = int(os.environ.get('JOB_EXECUTOR_QUEUE_SIZE', 100))  # 等待队列上限，超出的由 flask job-worker 执行
+    
+    # 缩略图占位 thumbhash（上传后台生成，flask backfill-thumbhash 补齐）
+    THUMBHASH_EXECUTOR_WORKERS = int(os.environ.get('THUMBHASH_EXECUTOR_WORKERS', 4))  # 上传后生成 thumbhash 的并发数
+    THUMBHASH_EXECUTOR_QUEUE_SIZE = int(os.environ.get('THUMBHASH_EXECUTOR_QUEUE_SIZE', 1000))  # 等待队列上限
+    THUMBHASH_RETRIES = int(os.environ.get('THUMBHASH_RETRIES', 3))  # 上传后生成失败的重试次数
+    THUMBHASH_RETRY_BASE = float(os.environ.get('THUMBHASH_RETRY_BASE', 2))  # 重试退避基数（秒），按 2^n 递增
+    THUMBHASH_LOCAL_ENCODE = os.environ.get('THUMBHASH_LOCAL_ENCODE', 'false').lower() == 'true'  # 图片在本地编码（需要 numpy、Pillow）
+    THUMBHASH_RENDITION_PARAMS = os.environ.get('THUMBHASH_RENDITION_PARAMS', 'w=100&cs=srgb')  # 本地编码下载的缩略图处理参数
+    
+    # 转码预热任务队列（preheat_jobs 表）
+    PREHEAT_JOB_MAX_ATTEMPTS = int(os.environ.get('PREHEAT_JOB_MAX_ATTEMPTS', 5))  # 最大尝试次数，超过后标记为 failed
+    PREHEAT_JOB_RETRY_BASE = int(os.environ.get('PREHEAT_JOB_RETRY_BASE', 300))  # 重试退避基数（秒），按 2^n 递增
+    PREHEAT_JOB_RETRY_MAX = int(os.environ.get('PREHEAT_JOB_RETRY_MAX', 21600))  # 重试退避上限（秒）
+    PREHEAT_JOB_LEASE_SECONDS = int(os.environ.get('PREHEAT_JOB_LEASE_SECONDS', 900))  # 心跳超过该时长的 running 任务可被重新领取
+    PREHEAT_REWARM_AFTER_HOURS = float(os.environ.get('PREHEAT_REWARM_AFTER_HOURS', 72))  # 距上次预热超过该时长才重新预热（应小于缤纷云转码缓存保留时间）
+    PREHEAT_POPULAR_MIN_SCORE = float(os.environ.get('PREHEAT_POPULAR_MIN_SCORE', 3))  # 热度不低于该值的视频不受日期窗口限制，0 为关闭
+    
+    # 标签自动补全（每个 worker 进程的内存索引，按 cache_versions 版本增量刷新）
+    TAG_INDEX_REFRESH_SECONDS = float(os.environ.get('TAG_INDEX_REFRESH_SECONDS', 5))  # 检查标签变更的最短间隔（秒）
+    
+    # 标签预设缓存（每个 worker 进程的内存映射，按 cache_versions 版本失效）
+    TAG_PRESET_CACHE_SECONDS = float(os.environ.get('TAG_PRESET_CACHE_SECONDS', 10))  # 检查预设变更的最短间隔（秒）
+    
+    # 文件访问计数（内存聚合，定期写入 file_access_stats）
+    ACCESS_FLUSH_INTERVAL = int(os.environ.get('ACCESS_FLUSH_INTERVAL', 60))  # 写库间隔（秒）
+    ACCESS_DEDUPE_SECONDS = int(os.environ.get('ACCESS_DEDUPE_SECONDS', 300))  # 同一用户同一文件在该时间内只计一次
+    ACCESS_SCORE_HALF_LIFE_HOURS = float(os.environ.get('ACCESS_SCORE_HALF_LIFE_HOURS', 72))  # 热度分半衰期（小时）
+    
     # CORS
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:3000').split(',')
     CORS_SUPPORTS_CREDENTIALS = True
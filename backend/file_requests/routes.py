@@ -8,6 +8,7 @@ from extensions import db
 from files.models import File
 from files.request_models import FileRequest
 from auth.models import User
+from services.move_service import move_service
 
 requests_bp = Blueprint('requests', __name__)
 
@@ -171,6 +172,8 @@ def approve_request(request_id):
     POST /api/requests/{request_id}/approve
     Body: { "response_message": "optional" }
     """
+    # Object copied to a new key, discarded if the approval fails before its commit
+    copied_keys = []
     try:
         from datetime import datetime
         
@@ -201,28 +204,27 @@ def approve_request(request_id):
             activity_name = dir_info['activity_name']
             activity_type = dir_info['activity_type']
             
-            # Find all files in this directory
-            files_to_update = File.query.filter(
+            # Apply changes to all files in this directory with one UPDATE
+            values = {}
+            if changes.get('new_activity_name'):
+                values['activity_name'] = changes['new_activity_name']
+            if changes.get('new_activity_type'):
+                values['activity_type'] = changes['new_activity_type']
+            
+            directory_files = File.query.filter(
                 File.activity_date == activity_date,
                 File.activity_name == activity_name,
                 File.activity_type == activity_type
-            ).all()
+            )
+            updated_count = directory_files.update(values, synchronize_session=False) if values \
+                else directory_files.count()
             
-            if not files_to_update:
+            if not updated_count:
                 file_request.status = 'rejected'
                 file_request.response_message = '目录已不存在'
                 db.session.commit()
                 return jsonify({'error': {'code': 'DIR_001', 'message': '目录已不存在'}}), 404
             
-            # Apply changes
-            updated_count = 0
-            for file in files_to_update:
-                if changes.get('new_activity_name'):
-                    file.activity_name = changes['new_activity_name']
-                if changes.get('new_activity_type'):
-                    file.activity_type = changes['new_activity_type']
-                updated_count += 1
-            
             file_request.status = 'approved'
             file_request.response_message = response_message or None
             db.session.commit()
@@ -247,14 +249,19 @@ def approve_request(request_id):
             return jsonify({'error': {'code': 'FILE_001', 'message': '文件已不存在'}}), 404
         
         # Apply the request
+        move_batch = None
         if file_request.request_type == 'delete':
             # Delete the file
-            from services.s3_service import s3_service
+            from services.content_hash_service import content_hash_service
             try:
-                s3_service.delete_file(file.s3_key)
+                content_hash_service.delete_object(file.s3_key, file.id)
             except Exception as e:
                 current_app.logger.warning(f'Failed to delete from S3: {str(e)}')
             
+            from services.preheat_job_service import preheat_job_service
+            from services.tag_service import tag_service
+            tag_service.detach_files([file.id])
+            preheat_job_service.delete_for_files([file.id])
             db.session.delete(file)
             
         elif file_request.request_type == 'edit':
@@ -284,23 +291,6 @@ def approve_request(request_id):
                     file.filename = new_filename
                     need_s3_move = True
             
-            # Handle free_tags update
-            if 'free_tags' in changes:
-                from services.tag_service import tag_service
-                new_tags = changes['free_tags'] or []
-                current_tag_names = set(t.name for t in file.tags)
-                new_tag_names = set(t.strip() for t in new_tags if t and t.strip())
-                
-                # Remove old tags
-                for tag in list(file.tags):
-                    if tag.name not in new_tag_names:
-                        tag_service.remove_tag_from_file(file.id, tag.id)
-                
-                # Add new tags
-                for tag_name in new_tag_names:
-                    if tag_name not in current_tag_names:
-                        tag_service.add_tag_to_file(file.id, tag_name, current_user_id)
-            
             # Move file in S3 if needed
             if need_s3_move and file.activity_date and file.activity_type:
                 from services.s3_service import s3_service
@@ -308,27 +298,52 @@ def approve_request(request_id):
                 year = file.activity_date.year
                 month = f"{file.activity_date.month:02d}"
                 new_directory = f"{file.activity_type}/{year}/{month}"
-                file.directory = new_directory
                 new_s3_key = f"{new_directory}/{file.filename}"
                 
+                # Target name must be free (unique directory/filename index), and no
+                # other file's object may be stored at the target key
+                from files.routes import _find_name_conflict
+                conflict = _find_name_conflict(
+                    new_directory, file.filename, exclude_id=file.id, s3_key=new_s3_key
+                )
+                if conflict:
+                    db.session.rollback()
+                    return jsonify({'error': {'code': 'FILE_005', 'message': f'目标位置已存在同名文件: {file.filename}'}}), 400
+                
+                file.directory = new_directory
+                
                 if new_s3_key != old_s3_key:
-                    try:
-                        s3_service.copy_file(old_s3_key, new_s3_key)
-                        s3_service.delete_file(old_s3_key)
-                        file.s3_key = new_s3_key
-                        
-                        # Update public URL
-                        bucket = s3_service.get_bucket_name()
-                        endpoint = current_app.config.get('S3_ENDPOINT', 'https://s3.bitiful.net')
-                        file.public_url = f"{endpoint}/{bucket}/{new_s3_key}"
-                    except Exception as e:
-                        current_app.logger.error(f'Failed to move file in S3: {str(e)}')
+                    # Copy to the new key; the old key is deleted after the commit
+                    copy_errors = move_service.copy_objects([(old_s3_key, new_s3_key)])
+                    if copy_errors:
+                        current_app.logger.error(f'Failed to move file in S3: {copy_errors[new_s3_key]}')
                         return jsonify({'error': {'code': 'S3_001', 'message': '移动文件失败'}}), 500
+                    copied_keys.append(new_s3_key)
+                    
+                    file.s3_key = new_s3_key
+                    move_batch = move_service.record([(file.id, old_s3_key, new_s3_key)])
+                    
+                    # Update public URL
+                    bucket = s3_service.get_bucket_name()
+                    endpoint = current_app.config.get('S3_ENDPOINT', 'https://s3.bitiful.net')
+                    file.public_url = f"{endpoint}/{bucket}/{new_s3_key}"
+            
+            # Handle free_tags update, after the S3 copy: tag writes hold the shared
+            # 'tags' cache version row until the commit
+            if 'free_tags' in changes:
+                from services.tag_service import tag_service
+                # Committed together with the approval
+                tag_service.set_file_tags(
+                    [file.id], changes['free_tags'] or [], current_user_id, commit=False
+                )
         
         file_request.status = 'approved'
         file_request.response_message = response_message or None
         db.session.commit()
         
+        if move_batch:
+            move_service.finish(move_batch)
+        
         current_app.logger.info(f'Request {request_id} approved by user {current_user_id}')
         
         return jsonify({
@@ -339,6 +354,8 @@ def approve_request(request_id):
         
     except Exception as e:
         db.session.rollback()
+        # No-op once committed: discard keeps keys a file points at
+        move_service.discard(copied_keys)
         current_app.logger.error(f'Error approving request: {str(e)}')
         return jsonify({'error': {'code': 'INTERNAL_ERROR', 'message': '处理请求失败'}}), 500
 
@@ -436,8 +453,7 @@ def create_directory_request():
         # Validate new_activity_type if provided
         if proposed_changes.get('new_activity_type'):
             from services.tag_preset_service import tag_preset_service
-            activity_type_presets = tag_preset_service.get_active_presets('activity_type')
-            valid_types = [p.value for p in activity_type_presets]
+            valid_types = tag_preset_service.get_display_names('activity_type')
             if proposed_changes['new_activity_type'] not in valid_types:
                 return jsonify({
                     'error': {
@@ -0,0 +1,23 @@
+"""
+Cache version models for LockCloud
+Shared version counters that tell per-process caches when to refresh
+"""
+from datetime import datetime
+from extensions import db
+
+
+class CacheVersion(db.Model):
+    """
+    Version of a cached data set (e.g. 'tags'), bumped by every change
+
+    Writers bump the counter after their change is committed, so a process
+    that sees a new version also sees the changed rows.
+    """
+    __tablename__ = 'cache_versions'
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<CacheVersion {self.name} {self.version}>'
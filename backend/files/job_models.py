@@ -0,0 +1,121 @@
+"""
+Background job models for LockCloud
+Persistent, resumable jobs for large batch operations, with per-item results
+"""
+from datetime import datetime
+from extensions import db
+
+
+class Job(db.Model):
+    """
+    One batch operation (e.g. batch delete) run in the background
+
+    ``params['file_ids']`` holds every item; items before ``processed`` are
+    done, so an interrupted job resumes where it stopped. Progress is
+    committed together with each chunk's changes.
+    """
+    __tablename__ = 'jobs'
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'  # Every item processed (individual items may have failed)
+    STATUS_FAILED = 'failed'  # Stopped after repeated errors
+
+    id = db.Column(db.Integer, primary_key=True)
+    type = db.Column(db.String(50), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    params = db.Column(db.JSON, nullable=False)
+
+    # Status: 'pending', 'running', 'succeeded', 'failed'
+    status = db.Column(db.String(20), default=STATUS_PENDING, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text, nullable=True)
+
+    # Progress: items before ``processed`` are done
+    total = db.Column(db.Integer, default=0, nullable=False)
+    processed = db.Column(db.Integer, default=0, nullable=False)
+    succeeded_count = db.Column(db.Integer, default=0, nullable=False)
+    failed_count = db.Column(db.Integer, default=0, nullable=False)
+
+    # Operation-specific totals (e.g. {'inserted': 120} for batch tagging)
+    result = db.Column(db.JSON, nullable=True)
+
+    # Claim / lease: a running job whose heartbeat is older than the lease is reclaimed
+    locked_by = db.Column(db.String(100), nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_jobs_status_created', 'status', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.type} {self.status}>'
+
+    def to_dict(self):
+        """
+        Convert job to dictionary for JSON serialization
+
+        Returns:
+            dict: Job data with progress
+        """
+        return {
+            'id': self.id,
+            'type': self.type,
+            'user_id': self.user_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'total': self.total,
+            'processed': self.processed,
+            'succeeded': self.succeeded_count,
+            'failed': self.failed_count,
+            'progress': round(self.processed * 100 / self.total, 1) if self.total else 100.0,
+            'result': self.result or {},
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class JobItem(db.Model):
+    """Result of one item of a job"""
+    __tablename__ = 'job_items'
+
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id', ondelete='CASCADE'), nullable=False)
+    seq = db.Column(db.Integer, nullable=False)  # Position in the request
+    item_id = db.Column(db.Integer, nullable=False)  # File ID
+
+    # Status: 'succeeded', 'failed'
+    status = db.Column(db.String(20), nullable=False)
+    error = db.Column(db.Text, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_job_items_job_seq', 'job_id', 'seq'),
+    )
+
+    def __repr__(self):
+        return f'<JobItem job={self.job_id} item={self.item_id} {self.status}>'
+
+    def to_dict(self):
+        """
+        Convert job item to dictionary for JSON serialization
+
+        Returns:
+            dict: Item result
+        """
+        return {
+            'seq': self.seq,
+            'file_id': self.item_id,
+            'status': self.status,
+            'error': self.error
+        }
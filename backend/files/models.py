@@ -13,9 +13,20 @@ class Tag(db.Model):
     name = db.Column(db.String(100), nullable=False, unique=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    
+
+    # 'tags' cache version of the last change to the tag or its files (per-process tag index reloads newer tags)
+    version = db.Column(db.Integer, default=0, nullable=False, index=True)
+
+    # Number of files carrying the tag, maintained by TagService with every association change
+    usage_count = db.Column(db.Integer, default=0, nullable=False)
+
     # Relationship to files via junction table
     files = db.relationship('File', secondary='file_tags', back_populates='tags')
+
+    # Table arguments: tag listing is an index scan in usage order
+    __table_args__ = (
+        db.Index('idx_tags_usage_count_name', usage_count.desc(), name),
+    )
     
     def __repr__(self):
         return f'<Tag {self.name}>'
@@ -44,10 +55,16 @@ class File(db.Model):
     """File model for storing file metadata"""
     __tablename__ = 'files'
     
+    # HLS transcode readiness (videos only)
+    HLS_UNKNOWN = 'unknown'
+    HLS_WARMING = 'warming'
+    HLS_READY = 'ready'
+    HLS_FAILED = 'failed'
+    
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(255), nullable=False)
     directory = db.Column(db.String(500), nullable=False, index=True)
-    s3_key = db.Column(db.String(1000), nullable=False, unique=True)
+    s3_key = db.Column(db.String(1000), nullable=False, index=True)  # Not unique: deduplicated uploads share the object
     size = db.Column(db.BigInteger, nullable=False)
     content_type = db.Column(db.String(100))
     uploader_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
@@ -62,6 +79,10 @@ class File(db.Model):
     instructor = db.Column(db.String(100), nullable=True, index=True)  # Instructor name
     is_legacy = db.Column(db.Boolean, default=False, nullable=False)  # Legacy naming system flag
     thumbhash = db.Column(db.String(50), nullable=True)  # ThumbHash for blur placeholder
+    thumbhash_attempts = db.Column(db.Integer, default=0, nullable=False)  # Failed thumbhash generation attempts
+    hls_state = db.Column(db.String(20), nullable=True)  # HLS transcode state: unknown/warming/ready/failed
+    hls_checked_at = db.Column(db.DateTime, nullable=True)  # When hls_state was last updated
+    content_hash = db.Column(db.String(64), nullable=True, index=True)  # SHA-256 computed from the object (hex), for upload dedup
     
     # Relationships
     logs = db.relationship('FileLog', backref='file', lazy='dynamic')
@@ -71,6 +92,8 @@ class File(db.Model):
     __table_args__ = (
         db.Index('idx_files_activity_date_type', 'activity_date', 'activity_type'),
         db.Index('idx_files_activity_date_name', 'activity_date', 'activity_name'),
+        # A file's identity: one name per directory (duplicate checks are lookups on this index)
+        db.Index('uq_files_directory_filename', 'directory', 'filename', unique=True),
     )
     
     def __repr__(self):
@@ -103,7 +126,10 @@ class File(db.Model):
             'activity_name': self.activity_name,
             'instructor': self.instructor,
             'is_legacy': self.is_legacy,
-            'thumbhash': self.thumbhash
+            'thumbhash': self.thumbhash,
+            'hls_state': self.get_hls_state(),
+            'hls_checked_at': self.hls_checked_at.isoformat() if self.hls_checked_at else None,
+            'content_hash': self.content_hash
         }
         
         if include_uploader and self.uploader:
@@ -119,6 +145,21 @@ class File(db.Model):
         
         return data
     
+    def is_video(self):
+        """Whether the file is a video (has HLS renditions)"""
+        return bool(self.content_type and self.content_type.startswith('video/'))
+    
+    def get_hls_state(self):
+        """
+        Get HLS transcode readiness
+        
+        Returns:
+            str: unknown/warming/ready/failed for videos, None for other files
+        """
+        if not self.is_video():
+            return None
+        return self.hls_state or self.HLS_UNKNOWN
+    
     def get_size_formatted(self):
         """
         Get human-readable file size
@@ -0,0 +1,40 @@
+"""
+File move models for LockCloud
+Journal of S3 object moves (copy to the new key, then delete the old key)
+"""
+from datetime import datetime
+from extensions import db
+
+
+class FileMove(db.Model):
+    """
+    One object move whose source key still has to be deleted
+
+    Rows are committed in the same transaction that points the file at the
+    new key, so a committed row means the copy exists and the DB uses it;
+    only the cleanup of the old key can still be pending.
+    """
+    __tablename__ = 'file_moves'
+
+    STATUS_PENDING = 'pending'  # Source key not deleted yet
+    STATUS_DONE = 'done'
+
+    id = db.Column(db.Integer, primary_key=True)
+    batch_id = db.Column(db.String(36), nullable=False, index=True)
+    file_id = db.Column(db.Integer, db.ForeignKey('files.id', ondelete='SET NULL'), nullable=True)
+    source_key = db.Column(db.String(1000), nullable=False)
+    target_key = db.Column(db.String(1000), nullable=False)
+
+    # Status: 'pending', 'done'
+    status = db.Column(db.String(20), default=STATUS_PENDING, nullable=False)
+    error = db.Column(db.Text, nullable=True)  # Last cleanup error
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    completed_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_file_moves_status_created', 'status', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f'<FileMove {self.source_key} -> {self.target_key} {self.status}>'
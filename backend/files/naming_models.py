@@ -0,0 +1,18 @@
+"""
+File naming models for LockCloud
+Per-date counters behind sequential YYYY-MM-DD_XXX filenames
+"""
+from datetime import datetime
+from extensions import db
+
+
+class FileNameSequence(db.Model):
+    """Last sequential index handed out for an activity date"""
+    __tablename__ = 'file_name_sequences'
+
+    activity_date = db.Column(db.Date, primary_key=True)
+    last_index = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<FileNameSequence {self.activity_date} {self.last_index}>'
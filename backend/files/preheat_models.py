@@ -0,0 +1,77 @@
+"""
+Transcode preheat job models for LockCloud
+Persistent, resumable queue of HLS transcode preheat work
+"""
+from datetime import datetime
+from extensions import db
+
+
+class PreheatJob(db.Model):
+    """One preheat job per video, re-queued whenever the video needs warming again"""
+    __tablename__ = 'preheat_jobs'
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+
+    id = db.Column(db.Integer, primary_key=True)
+    file_id = db.Column(db.Integer, db.ForeignKey('files.id', ondelete='CASCADE'), nullable=False, unique=True)
+    s3_key = db.Column(db.String(1000), nullable=False)
+
+    # Status: 'pending', 'running', 'succeeded', 'failed'
+    status = db.Column(db.String(20), default=STATUS_PENDING, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text, nullable=True)
+
+    # Resume point: segments before segments_done have already been requested
+    segments_done = db.Column(db.Integer, default=0, nullable=False)
+    segments_total = db.Column(db.Integer, default=0, nullable=False)
+
+    next_run_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # Last time every segment was warmed; kept across re-queues to decide when to re-warm
+    last_preheated_at = db.Column(db.DateTime, nullable=True, index=True)
+
+    # Claim / lease: a running job whose heartbeat is older than the lease is reclaimed
+    locked_by = db.Column(db.String(100), nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    # Relationships
+    file = db.relationship('File', backref=db.backref('preheat_job', uselist=False, passive_deletes=True))
+
+    __table_args__ = (
+        db.Index('idx_preheat_jobs_status_next_run', 'status', 'next_run_at'),
+    )
+
+    def __repr__(self):
+        return f'<PreheatJob file_id={self.file_id} {self.status}>'
+
+    def to_dict(self):
+        """
+        Convert preheat job to dictionary for JSON serialization
+
+        Returns:
+            dict: Preheat job data
+        """
+        return {
+            'id': self.id,
+            'file_id': self.file_id,
+            's3_key': self.s3_key,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'segments_done': self.segments_done,
+            'segments_total': self.segments_total,
+            'next_run_at': self.next_run_at.isoformat() if self.next_run_at else None,
+            'last_preheated_at': self.last_preheated_at.isoformat() if self.last_preheated_at else None,
+            'locked_by': self.locked_by,
+            'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
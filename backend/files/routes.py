@@ -2,7 +2,7 @@
 File management routes for LockCloud
 Implements file upload, listing, retrieval, and deletion endpoints
 """
-from datetime import datetime
+from datetime import datetime, timedelta
 from flask import Blueprint, request, jsonify, current_app, make_response, redirect
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import and_, or_
@@ -14,194 +14,920 @@ from files.validators import (
     validate_file_extension
 )
 from services.s3_service import s3_service
+from services.content_hash_service import content_hash_service
+from services.move_service import move_service
+from services.job_service import job_service
+from services.access_counter import access_counter, THUMBNAIL_WEIGHT
 from logs.models import FileLog, OperationType
-import threading
 
 
-def _trigger_video_transcode_preheat(s3_key: str):
+# Create blueprint
+files_bp = Blueprint('files', __name__)
+
+
+# Exempt OPTIONS requests from rate limiting (for CORS preflight)
+@files_bp.before_request
+def handle_preflight():
+    if request.method == 'OPTIONS':
+        return '', 200
+
+
+# Maximum number of files per batch upload-URL request
+MAX_UPLOAD_URL_BATCH = 500
+
+# Maximum number of files per batch delete / update / tag add/remove;
+# batches above JOB_ASYNC_THRESHOLD run as background jobs
+MAX_BATCH_DELETE = 10000
+MAX_BATCH_UPDATE = 10000
+MAX_BATCH_TAG = 10000
+
+# Maximum number of names per check-filenames request, and names per IN (...) query
+MAX_FILENAME_CHECK = 10000
+FILENAME_CHECK_CHUNK = 1000
+
+
+def _validate_upload_item(data, valid_activity_types, max_size=2 * 1024 * 1024 * 1024):
     """
-    异步触发视频 HLS 转码预热
-    全量预热 1080p 的所有 .ts 分片
+    Validate one upload descriptor and derive its generated filename and S3 key
+    
+    Shared by the single and batch upload-URL endpoints. Tag presets are
+    loaded once by the caller.
+    
+    Args:
+        data: Upload descriptor (original_filename, content_type, size,
+            activity_date, activity_type, optional activity_name/custom_filename/
+            auto_name/content_hash)
+        valid_activity_types: Active activity_type preset values
+        max_size: Maximum file size in bytes (2GB for single PUT uploads)
+    
+    Returns:
+        tuple: (item dict, None) on success or (None, (error_code, message)) on failure
+    """
+    import re
+    from services.file_naming_service import file_naming_service
+    
+    if not isinstance(data, dict):
+        return None, ('VALIDATION_001', '文件描述格式无效')
+    
+    # Validate required fields
+    required_fields = ['original_filename', 'content_type', 'size', 'activity_date', 'activity_type']
+    for field in required_fields:
+        if not data or field not in data:
+            return None, ('VALIDATION_001', f'缺少必填字段: {field}')
+    
+    # Validate field types (bool is an int subclass, so reject it explicitly)
+    for field in ('original_filename', 'content_type', 'activity_date', 'activity_type'):
+        if not isinstance(data[field], str):
+            return None, ('VALIDATION_001', f'字段类型无效: {field}')
+    for field in ('activity_name', 'custom_filename', 'content_hash'):
+        if data.get(field) is not None and not isinstance(data[field], str):
+            return None, ('VALIDATION_001', f'字段类型无效: {field}')
+    if not isinstance(data['size'], int) or isinstance(data['size'], bool) or data['size'] < 0:
+        return None, ('VALIDATION_001', '文件大小必须是非负整数')
+    
+    original_filename = data['original_filename'].strip()
+    content_type = data['content_type'].strip()
+    size = data['size']
+    activity_date_str = data['activity_date'].strip()
+    activity_type = data['activity_type'].strip()
+    activity_name = data.get('activity_name', '').strip() if data.get('activity_name') else None
+    custom_filename = data.get('custom_filename', '').strip() if data.get('custom_filename') else None
+    
+    # Validate activity date format
+    try:
+        activity_date = datetime.fromisoformat(activity_date_str).date()
+    except ValueError:
+        return None, ('FILE_007', '活动日期格式无效，请使用 ISO 格式 (YYYY-MM-DD)')
+    
+    # Validate activity_type
+    if activity_type not in valid_activity_types:
+        return None, ('FILE_008', f'活动类型无效。有效选项: {", ".join(valid_activity_types)}')
+    
+    # Validate activity_name length if provided
+    if activity_name and len(activity_name) > 200:
+        return None, ('VALIDATION_001', '活动名称过长（最多200字符）')
+    
+    # Extract and validate file extension
+    try:
+        file_extension = file_naming_service.extract_extension(original_filename)
+    except ValueError as e:
+        return None, ('VALIDATION_001', str(e))
+    
+    extension_validation = validate_file_extension(original_filename)
+    if not extension_validation['valid']:
+        current_app.logger.warning(f'File extension validation failed: {extension_validation["message"]}')
+        return None, ('VALIDATION_001', extension_validation['message'])
+    
+    # Validate custom filename if provided
+    if custom_filename:
+        # Check for invalid characters
+        if re.search(r'[<>:"/\\|?*\x00-\x1f]', custom_filename):
+            return None, ('VALIDATION_001', '自定义文件名包含非法字符')
+        
+        # Check length
+        if len(custom_filename) > 200:
+            return None, ('VALIDATION_001', '自定义文件名过长（最多200字符）')
+    
+    # Validate file size
+    if size > max_size:
+        return None, ('VALIDATION_001', f'文件大小超过限制 (最大 {max_size / 1024 ** 3:g}GB)')
+    
+    # Validate client-computed SHA-256 if provided (used for dedup)
+    try:
+        content_hash = content_hash_service.normalize(data.get('content_hash'))
+    except ValueError as e:
+        return None, ('VALIDATION_001', str(e))
+    
+    # Generate filename: use custom name if provided, otherwise use original filename
+    if custom_filename:
+        generated_filename = f"{custom_filename}{file_extension}"
+    else:
+        # Use original filename (without path, just the name)
+        generated_filename = original_filename.split('/')[-1].split('\\')[-1]
+    
+    # Construct directory path based on tags: /{activity_type}/{year}/{month}/
+    directory_path = f"{activity_type}/{activity_date.year}/{activity_date.month:02d}"
+    
+    return {
+        'original_filename': original_filename,
+        'content_type': content_type,
+        'size': size,
+        'activity_date': activity_date,
+        'activity_date_str': activity_date_str,
+        'activity_type': activity_type,
+        'activity_name': activity_name,
+        'generated_filename': generated_filename,
+        'file_extension': file_extension,
+        # Sequential YYYY-MM-DD_XXX name, assigned by _assign_sequential_names
+        'auto_name': bool(data.get('auto_name')) and not custom_filename,
+        'content_hash': content_hash,
+        'directory': directory_path,
+        # Construct S3 key (path in bucket)
+        's3_key': f"{directory_path}/{generated_filename}"
+    }, None
+
+
+def _assign_sequential_names(items):
     """
-    def do_preheat():
-        import requests
+    Give auto_name items sequential YYYY-MM-DD_XXX filenames
+    
+    Indices are reserved as one block per activity date, so a batch costs
+    one statement per date.
+    
+    Args:
+        items: Validated upload items (from _validate_upload_item)
+    """
+    from services.file_naming_service import file_naming_service
+    
+    by_date = {}
+    for item in items:
+        if item['auto_name']:
+            by_date.setdefault(item['activity_date'], []).append(item)
+    
+    for activity_date, dated in by_date.items():
+        filenames = file_naming_service.generate_filenames(
+            activity_date, [item['file_extension'] for item in dated]
+        )
+        for item, filename in zip(dated, filenames):
+            item['generated_filename'] = filename
+            item['s3_key'] = f"{item['directory']}/{filename}"
+
+
+def _find_name_conflict(directory, filename, exclude_id=None, s3_key=None):
+    """
+    Find a file already stored as directory/filename
+    
+    A lookup on the unique (directory, filename) index. Pending changes of
+    the file being moved are not flushed first, so they cannot trip the
+    unique index before the conflict is reported.
+    
+    Args:
+        directory: Target directory
+        filename: Target filename
+        exclude_id: ID of the file being moved/renamed
+        s3_key: Also match a file whose object is stored at this key
+    
+    Returns:
+        Conflicting File or None
+    """
+    condition = and_(File.directory == directory, File.filename == filename)
+    if s3_key:
+        condition = or_(condition, File.s3_key == s3_key)
+    
+    with db.session.no_autoflush:
+        query = File.query.filter(condition)
+        if exclude_id is not None:
+            query = query.filter(File.id != exclude_id)
+        return query.first()
+
+
+def _existing_names(pairs, match_keys=False):
+    """
+    Which (directory, filename) pairs are taken, with index lookups
+    
+    Args:
+        pairs: Iterable of (directory, filename)
+        match_keys: Also treat a pair as taken when a file's object is stored
+            at ``directory/filename`` (deduplicated files keep their source's
+            s3_key, which outlives the source file)
+    
+    Returns:
+        Set of taken (directory, filename) pairs
+    """
+    by_directory = {}
+    for directory, filename in pairs:
+        by_directory.setdefault(directory, set()).add(filename)
+    
+    taken = set()
+    for directory, filenames in by_directory.items():
+        filenames = list(filenames)
+        # Bounded IN lists: each chunk is one range of index probes
+        for start in range(0, len(filenames), FILENAME_CHECK_CHUNK):
+            rows = db.session.query(File.filename).filter(
+                File.directory == directory,
+                File.filename.in_(filenames[start:start + FILENAME_CHECK_CHUNK])
+            )
+            taken.update((directory, row.filename) for row in rows)
+    
+    if match_keys:
+        pairs_by_key = {
+            f'{directory}/{filename}': (directory, filename)
+            for directory, filenames in by_directory.items()
+            for filename in filenames
+        }
+        keys = list(pairs_by_key)
+        for start in range(0, len(keys), FILENAME_CHECK_CHUNK):
+            rows = db.session.query(File.s3_key).filter(
+                File.s3_key.in_(keys[start:start + FILENAME_CHECK_CHUNK])
+            )
+            taken.update(pairs_by_key[row.s3_key] for row in rows)
+    return taken
+
+
+def _duplicate_info(file):
+    """Describe an existing file with the same content, offered instead of an upload URL"""
+    return {
+        'file_id': file.id,
+        'filename': file.filename,
+        'directory': file.directory,
+        'size': file.size,
+        'content_type': file.content_type,
+        'uploaded_at': file.uploaded_at.isoformat() if file.uploaded_at else None
+    }
+
+
+def _build_upload_tags(item, uploader_name):
+    """Build the S3 tags returned to the client for the confirmation step"""
+    return {
+        'activity_date': item['activity_date_str'],
+        'activity_type': item['activity_type'],
+        'activity_name': item['activity_name'] or '',
+        'uploader_name': uploader_name,
+        'upload_timestamp': datetime.utcnow().isoformat() + 'Z',
+        'original_filename': item['original_filename']
+    }
+
+
+@files_bp.route('/upload-url', methods=['POST'])
+@jwt_required()
+def get_upload_url():
+    """
+    Generate signed URL for file upload with automatic naming
+    
+    POST /api/files/upload-url
+    Headers: Authorization: Bearer <token>
+    Body: {
+        "original_filename": "IMG_1234.jpg",
+        "content_type": "image/jpeg",
+        "size": 1024000,
+        "activity_date": "2025-03-15",
+        "activity_type": "regular_training",
+        "instructor": "alex",
+        "auto_name": false,             // optional, name the file YYYY-MM-DD_XXX.ext
+        "content_hash": "9f86d08...",   // optional, hex SHA-256 of the file
+        "allow_duplicate": false        // optional, upload even if the content exists
+    }
+    
+    When content_hash and size match an existing file, no upload URL is
+    issued: the response has "duplicate": true and "duplicate_of" describing
+    that file. Call /confirm with "source_file_id" and "content_hash" to
+    create a record that references the existing object, or request again
+    with "allow_duplicate": true to upload anyway.
+    
+    Returns:
+        200: Signed upload URL generated (or duplicate found)
+        400: Invalid input or validation failed
+        401: Unauthorized
+        500: URL generation failed
+    """
+    try:
+        # Get current user ID from JWT
+        current_user_id = int(get_jwt_identity())
+        
+        # Get request data
+        data = request.get_json()
+        
+        # Validate tag presets
+        from services.tag_preset_service import tag_preset_service
+        
+        valid_activity_types = tag_preset_service.get_display_names('activity_type')
+        
+        item, error = _validate_upload_item(data, valid_activity_types)
+        if error:
+            return jsonify({
+                'error': {
+                    'code': error[0],
+                    'message': error[1]
+                }
+            }), 400
+        
+        _assign_sequential_names([item])
+        
+        content_type = item['content_type']
+        activity_date_str = item['activity_date_str']
+        generated_filename = item['generated_filename']
+        s3_key = item['s3_key']
+        
+        # Check if file already exists in the same directory (activity_type/year/month),
+        # or another file's object is stored at the target key
+        existing_file = _find_name_conflict(item['directory'], generated_filename, s3_key=item['s3_key'])
+        
+        if existing_file:
+            current_app.logger.warning(f'File already exists: {generated_filename}')
+            response = jsonify({
+                'error': {
+                    'code': 'FILE_005',
+                    'message': f'该目录下已存在同名文件: {generated_filename}'
+                }
+            })
+            response.status_code = 400
+            return response
         
+        # Get uploader information
+        from auth.models import User
+        uploader = User.query.get(current_user_id)
+        uploader_name = uploader.name if uploader else str(current_user_id)
+        
+        # Build S3 tags dictionary
+        s3_tags = _build_upload_tags(item, uploader_name)
+        
+        # Same content already stored: offer to reference it instead of uploading again
+        if item['content_hash'] and not data.get('allow_duplicate'):
+            duplicate = content_hash_service.find_duplicate(item['content_hash'], item['size'])
+            if duplicate:
+                current_app.logger.info(
+                    f'Duplicate upload for user {current_user_id}: {s3_key} matches file {duplicate.id}'
+                )
+                return jsonify({
+                    'success': True,
+                    'duplicate': True,
+                    'duplicate_of': _duplicate_info(duplicate),
+                    'upload_url': None,
+                    's3_key': s3_key,
+                    'generated_filename': generated_filename,
+                    's3_tags': s3_tags,
+                    'uploader_name': uploader_name
+                }), 200
+        
+        # Generate signed upload URL without tags (simpler, more reliable)
+        # Tags will be applied after upload confirmation
         try:
-            # 1. 先请求主播放列表
-            hls_key = f"{s3_key}!style:medium/auto_medium.m3u8"
-            signed_url = s3_service.generate_signed_url(key=hls_key, expiration=300)
+            upload_url = s3_service.generate_presigned_upload_url(
+                key=s3_key,
+                content_type=content_type,
+                expiration=3600  # 1 hour
+            )
+        except Exception as e:
+            current_app.logger.error(f'Failed to generate upload URL: {str(e)}')
+            return jsonify({
+                'error': {
+                    'code': 'S3_001',
+                    'message': '生成上传链接失败'
+                }
+            }), 500
+        
+        current_app.logger.info(
+            f'Generated upload URL for user {current_user_id}: {s3_key} (activity: {activity_date_str})'
+        )
+        
+        return jsonify({
+            'success': True,
+            'duplicate': False,
+            'upload_url': upload_url,
+            's3_key': s3_key,
+            'generated_filename': generated_filename,
+            'expires_in': 3600,
+            's3_tags': s3_tags,  # Return tags for confirmation step
+            'uploader_name': uploader_name
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f'Error generating upload URL: {str(e)}')
+        return jsonify({
+            'error': {
+                'code': 'INTERNAL_ERROR',
+                'message': '生成上传链接失败，请稍后重试'
+            }
+        }), 500
+
+
+@files_bp.route('/upload-urls', methods=['POST'])
+@jwt_required()
+def get_upload_urls_batch():
+    """
+    Generate signed upload URLs for many files in one request
+    
+    POST /api/files/upload-urls
+    Headers: Authorization: Bearer <token>
+    Body: {
+        "activity_date": "2025-03-15",          // optional, default for every file
+        "activity_type": "regular_training",    // optional, default for every file
+        "activity_name": "周末特训",              // optional, default for every file
+        "files": [
+            {"original_filename": "IMG_1234.jpg", "content_type": "image/jpeg", "size": 1024000},
+            {"original_filename": "IMG_1235.mov", "content_type": "video/quicktime", "size": 52428800,
+             "custom_filename": "opening", "content_hash": "9f86d08..."},
+            {"original_filename": "IMG_1236.jpg", "content_type": "image/jpeg", "size": 1024000,
+             "auto_name": true}
+        ]
+    }
+    
+    Validation, the duplicate check and the uploader lookup run once for the
+    whole batch; per-file fields override the shared defaults. Files whose
+    content_hash and size match an existing file get "upload_url": null and
+    "duplicate_of" instead (see POST /api/files/upload-url), unless
+    "allow_duplicate" is set for the batch or the file.
+    
+    Returns:
+        200: All upload URLs generated
+        207: Partial success (some files failed validation)
+        400: Invalid input or every file failed
+        401: Unauthorized
+        500: URL generation failed
+    """
+    try:
+        current_user_id = int(get_jwt_identity())
+        
+        data = request.get_json()
+        
+        if not data or 'files' not in data:
+            return jsonify({
+                'error': {
+                    'code': 'BATCH_001',
+                    'message': '缺少必填字段: files'
+                }
+            }), 400
+        
+        descriptors = data['files']
+        
+        if not descriptors or not isinstance(descriptors, list):
+            return jsonify({
+                'error': {
+                    'code': 'BATCH_001',
+                    'message': '文件列表不能为空'
+                }
+            }), 400
+        
+        if len(descriptors) > MAX_UPLOAD_URL_BATCH:
+            return jsonify({
+                'error': {
+                    'code': 'BATCH_002',
+                    'message': f'批量操作限制最多{MAX_UPLOAD_URL_BATCH}个文件'
+                }
+            }), 400
+        
+        # Load tag presets once for the whole batch
+        from services.tag_preset_service import tag_preset_service
+        
+        valid_activity_types = tag_preset_service.get_display_names('activity_type')
+        
+        shared = {
+            field: data[field]
+            for field in ('activity_date', 'activity_type', 'activity_name')
+            if data.get(field)
+        }
+        
+        failed = []
+        items = []
+        for index, descriptor in enumerate(descriptors):
+            if not isinstance(descriptor, dict):
+                failed.append({'index': index, 'code': 'VALIDATION_001', 'error': '文件描述格式无效'})
+                continue
             
-            current_app.logger.info(f'[Preheat] Triggering transcode for: {s3_key}')
-            resp = requests.get(signed_url, timeout=30)
+            item, error = _validate_upload_item({**shared, **descriptor}, valid_activity_types)
+            if error:
+                failed.append({
+                    'index': index,
+                    'original_filename': descriptor.get('original_filename'),
+                    'code': error[0],
+                    'error': error[1]
+                })
+                continue
             
-            if resp.status_code != 200:
-                current_app.logger.warning(f'[Preheat] Master playlist returned {resp.status_code} for: {s3_key}')
-                return
+            item['index'] = index
+            item['allow_duplicate'] = bool(data.get('allow_duplicate') or descriptor.get('allow_duplicate'))
+            items.append(item)
+        
+        # One index block per activity date for auto-named files
+        _assign_sequential_names(items)
+        
+        # One index lookup per directory for every (directory, filename) in the batch,
+        # plus one for objects still stored at those keys
+        existing_keys = _existing_names(
+            ((item['directory'], item['generated_filename']) for item in items),
+            match_keys=True
+        )
+        
+        # One lookup for every content hash of the batch
+        duplicates = content_hash_service.find_duplicates(
+            (item['content_hash'], item['size']) for item in items if not item['allow_duplicate']
+        )
+        
+        # Get uploader information
+        from auth.models import User
+        uploader = User.query.get(current_user_id)
+        uploader_name = uploader.name if uploader else str(current_user_id)
+        
+        succeeded = []
+        for item in items:
+            key = (item['directory'], item['generated_filename'])
             
-            current_app.logger.info(f'[Preheat] Master playlist ready for: {s3_key}')
+            # Also rejects two files of this batch that would land on the same name
+            if key in existing_keys:
+                failed.append({
+                    'index': item['index'],
+                    'original_filename': item['original_filename'],
+                    'code': 'FILE_005',
+                    'error': f'该目录下已存在同名文件: {item["generated_filename"]}'
+                })
+                continue
+            existing_keys.add(key)
+            
+            duplicate = None if item['allow_duplicate'] else duplicates.get((item['content_hash'], item['size']))
+            if duplicate:
+                succeeded.append({
+                    'index': item['index'],
+                    'original_filename': item['original_filename'],
+                    'upload_url': None,
+                    'duplicate_of': _duplicate_info(duplicate),
+                    's3_key': item['s3_key'],
+                    'generated_filename': item['generated_filename'],
+                    's3_tags': _build_upload_tags(item, uploader_name)
+                })
+                continue
             
-            # 2. 请求 1080p 播放列表，获取分片列表
             try:
-                quality_key = f"{s3_key}!style:medium/1080p_medium.m3u8"
-                quality_url = s3_service.generate_signed_url(key=quality_key, expiration=600)
-                quality_resp = requests.get(quality_url, timeout=120)
-                
-                if quality_resp.status_code != 200:
-                    current_app.logger.warning(f'[Preheat] 1080p playlist failed: {quality_resp.status_code}')
-                    return
-                
-                # 3. 解析 m3u8 获取所有 .ts 分片
-                m3u8_content = quality_resp.text
-                segments = []
-                for line in m3u8_content.split('\n'):
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        if line.endswith('.ts') or '.ts' in line:
-                            segments.append(line)
-                
-                current_app.logger.info(f'[Preheat] Found {len(segments)} segments for: {s3_key}')
-                
-                # 4. 逐个预热所有 .ts 分片
-                segments_ok = 0
-                for segment in segments:
-                    try:
-                        segment_key = f"{s3_key}!style:medium/{segment}"
-                        segment_url = s3_service.generate_signed_url(key=segment_key, expiration=600)
-                        
-                        # 使用 Range 请求只获取前 1 字节，减少带宽
-                        seg_resp = requests.get(
-                            segment_url, 
-                            timeout=180,
-                            headers={'Range': 'bytes=0-0'}
-                        )
-                        
-                        if seg_resp.status_code in (200, 206):
-                            segments_ok += 1
-                    except Exception as e:
-                        current_app.logger.warning(f'[Preheat] Segment failed: {segment} - {str(e)}')
-                
-                current_app.logger.info(f'[Preheat] Preheated {segments_ok}/{len(segments)} segments for: {s3_key}')
-                
+                upload_url = s3_service.generate_presigned_upload_url(
+                    key=item['s3_key'],
+                    content_type=item['content_type'],
+                    expiration=3600  # 1 hour
+                )
             except Exception as e:
-                current_app.logger.warning(f'[Preheat] Failed to preheat 1080p: {str(e)}')
-                
+                current_app.logger.error(f'Failed to generate upload URL for {item["s3_key"]}: {str(e)}')
+                failed.append({
+                    'index': item['index'],
+                    'original_filename': item['original_filename'],
+                    'code': 'S3_001',
+                    'error': '生成上传链接失败'
+                })
+                continue
+            
+            succeeded.append({
+                'index': item['index'],
+                'original_filename': item['original_filename'],
+                'upload_url': upload_url,
+                's3_key': item['s3_key'],
+                'generated_filename': item['generated_filename'],
+                's3_tags': _build_upload_tags(item, uploader_name)
+            })
+        
+        failed.sort(key=lambda f: f['index'])
+        
+        current_app.logger.info(
+            f'Generated {len(succeeded)} upload URLs for user {current_user_id}, {len(failed)} failed'
+        )
+        
+        body = {
+            'expires_in': 3600,
+            'uploader_name': uploader_name,
+            'results': {
+                'succeeded': succeeded,
+                'failed': failed
+            }
+        }
+        
+        # Return appropriate status code
+        if len(failed) == 0:
+            return jsonify({
+                'success': True,
+                'message': f'成功生成 {len(succeeded)} 个上传链接',
+                **body
+            }), 200
+        elif len(succeeded) == 0:
+            return jsonify({
+                'success': False,
+                'code': 'BATCH_003',
+                'message': '所有文件均未通过校验',
+                **body
+            }), 400
+        else:
+            return jsonify({
+                'success': False,
+                'code': 'BATCH_003',
+                'message': f'部分文件失败: 成功 {len(succeeded)}, 失败 {len(failed)}',
+                **body
+            }), 207
+        
+    except Exception as e:
+        current_app.logger.error(f'Error generating batch upload URLs: {str(e)}')
+        return jsonify({
+            'error': {
+                'code': 'INTERNAL_ERROR',
+                'message': '生成上传链接失败，请稍后重试'
+            }
+        }), 500
+
+
+# Maximum number of part URLs signed per request
+MAX_PART_URL_BATCH = 1000
+
+
+def _multipart_session_or_404(session_id, current_user_id):
+    """Load the user's upload session, or return (None, error response)"""
+    from services.multipart_upload_service import multipart_upload_service
+    
+    session = multipart_upload_service.get_session(session_id, current_user_id)
+    if session is None:
+        return None, (jsonify({
+            'error': {
+                'code': 'UPLOAD_001',
+                'message': '上传会话不存在'
+            }
+        }), 404)
+    
+    if session.status != session.STATUS_ACTIVE:
+        return None, (jsonify({
+            'error': {
+                'code': 'UPLOAD_002',
+                'message': f'上传会话已结束 ({session.status})'
+            }
+        }), 400)
+    
+    return session, None
+
+
+@files_bp.route('/multipart', methods=['POST'])
+@jwt_required()
+def create_multipart_upload():
+    """
+    Start (or resume) a resumable multipart upload for a large file
+    
+    POST /api/files/multipart
+    Headers: Authorization: Bearer <token>
+    Body: same fields as POST /api/files/upload-url (including content_hash /
+    allow_duplicate: a duplicate is reported the same way and no session is created)
+    
+    The file is split into part_count parts of part_size bytes (the last one
+    may be smaller). Upload parts in parallel with PUT to their part URLs,
+    then call /multipart/<id>/complete and /confirm. An active session for
+    the same key and size started by the same user is resumed instead of
+    creating a new one.
+    
+    Returns:
+        201: Session created (first part URLs included)
+        200: Existing session resumed (uploaded_parts included)
+        400: Invalid input or validation failed
+        401: Unauthorized
+        500: S3 error
+    """
+    try:
+        current_user_id = int(get_jwt_identity())
+        
+        data = request.get_json()
+        
+        from services.tag_preset_service import tag_preset_service
+        from services.multipart_upload_service import multipart_upload_service
+        from files.upload_models import UploadSession
+        
+        valid_activity_types = tag_preset_service.get_display_names('activity_type')
+        
+        max_size = int(current_app.config.get('MULTIPART_MAX_SIZE', 20 * 1024 ** 3))
+        item, error = _validate_upload_item(data, valid_activity_types, max_size=max_size)
+        if error:
+            return jsonify({
+                'error': {
+                    'code': error[0],
+                    'message': error[1]
+                }
+            }), 400
+        
+        _assign_sequential_names([item])
+        
+        generated_filename = item['generated_filename']
+        s3_key = item['s3_key']
+        
+        # Check if file already exists in the same directory (activity_type/year/month),
+        # or another file's object is stored at the target key
+        existing_file = _find_name_conflict(item['directory'], generated_filename, s3_key=item['s3_key'])
+        
+        if existing_file:
+            return jsonify({
+                'error': {
+                    'code': 'FILE_005',
+                    'message': f'该目录下已存在同名文件: {generated_filename}'
+                }
+            }), 400
+        
+        from auth.models import User
+        uploader = User.query.get(current_user_id)
+        uploader_name = uploader.name if uploader else str(current_user_id)
+        
+        s3_tags = _build_upload_tags(item, uploader_name)
+        
+        # Same content already stored: offer to reference it instead of uploading again
+        if item['content_hash'] and not data.get('allow_duplicate'):
+            duplicate = content_hash_service.find_duplicate(item['content_hash'], item['size'])
+            if duplicate:
+                return jsonify({
+                    'success': True,
+                    'duplicate': True,
+                    'duplicate_of': _duplicate_info(duplicate),
+                    's3_key': s3_key,
+                    'generated_filename': generated_filename,
+                    's3_tags': s3_tags,
+                    'uploader_name': uploader_name
+                }), 200
+        
+        # Resume an unfinished upload of the same file
+        session = UploadSession.query.filter_by(
+            s3_key=s3_key,
+            uploader_id=current_user_id,
+            size=item['size'],
+            status=UploadSession.STATUS_ACTIVE
+        ).order_by(UploadSession.id.desc()).first()
+        
+        try:
+            if session is not None:
+                uploaded_parts = multipart_upload_service.uploaded_parts(session)
+                done = {part['part_number'] for part in uploaded_parts}
+                pending = [n for n in range(1, session.part_count + 1) if n not in done]
+                part_urls = multipart_upload_service.sign_parts(session, pending[:MAX_PART_URL_BATCH])
+                status_code = 200
+            else:
+                session = multipart_upload_service.create_session(
+                    s3_key=s3_key,
+                    uploader_id=current_user_id,
+                    original_filename=item['original_filename'],
+                    content_type=item['content_type'],
+                    size=item['size']
+                )
+                uploaded_parts = []
+                part_urls = multipart_upload_service.sign_parts(
+                    session, list(range(1, min(session.part_count, MAX_PART_URL_BATCH) + 1))
+                )
+                status_code = 201
+        except FileNotFoundError:
+            # S3 已丢弃该分片上传（例如被生命周期规则清理），作废会话后让客户端重新创建
+            session.status = UploadSession.STATUS_ABORTED
+            db.session.commit()
+            return jsonify({
+                'error': {
+                    'code': 'UPLOAD_002',
+                    'message': '上传会话已失效，请重新上传'
+                }
+            }), 409
         except Exception as e:
-            current_app.logger.error(f'[Preheat] Failed to trigger transcode for {s3_key}: {str(e)}')
-    
-    # 在后台线程执行，不阻塞上传响应
-    from flask import current_app
-    app = current_app._get_current_object()
-    
-    def run_with_context():
-        with app.app_context():
-            do_preheat()
-    
-    thread = threading.Thread(target=run_with_context)
-    thread.daemon = True
-    thread.start()
-
-
-# Create blueprint
-files_bp = Blueprint('files', __name__)
-
-
-# Exempt OPTIONS requests from rate limiting (for CORS preflight)
-@files_bp.before_request
-def handle_preflight():
-    if request.method == 'OPTIONS':
-        return '', 200
+            db.session.rollback()
+            current_app.logger.error(f'Failed to start multipart upload for {s3_key}: {str(e)}')
+            return jsonify({
+                'error': {
+                    'code': 'S3_001',
+                    'message': '创建分片上传失败'
+                }
+            }), 500
+        
+        current_app.logger.info(
+            f'{"Resumed" if status_code == 200 else "Started"} multipart upload for user {current_user_id}: '
+            f'{s3_key} ({session.part_count} parts of {session.part_size} bytes)'
+        )
+        
+        return jsonify({
+            'success': True,
+            'session': session.to_dict(),
+            's3_key': s3_key,
+            'generated_filename': generated_filename,
+            'part_urls': {str(n): url for n, url in part_urls.items()},
+            'uploaded_parts': uploaded_parts,
+            'expires_in': int(current_app.config.get('MULTIPART_URL_EXPIRATION', 3600)),
+            's3_tags': s3_tags,
+            'uploader_name': uploader_name
+        }), status_code
+        
+    except Exception as e:
+        current_app.logger.error(f'Error starting multipart upload: {str(e)}')
+        return jsonify({
+            'error': {
+                'code': 'INTERNAL_ERROR',
+                'message': '创建分片上传失败，请稍后重试'
+            }
+        }), 500
 
 
-@files_bp.route('/upload-url', methods=['POST'])
+@files_bp.route('/multipart/<int:session_id>', methods=['GET'])
 @jwt_required()
-def get_upload_url():
+def get_multipart_upload(session_id):
     """
-    Generate signed URL for file upload with automatic naming
+    Get an upload session and the parts S3 already has (to resume)
     
-    POST /api/files/upload-url
+    GET /api/files/multipart/<session_id>
     Headers: Authorization: Bearer <token>
-    Body: {
-        "original_filename": "IMG_1234.jpg",
-        "content_type": "image/jpeg",
-        "size": 1024000,
-        "activity_date": "2025-03-15",
-        "activity_type": "regular_training",
-        "instructor": "alex"
-    }
     
     Returns:
-        200: Signed upload URL generated successfully
-        400: Invalid input or validation failed
-        401: Unauthorized
-        500: URL generation failed
+        200: Session and uploaded parts
+        404: Session not found
     """
     try:
-        # Get current user ID from JWT
         current_user_id = int(get_jwt_identity())
         
-        # Get request data
-        data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ['original_filename', 'content_type', 'size', 'activity_date', 'activity_type']
-        for field in required_fields:
-            if not data or field not in data:
-                return jsonify({
-                    'error': {
-                        'code': 'VALIDATION_001',
-                        'message': f'缺少必填字段: {field}'
-                    }
-                }), 400
-        
-        original_filename = data['original_filename'].strip()
-        content_type = data['content_type'].strip()
-        size = data['size']
-        activity_date_str = data['activity_date'].strip()
-        activity_type = data['activity_type'].strip()
-        activity_name = data.get('activity_name', '').strip() if data.get('activity_name') else None
-        custom_filename = data.get('custom_filename', '').strip() if data.get('custom_filename') else None
+        from services.multipart_upload_service import multipart_upload_service
         
-        # Validate activity date format
-        try:
-            from datetime import datetime
-            activity_date = datetime.fromisoformat(activity_date_str).date()
-        except ValueError:
+        session = multipart_upload_service.get_session(session_id, current_user_id)
+        if session is None:
             return jsonify({
                 'error': {
-                    'code': 'FILE_007',
-                    'message': '活动日期格式无效，请使用 ISO 格式 (YYYY-MM-DD)'
+                    'code': 'UPLOAD_001',
+                    'message': '上传会话不存在'
                 }
-            }), 400
+            }), 404
         
-        # Validate tag presets
-        from services.tag_preset_service import tag_preset_service
+        uploaded_parts = []
+        if session.status == session.STATUS_ACTIVE:
+            try:
+                uploaded_parts = multipart_upload_service.uploaded_parts(session)
+            except FileNotFoundError:
+                uploaded_parts = []
+        
+        return jsonify({
+            'success': True,
+            'session': session.to_dict(),
+            'uploaded_parts': uploaded_parts
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f'Error getting multipart upload {session_id}: {str(e)}')
+        return jsonify({
+            'error': {
+                'code': 'INTERNAL_ERROR',
+                'message': '获取上传会话失败，请稍后重试'
+            }
+        }), 500
+
+
+@files_bp.route('/multipart/<int:session_id>/parts', methods=['POST'])
+@jwt_required()
+def sign_multipart_parts(session_id):
+    """
+    Presign upload URLs for parts of a multipart upload
+    
+    POST /api/files/multipart/<session_id>/parts
+    Headers: Authorization: Bearer <token>
+    Body: {"part_numbers": [101, 102, 103]}
+    
+    Returns:
+        200: {"part_urls": {"101": "https://...", ...}}
+        400: Invalid part numbers or session finished
+        404: Session not found
+    """
+    try:
+        current_user_id = int(get_jwt_identity())
+        
+        data = request.get_json()
+        part_numbers = data.get('part_numbers') if data else None
         
-        # Validate activity_type
-        activity_type_presets = tag_preset_service.get_active_presets('activity_type')
-        valid_activity_types = [preset.value for preset in activity_type_presets]
-        if activity_type not in valid_activity_types:
+        if not part_numbers or not isinstance(part_numbers, list):
             return jsonify({
                 'error': {
-                    'code': 'FILE_008',
-                    'message': f'活动类型无效。有效选项: {", ".join(valid_activity_types)}'
+                    'code': 'VALIDATION_001',
+                    'message': '缺少必填字段: part_numbers'
                 }
             }), 400
         
-        # Validate activity_name length if provided
-        if activity_name and len(activity_name) > 200:
+        if len(part_numbers) > MAX_PART_URL_BATCH:
             return jsonify({
                 'error': {
-                    'code': 'VALIDATION_001',
-                    'message': '活动名称过长（最多200字符）'
+                    'code': 'BATCH_002',
+                    'message': f'单次最多签名{MAX_PART_URL_BATCH}个分片'
                 }
             }), 400
         
-        # Extract and validate file extension
-        from services.file_naming_service import file_naming_service
-        import re
+        session, error_response = _multipart_session_or_404(session_id, current_user_id)
+        if error_response:
+            return error_response
+        
+        from services.multipart_upload_service import multipart_upload_service
         
         try:
-            file_extension = file_naming_service.extract_extension(original_filename)
+            part_urls = multipart_upload_service.sign_parts(session, part_numbers)
         except ValueError as e:
             return jsonify({
                 'error': {
@@ -210,135 +936,147 @@ def get_upload_url():
                 }
             }), 400
         
-        extension_validation = validate_file_extension(original_filename)
-        if not extension_validation['valid']:
-            current_app.logger.warning(f'File extension validation failed: {extension_validation["message"]}')
-            response = jsonify({
-                'error': {
-                    'code': 'VALIDATION_001',
-                    'message': extension_validation['message']
-                }
-            })
-            response.status_code = 400
-            return response
+        return jsonify({
+            'success': True,
+            'part_urls': {str(n): url for n, url in part_urls.items()},
+            'expires_in': int(current_app.config.get('MULTIPART_URL_EXPIRATION', 3600))
+        }), 200
         
-        # Validate custom filename if provided
-        if custom_filename:
-            # Check for invalid characters
-            if re.search(r'[<>:"/\\|?*\x00-\x1f]', custom_filename):
-                return jsonify({
-                    'error': {
-                        'code': 'VALIDATION_001',
-                        'message': '自定义文件名包含非法字符'
-                    }
-                }), 400
-            
-            # Check length
-            if len(custom_filename) > 200:
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error signing parts for multipart upload {session_id}: {str(e)}')
+        return jsonify({
+            'error': {
+                'code': 'S3_001',
+                'message': '生成分片上传链接失败'
+            }
+        }), 500
+
+
+@files_bp.route('/multipart/<int:session_id>/complete', methods=['POST'])
+@jwt_required()
+def complete_multipart_upload(session_id):
+    """
+    Assemble the uploaded parts into the final object
+    
+    POST /api/files/multipart/<session_id>/complete
+    Headers: Authorization: Bearer <token>
+    Body: {"parts": [{"part_number": 1, "etag": "\"abc...\""}, ...]}   // optional
+    
+    When parts are omitted, the part list is read from S3. Call
+    POST /api/files/confirm with the session's s3_key afterwards.
+    
+    Returns:
+        200: Object assembled
+        400: Parts missing or session finished
+        404: Session not found
+        500: S3 error
+    """
+    try:
+        current_user_id = int(get_jwt_identity())
+        
+        data = request.get_json(silent=True) or {}
+        
+        parts = None
+        if data.get('parts'):
+            try:
+                parts = [
+                    {'part_number': int(part['part_number']), 'etag': str(part['etag'])}
+                    for part in data['parts']
+                ]
+            except (KeyError, TypeError, ValueError):
                 return jsonify({
                     'error': {
                         'code': 'VALIDATION_001',
-                        'message': '自定义文件名过长（最多200字符）'
+                        'message': '分片列表格式无效'
                     }
                 }), 400
         
-        # Validate file size (max 2GB)
-        max_size = 2 * 1024 * 1024 * 1024  # 2GB in bytes
-        if size > max_size:
-            return jsonify({
-                'error': {
-                    'code': 'VALIDATION_001',
-                    'message': f'文件大小超过限制 (最大 2GB)'
-                }
-            }), 400
-        
-        # Generate filename: use custom name if provided, otherwise use original filename
-        if custom_filename:
-            generated_filename = f"{custom_filename}{file_extension}"
-        else:
-            # Use original filename (without path, just the name)
-            generated_filename = original_filename.split('/')[-1].split('\\')[-1]
-        
-        # Construct directory path based on tags: /{activity_type}/{year}/{month}/
-        year = activity_date.year
-        month = f"{activity_date.month:02d}"  # Zero-padded month (01-12)
-        directory_path = f"{activity_type}/{year}/{month}"
-        
-        # Construct S3 key (path in bucket)
-        s3_key = f"{directory_path}/{generated_filename}"
+        session, error_response = _multipart_session_or_404(session_id, current_user_id)
+        if error_response:
+            return error_response
         
-        # Check if file already exists in the same directory (same activity_type, year, month, and filename)
-        existing_file = File.query.filter_by(
-            activity_type=activity_type
-        ).filter(
-            db.func.extract('year', File.activity_date) == year,
-            db.func.extract('month', File.activity_date) == activity_date.month,
-            File.filename == generated_filename
-        ).first()
+        from services.multipart_upload_service import multipart_upload_service
         
-        if existing_file:
-            current_app.logger.warning(f'File already exists: {generated_filename}')
-            response = jsonify({
+        try:
+            multipart_upload_service.complete(session, parts)
+        except ValueError as e:
+            return jsonify({
                 'error': {
-                    'code': 'FILE_005',
-                    'message': f'该目录下已存在同名文件: {generated_filename}'
+                    'code': 'UPLOAD_003',
+                    'message': str(e)
                 }
-            })
-            response.status_code = 400
-            return response
-        
-        # Get uploader information
-        from auth.models import User
-        uploader = User.query.get(current_user_id)
-        uploader_name = uploader.name if uploader else str(current_user_id)
-        
-        # Build S3 tags dictionary
-        s3_tags = {
-            'activity_date': activity_date_str,
-            'activity_type': activity_type,
-            'activity_name': activity_name or '',
-            'uploader_name': uploader_name,
-            'upload_timestamp': datetime.utcnow().isoformat() + 'Z',
-            'original_filename': original_filename
-        }
-        
-        # Generate signed upload URL without tags (simpler, more reliable)
-        # Tags will be applied after upload confirmation
-        try:
-            upload_url = s3_service.generate_presigned_upload_url(
-                key=s3_key,
-                content_type=content_type,
-                expiration=3600  # 1 hour
-            )
-        except Exception as e:
-            current_app.logger.error(f'Failed to generate upload URL: {str(e)}')
+            }), 400
+        except FileNotFoundError:
+            session.status = session.STATUS_ABORTED
+            db.session.commit()
             return jsonify({
                 'error': {
-                    'code': 'S3_001',
-                    'message': '生成上传链接失败'
+                    'code': 'UPLOAD_002',
+                    'message': '上传会话已失效，请重新上传'
                 }
-            }), 500
+            }), 409
         
         current_app.logger.info(
-            f'Generated upload URL for user {current_user_id}: {s3_key} (activity: {activity_date_str})'
+            f'Completed multipart upload for user {current_user_id}: {session.s3_key}'
         )
         
         return jsonify({
             'success': True,
-            'upload_url': upload_url,
-            's3_key': s3_key,
-            'generated_filename': generated_filename,
-            'expires_in': 3600,
-            's3_tags': s3_tags,  # Return tags for confirmation step
-            'uploader_name': uploader_name
+            'message': '分片上传完成',
+            'session': session.to_dict(),
+            's3_key': session.s3_key
         }), 200
         
     except Exception as e:
-        current_app.logger.error(f'Error generating upload URL: {str(e)}')
+        db.session.rollback()
+        current_app.logger.error(f'Error completing multipart upload {session_id}: {str(e)}')
         return jsonify({
             'error': {
-                'code': 'INTERNAL_ERROR',
-                'message': '生成上传链接失败，请稍后重试'
+                'code': 'S3_001',
+                'message': '合并分片失败，请稍后重试'
+            }
+        }), 500
+
+
+@files_bp.route('/multipart/<int:session_id>', methods=['DELETE'])
+@jwt_required()
+def abort_multipart_upload(session_id):
+    """
+    Abort a multipart upload and discard its uploaded parts
+    
+    DELETE /api/files/multipart/<session_id>
+    Headers: Authorization: Bearer <token>
+    
+    Returns:
+        200: Upload aborted
+        400: Session already finished
+        404: Session not found
+    """
+    try:
+        current_user_id = int(get_jwt_identity())
+        
+        session, error_response = _multipart_session_or_404(session_id, current_user_id)
+        if error_response:
+            return error_response
+        
+        from services.multipart_upload_service import multipart_upload_service
+        multipart_upload_service.abort(session)
+        
+        current_app.logger.info(f'Aborted multipart upload for user {current_user_id}: {session.s3_key}')
+        
+        return jsonify({
+            'success': True,
+            'message': '已取消上传'
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error aborting multipart upload {session_id}: {str(e)}')
+        return jsonify({
+            'error': {
+                'code': 'S3_001',
+                'message': '取消上传失败，请稍后重试'
             }
         }), 500
 
@@ -358,9 +1096,18 @@ def confirm_upload():
         "original_filename": "IMG_1234.jpg",
         "activity_date": "2025-03-15",
         "activity_type": "regular_training",
-        "instructor": "alex"
+        "instructor": "alex",
+        "content_hash": "9f86d08...",   // optional, hex SHA-256 of the file
+        "source_file_id": 123           // optional, reference this file's object instead of an upload
     }
     
+    With source_file_id (offered as "duplicate_of" by /upload-url), nothing
+    was uploaded: the new record is placed at s3_key's directory and name
+    but references the source file's object. content_hash and size must
+    match the source file. A claimed content_hash is only used for that
+    check and is not stored: the hash of an uploaded object is computed
+    from the object itself by flask backfill-content-hash.
+    
     Returns:
         201: File metadata saved successfully
         400: Invalid input
@@ -406,11 +1153,24 @@ def confirm_upload():
                 }
             }), 400
         
+        try:
+            content_hash = content_hash_service.normalize(data.get('content_hash'))
+        except ValueError as e:
+            return jsonify({
+                'error': {
+                    'code': 'VALIDATION_001',
+                    'message': str(e)
+                }
+            }), 400
+        
         # Extract generated filename from s3_key
         filename = s3_key.split('/')[-1]
         
+        # Extract directory from s3_key (everything except the filename)
+        directory_from_key = '/'.join(s3_key.split('/')[:-1])
+        
         # Check if file already exists in database
-        existing_file = File.query.filter_by(s3_key=s3_key).first()
+        existing_file = _find_name_conflict(directory_from_key, filename, s3_key=s3_key)
         if existing_file:
             return jsonify({
                 'error': {
@@ -419,56 +1179,32 @@ def confirm_upload():
                 }
             }), 400
         
-        # Apply tags to the uploaded file
-        from auth.models import User
-        uploader = User.query.get(current_user_id)
-        uploader_name = uploader.name if uploader else str(current_user_id)
-        
-        s3_tags = {
-            'activity_date': activity_date_str,
-            'activity_type': activity_type,
-            'activity_name': activity_name or '',
-            'uploader_name': uploader_name,
-            'upload_timestamp': datetime.utcnow().isoformat() + 'Z',
-            'original_filename': original_filename
-        }
+        # Reference an existing object with the same content instead of an uploaded one
+        source_file = None
+        if data.get('source_file_id'):
+            source_file = content_hash_service.load_sources(
+                [(data['source_file_id'], content_hash, size)]
+            ).get(data['source_file_id'])
+            if source_file is None:
+                return jsonify({
+                    'error': {
+                        'code': 'FILE_011',
+                        'message': '源文件不存在或内容不一致'
+                    }
+                }), 400
         
-        try:
-            s3_service.update_object_tags(s3_key, s3_tags)
-        except Exception as e:
-            current_app.logger.warning(f'Failed to apply tags to {s3_key}: {str(e)}')
-            # Don't fail the upload if tagging fails
+        stored_key = source_file.s3_key if source_file else s3_key
         
         # Generate public URL
         bucket = s3_service.get_bucket_name()
         endpoint = current_app.config.get('S3_ENDPOINT', 'https://s3.bitiful.net')
-        public_url = f"{endpoint}/{bucket}/{s3_key}"
-        
-        # Extract directory from s3_key (everything except the filename)
-        directory_from_key = '/'.join(s3_key.split('/')[:-1])
-        
-        # Fetch thumbhash for image/video files (using Bitiful's thumbhash service)
-        thumbhash = None
-        if content_type.startswith('image/') or content_type.startswith('video/'):
-            try:
-                import requests
-                # For video, use frame extraction; for image, direct thumbhash
-                thumbhash_url = f"https://{bucket}.s3.bitiful.net/{s3_key}?fmt=thumbhash"
-                if content_type.startswith('video/'):
-                    thumbhash_url = f"https://{bucket}.s3.bitiful.net/{s3_key}?frame=100&fmt=thumbhash"
-                
-                resp = requests.get(thumbhash_url, timeout=5)
-                if resp.status_code == 200:
-                    thumbhash = resp.text.strip()
-                    current_app.logger.info(f'Got thumbhash for {s3_key}: {thumbhash[:20]}...')
-            except Exception as e:
-                current_app.logger.warning(f'Failed to get thumbhash for {s3_key}: {str(e)}')
+        public_url = f"{endpoint}/{bucket}/{stored_key}"
         
         # Create file record with new fields
         file = File(
             filename=filename,
             directory=directory_from_key,
-            s3_key=s3_key,
+            s3_key=stored_key,
             size=size,
             content_type=content_type,
             uploader_id=current_user_id,
@@ -478,10 +1214,17 @@ def confirm_upload():
             activity_date=activity_date,
             activity_type=activity_type,
             activity_name=activity_name,
-            is_legacy=False,  # Mark as new system file
-            thumbhash=thumbhash
+            is_legacy=False  # Mark as new system file
         )
         
+        if source_file:
+            # Same object: its (server-computed) hash, thumbhash and HLS renditions are shared too
+            file.content_hash = source_file.content_hash
+            file.content_type = source_file.content_type
+            file.thumbhash = source_file.thumbhash
+            file.hls_state = source_file.hls_state
+            file.hls_checked_at = source_file.hls_checked_at
+        
         db.session.add(file)
         db.session.flush()  # Get file ID before commit
         
@@ -490,7 +1233,7 @@ def confirm_upload():
             user_id=current_user_id,
             operation=OperationType.UPLOAD,
             file_id=file.id,
-            file_path=s3_key,
+            file_path=stored_key,
             ip_address=request.remote_addr,
             user_agent=request.headers.get('User-Agent')
         )
@@ -498,25 +1241,43 @@ def confirm_upload():
         db.session.add(log)
         db.session.commit()
         
-        current_app.logger.info(
-            f'File uploaded by user {current_user_id}: {s3_key} (activity: {activity_date_str}, type: {activity_type})'
-        )
+        if source_file:
+            current_app.logger.info(
+                f'File linked by user {current_user_id}: {s3_key} -> {stored_key} (source file {source_file.id})'
+            )
+        else:
+            current_app.logger.info(
+                f'File uploaded by user {current_user_id}: {s3_key} (activity: {activity_date_str}, type: {activity_type})'
+            )
+        
+        if source_file:
+            # 引用已有对象：不重新打标签（标签属于源文件），也不重新转码
+            if file.thumbhash is None:
+                try:
+                    from services.thumbhash_service import thumbhash_service
+                    thumbhash_service.schedule([file.id])
+                except Exception as e:
+                    current_app.logger.warning(f'Failed to schedule thumbhash for {s3_key}: {str(e)}')
+        else:
+            # S3 打标签和 thumbhash 在后台完成，确认请求不再等待 S3 写入
+            try:
+                from services.upload_postprocess_service import upload_postprocess_service
+                upload_postprocess_service.schedule([file.id])
+            except Exception as e:
+                current_app.logger.warning(f'Failed to schedule upload post-processing for {s3_key}: {str(e)}')
         
-        # 如果是视频文件，触发 HLS 转码预热
-        if content_type.startswith('video/'):
+        # 如果是视频文件，触发 HLS 转码预热（后台有界队列，不阻塞上传响应）
+        if content_type.startswith('video/') and not source_file:
             try:
-                _trigger_video_transcode_preheat(s3_key)
+                from services.preheat_job_service import preheat_job_service
+                preheat_job_service.trigger(file.id, s3_key)
             except Exception as e:
                 current_app.logger.warning(f'Failed to trigger transcode preheat for {s3_key}: {str(e)}')
         
         # Get tag preset display names for response
         from services.tag_preset_service import tag_preset_service
         
-        activity_type_preset = next(
-            (p for p in tag_preset_service.get_active_presets('activity_type') if p.value == activity_type),
-            None
-        )
-        activity_type_display = activity_type_preset.display_name if activity_type_preset else activity_type
+        activity_type_display = tag_preset_service.get_display_name('activity_type', activity_type)
         
         # Build response with display names
         file_dict = file.to_dict(include_uploader=True)
@@ -539,6 +1300,346 @@ def confirm_upload():
         }), 500
 
 
+@files_bp.route('/confirm-batch', methods=['POST'])
+@jwt_required()
+def confirm_upload_batch():
+    """
+    Confirm many uploads and save their metadata in one transaction
+    
+    POST /api/files/confirm-batch
+    Headers: Authorization: Bearer <token>
+    Body: {
+        "activity_date": "2025-03-15",          // optional, default for every file
+        "activity_type": "regular_training",    // optional, default for every file
+        "activity_name": "周末特训",              // optional, default for every file
+        "files": [
+            {"s3_key": "regular_training/2025/03/2025-03-15_IMG_1234.jpg", "size": 1024000,
+             "content_type": "image/jpeg", "original_filename": "IMG_1234.jpg",
+             "content_hash": "9f86d08...", "source_file_id": 123}
+        ]
+    }
+    
+    Existing keys are checked with one query and files and logs are written
+    with bulk INSERTs; S3 tagging and thumbhash are applied in the background
+    afterwards, so new files may briefly have no thumbhash. content_hash and
+    source_file_id are optional and work as in POST /api/files/confirm.
+    
+    Returns:
+        200: All files saved
+        207: Partial success (some files failed validation)
+        400: Invalid input or every file failed
+        401: Unauthorized
+        500: Save failed
+    """
+    try:
+        current_user_id = int(get_jwt_identity())
+        
+        data = request.get_json()
+        
+        if not data or 'files' not in data:
+            return jsonify({
+                'error': {
+                    'code': 'BATCH_001',
+                    'message': '缺少必填字段: files'
+                }
+            }), 400
+        
+        descriptors = data['files']
+        
+        if not descriptors or not isinstance(descriptors, list):
+            return jsonify({
+                'error': {
+                    'code': 'BATCH_001',
+                    'message': '文件列表不能为空'
+                }
+            }), 400
+        
+        if len(descriptors) > MAX_UPLOAD_URL_BATCH:
+            return jsonify({
+                'error': {
+                    'code': 'BATCH_002',
+                    'message': f'批量操作限制最多{MAX_UPLOAD_URL_BATCH}个文件'
+                }
+            }), 400
+        
+        shared = {
+            field: data[field]
+            for field in ('activity_date', 'activity_type', 'activity_name')
+            if data.get(field)
+        }
+        
+        required_fields = ['s3_key', 'size', 'content_type', 'original_filename',
+                           'activity_date', 'activity_type']
+        
+        failed = []
+        items = []
+        for index, descriptor in enumerate(descriptors):
+            if not isinstance(descriptor, dict):
+                failed.append({'index': index, 'code': 'VALIDATION_001', 'error': '文件描述格式无效'})
+                continue
+            
+            item = {**shared, **descriptor}
+            missing = next((field for field in required_fields if item.get(field) in (None, '')), None)
+            if missing:
+                failed.append({
+                    'index': index,
+                    's3_key': descriptor.get('s3_key'),
+                    'code': 'VALIDATION_001',
+                    'error': f'缺少必填字段: {missing}'
+                })
+                continue
+            
+            size = item['size']
+            if not isinstance(size, int) or isinstance(size, bool) or size < 0:
+                failed.append({
+                    'index': index,
+                    's3_key': descriptor.get('s3_key'),
+                    'code': 'VALIDATION_001',
+                    'error': '文件大小必须是非负整数'
+                })
+                continue
+            
+            source_file_id = item.get('source_file_id')
+            if source_file_id is not None and (not isinstance(source_file_id, int) or isinstance(source_file_id, bool)):
+                failed.append({
+                    'index': index,
+                    's3_key': descriptor.get('s3_key'),
+                    'code': 'VALIDATION_001',
+                    'error': 'source_file_id 必须是整数'
+                })
+                continue
+            
+            try:
+                activity_date = datetime.fromisoformat(str(item['activity_date']).strip()).date()
+            except ValueError:
+                failed.append({
+                    'index': index,
+                    's3_key': descriptor.get('s3_key'),
+                    'code': 'FILE_007',
+                    'error': '活动日期格式无效'
+                })
+                continue
+            
+            try:
+                content_hash = content_hash_service.normalize(item.get('content_hash'))
+            except ValueError as e:
+                failed.append({
+                    'index': index,
+                    's3_key': descriptor.get('s3_key'),
+                    'code': 'VALIDATION_001',
+                    'error': str(e)
+                })
+                continue
+            
+            items.append({
+                'index': index,
+                's3_key': str(item['s3_key']).strip(),
+                'size': size,
+                'content_type': str(item['content_type']).strip(),
+                'original_filename': str(item['original_filename']).strip(),
+                'activity_date': activity_date,
+                'activity_type': str(item['activity_type']).strip(),
+                'activity_name': str(item['activity_name']).strip() if item.get('activity_name') else None,
+                'content_hash': content_hash,
+                'source_file_id': source_file_id
+            })
+        
+        # One lookup for every key of the batch
+        existing_keys = set()
+        if items:
+            keys = {item['s3_key'] for item in items}
+            existing_keys = {
+                row.s3_key for row in db.session.query(File.s3_key).filter(File.s3_key.in_(keys))
+            }
+            # Deduplicated files keep the source's s3_key, so also match their directory/name
+            existing_keys.update(
+                f'{directory}/{filename}' for directory, filename in _existing_names(
+                    key.rsplit('/', 1) for key in keys if '/' in key
+                )
+            )
+        
+        # One lookup for every referenced source file
+        sources = content_hash_service.load_sources(
+            (item['source_file_id'], item['content_hash'], item['size'])
+            for item in items if item['source_file_id']
+        )
+        
+        bucket = s3_service.get_bucket_name()
+        endpoint = current_app.config.get('S3_ENDPOINT', 'https://s3.bitiful.net')
+        now = datetime.utcnow()
+        
+        rows = []
+        accepted = []
+        for item in items:
+            s3_key = item['s3_key']
+            
+            # Also rejects the same key listed twice in this batch
+            if s3_key in existing_keys:
+                failed.append({
+                    'index': item['index'],
+                    's3_key': s3_key,
+                    'code': 'FILE_005',
+                    'error': '文件已存在'
+                })
+                continue
+            existing_keys.add(s3_key)
+            
+            source = None
+            if item['source_file_id']:
+                source = sources.get(item['source_file_id'])
+                if source is None:
+                    failed.append({
+                        'index': item['index'],
+                        's3_key': s3_key,
+                        'code': 'FILE_011',
+                        'error': '源文件不存在或内容不一致'
+                    })
+                    continue
+            
+            # Deduplicated files reference the source's object, thumbhash and HLS renditions
+            stored_key = source.s3_key if source else s3_key
+            rows.append({
+                'filename': s3_key.split('/')[-1],
+                'directory': '/'.join(s3_key.split('/')[:-1]),
+                's3_key': stored_key,
+                'size': item['size'],
+                'content_type': source.content_type if source else item['content_type'],
+                'uploader_id': current_user_id,
+                'uploaded_at': now,
+                'public_url': f"{endpoint}/{bucket}/{stored_key}",
+                'original_filename': item['original_filename'],
+                'activity_date': item['activity_date'],
+                'activity_type': item['activity_type'],
+                'activity_name': item['activity_name'],
+                'is_legacy': False,  # Mark as new system file
+                # The client's claimed hash is never stored; uploads are hashed by backfill-content-hash
+                'content_hash': source.content_hash if source else None,
+                'thumbhash': source.thumbhash if source else None,
+                'hls_state': source.hls_state if source else None,
+                'hls_checked_at': source.hls_checked_at if source else None
+            })
+            item['linked'] = source is not None
+            accepted.append(item)
+        
+        file_ids = {}
+        if rows:
+            from sqlalchemy import insert
+            
+            inserted = db.session.execute(
+                insert(File).returning(File.id, sort_by_parameter_order=True),
+                rows
+            ).all()
+            # Keyed by the requested s3_key (deduplicated rows share their stored key)
+            file_ids = {item['s3_key']: row.id for item, row in zip(accepted, inserted)}
+            
+            ip_address = request.remote_addr
+            user_agent = request.headers.get('User-Agent')
+            db.session.execute(insert(FileLog), [
+                {
+                    'user_id': current_user_id,
+                    'file_id': file_ids[item['s3_key']],
+                    'operation': OperationType.UPLOAD,
+                    'file_path': row['s3_key'],
+                    'timestamp': now,
+                    'ip_address': ip_address,
+                    'user_agent': user_agent
+                }
+                for item, row in zip(accepted, rows)
+            ])
+            
+            db.session.commit()
+        
+        current_app.logger.info(
+            f'Batch upload confirmed by user {current_user_id}: {len(rows)} files saved, {len(failed)} failed'
+        )
+        
+        succeeded = []
+        if rows:
+            # Tagging / thumbhash / transcode preheat run in the background;
+            # deduplicated files already share the source's tags and renditions
+            uploaded = [item for item in accepted if not item['linked']]
+            try:
+                from services.upload_postprocess_service import upload_postprocess_service
+                from services.thumbhash_service import thumbhash_service
+                upload_postprocess_service.schedule(file_ids[item['s3_key']] for item in uploaded)
+                thumbhash_service.schedule(
+                    file_ids[item['s3_key']] for item, row in zip(accepted, rows)
+                    if item['linked'] and row['thumbhash'] is None
+                )
+            except Exception as e:
+                current_app.logger.warning(f'Failed to schedule upload post-processing: {str(e)}')
+            
+            videos = [
+                (file_ids[item['s3_key']], item['s3_key'])
+                for item in uploaded if item['content_type'].startswith('video/')
+            ]
+            if videos:
+                try:
+                    from services.preheat_job_service import preheat_job_service
+                    preheat_job_service.trigger_many(videos)
+                except Exception as e:
+                    current_app.logger.warning(f'Failed to trigger transcode preheat: {str(e)}')
+            
+            from services.tag_preset_service import tag_preset_service
+            
+            activity_type_display = tag_preset_service.get_display_names('activity_type')
+            
+            files = {
+                file.id: file
+                for file in File.query.filter(File.id.in_(list(file_ids.values()))).all()
+            }
+            for item in accepted:
+                file_dict = files[file_ids[item['s3_key']]].to_dict(include_uploader=True)
+                file_dict['activity_type_display'] = activity_type_display.get(
+                    item['activity_type'], item['activity_type']
+                )
+                succeeded.append({
+                    'index': item['index'],
+                    's3_key': item['s3_key'],
+                    'file': file_dict
+                })
+        
+        failed.sort(key=lambda f: f['index'])
+        
+        body = {
+            'results': {
+                'succeeded': succeeded,
+                'failed': failed
+            }
+        }
+        
+        # Return appropriate status code
+        if len(failed) == 0:
+            return jsonify({
+                'success': True,
+                'message': f'成功保存 {len(succeeded)} 个文件',
+                **body
+            }), 200
+        elif len(succeeded) == 0:
+            return jsonify({
+                'success': False,
+                'code': 'BATCH_003',
+                'message': '所有文件均未通过校验',
+                **body
+            }), 400
+        else:
+            return jsonify({
+                'success': False,
+                'code': 'BATCH_003',
+                'message': f'部分文件失败: 成功 {len(succeeded)}, 失败 {len(failed)}',
+                **body
+            }), 207
+        
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error confirming batch upload: {str(e)}')
+        return jsonify({
+            'error': {
+                'code': 'FILE_004',
+                'message': '保存文件信息失败，请稍后重试'
+            }
+        }), 500
+
 
 @files_bp.route('', methods=['GET'])
 @jwt_required()
@@ -734,8 +1835,8 @@ def list_files():
         from services.tag_preset_service import tag_preset_service
         
         # Get all active presets for display name mapping
-        activity_type_presets = {p.value: p.display_name for p in tag_preset_service.get_active_presets('activity_type')}
-        instructor_presets = {p.value: p.display_name for p in tag_preset_service.get_active_presets('instructor')}
+        activity_type_presets = tag_preset_service.get_display_names('activity_type')
+        instructor_presets = tag_preset_service.get_display_names('instructor')
         
         files = []
         for file in pagination.items:
@@ -905,18 +2006,10 @@ def get_file(file_id):
         from services.tag_preset_service import tag_preset_service
         
         if file.activity_type:
-            activity_type_preset = next(
-                (p for p in tag_preset_service.get_active_presets('activity_type') if p.value == file.activity_type),
-                None
-            )
-            file_dict['activity_type_display'] = activity_type_preset.display_name if activity_type_preset else file.activity_type
+            file_dict['activity_type_display'] = tag_preset_service.get_display_name('activity_type', file.activity_type)
         
         if file.instructor:
-            instructor_preset = next(
-                (p for p in tag_preset_service.get_active_presets('instructor') if p.value == file.instructor),
-                None
-            )
-            file_dict['instructor_display'] = instructor_preset.display_name if instructor_preset else file.instructor
+            file_dict['instructor_display'] = tag_preset_service.get_display_name('instructor', file.instructor)
         
         current_app.logger.info(
             f'User {current_user_id} retrieved file {file_id}'
@@ -983,7 +2076,7 @@ def delete_file(file_id):
         
         # Delete file from S3
         try:
-            s3_service.delete_file(file.s3_key)
+            content_hash_service.delete_object(file.s3_key, file.id)
         except Exception as e:
             current_app.logger.error(f'Failed to delete file from S3: {str(e)}')
             return jsonify({
@@ -1005,7 +2098,11 @@ def delete_file(file_id):
         
         db.session.add(log)
         
-        # Delete file record from database
+        # Delete the file's tag associations (keeping tag usage counts exact) and preheat job, then the record
+        from services.preheat_job_service import preheat_job_service
+        from services.tag_service import tag_service
+        tag_service.detach_files([file.id])
+        preheat_job_service.delete_for_files([file.id])
         db.session.delete(file)
         db.session.commit()
         
@@ -1052,7 +2149,7 @@ def get_directories():
         from services.tag_preset_service import tag_preset_service
         
         # Get activity type display names
-        activity_type_presets = {p.value: p.display_name for p in tag_preset_service.get_active_presets('activity_type')}
+        activity_type_presets = tag_preset_service.get_display_names('activity_type')
         
         # Get file counts grouped by year, month, date, activity_name, activity_type
         file_stats = db.session.query(
@@ -1208,6 +2305,8 @@ def update_file(file_id):
         404: File not found
         500: Update failed
     """
+    # Object copied to a new key, discarded if the update fails before its commit
+    copied_keys = []
     try:
         # Get current user ID from JWT
         current_user_id = int(get_jwt_identity())
@@ -1273,8 +2372,7 @@ def update_file(file_id):
             
             # Validate activity_type
             from services.tag_preset_service import tag_preset_service
-            activity_type_presets = tag_preset_service.get_active_presets('activity_type')
-            valid_activity_types = [preset.value for preset in activity_type_presets]
+            valid_activity_types = tag_preset_service.get_display_names('activity_type')
             
             if activity_type not in valid_activity_types:
                 return jsonify({
@@ -1294,8 +2392,7 @@ def update_file(file_id):
             
             # Validate instructor
             from services.tag_preset_service import tag_preset_service
-            instructor_presets = tag_preset_service.get_active_presets('instructor')
-            valid_instructors = [preset.value for preset in instructor_presets]
+            valid_instructors = tag_preset_service.get_display_names('instructor')
             
             if instructor not in valid_instructors:
                 return jsonify({
@@ -1380,21 +2477,10 @@ def update_file(file_id):
                     }
                 }), 400
             
-            # Get current tag names
-            current_tag_names = set(t.name for t in file.tags)
-            new_tag_names = set(t.strip() for t in new_tags if t and t.strip())
-            
-            # Remove tags that are no longer in the list
-            for tag in list(file.tags):
-                if tag.name not in new_tag_names:
-                    tag_service.remove_tag_from_file(file.id, tag.id)
-                    tags_updated = True
-            
-            # Add new tags
-            for tag_name in new_tag_names:
-                if tag_name not in current_tag_names:
-                    tag_service.add_tag_to_file(file.id, tag_name, current_user_id)
-                    tags_updated = True
+            # Only compared here: the diff is written right before the commit, after the
+            # S3 calls, since tag writes hold the shared 'tags' cache version row until then
+            wanted_tags = {name.strip() for name in new_tags if isinstance(name, str) and name.strip()}
+            tags_updated = wanted_tags != {tag.name for tag in file.tags}
             
             if tags_updated:
                 changes_made = True
@@ -1407,6 +2493,7 @@ def update_file(file_id):
             }), 200
         
         # Update directory path and S3 key if activity_type, activity_date, or filename changed
+        move_batch = None
         if file.activity_date and file.activity_type:
             year = file.activity_date.year
             month = f"{file.activity_date.month:02d}"
@@ -1425,10 +2512,9 @@ def update_file(file_id):
                 new_s3_key = f"{file.directory}/{file.filename}"
                 
                 # Check if new location already has a file with same name
-                existing_file = File.query.filter(
-                    File.s3_key == new_s3_key,
-                    File.id != file_id
-                ).first()
+                existing_file = _find_name_conflict(
+                    file.directory, file.filename, exclude_id=file_id, s3_key=new_s3_key
+                )
                 
                 if existing_file:
                     return jsonify({
@@ -1438,25 +2524,25 @@ def update_file(file_id):
                         }
                     }), 400
                 
-                # Move/rename file in S3
-                try:
-                    s3_service.copy_file(old_s3_key, new_s3_key)
-                    s3_service.delete_file(old_s3_key)
-                    file.s3_key = new_s3_key
-                    
-                    # Update public URL
-                    bucket = s3_service.get_bucket_name()
-                    endpoint = current_app.config.get('S3_ENDPOINT', 'https://s3.bitiful.net')
-                    file.public_url = f"{endpoint}/{bucket}/{new_s3_key}"
-                    
-                except Exception as e:
-                    current_app.logger.error(f'Failed to move/rename file in S3: {str(e)}')
+                # Copy to the new key; the old key is deleted after the commit
+                copy_errors = move_service.copy_objects([(old_s3_key, new_s3_key)])
+                if copy_errors:
+                    current_app.logger.error(f'Failed to move/rename file in S3: {copy_errors[new_s3_key]}')
                     return jsonify({
                         'error': {
                             'code': 'S3_001',
                             'message': '移动/重命名文件失败'
                         }
                     }), 500
+                copied_keys.append(new_s3_key)
+                
+                file.s3_key = new_s3_key
+                move_batch = move_service.record([(file.id, old_s3_key, new_s3_key)])
+                
+                # Update public URL
+                bucket = s3_service.get_bucket_name()
+                endpoint = current_app.config.get('S3_ENDPOINT', 'https://s3.bitiful.net')
+                file.public_url = f"{endpoint}/{bucket}/{new_s3_key}"
         
         # Update S3 tags
         from auth.models import User
@@ -1478,6 +2564,10 @@ def update_file(file_id):
             current_app.logger.warning(f'Failed to update tags for {file.s3_key}: {str(e)}')
             # Don't fail the update if tagging fails
         
+        # Replace the file's tags; committed together with the other changes
+        if tags_updated:
+            tag_service.set_file_tags([file.id], new_tags, current_user_id, commit=False)
+        
         # Create log entry
         log = FileLog.create_log(
             user_id=current_user_id,
@@ -1491,6 +2581,9 @@ def update_file(file_id):
         db.session.add(log)
         db.session.commit()
         
+        if move_batch:
+            move_service.finish(move_batch)
+        
         current_app.logger.info(
             f'User {current_user_id} updated file {file_id}: {file.s3_key}'
         )
@@ -1498,17 +2591,8 @@ def update_file(file_id):
         # Get tag preset display names for response
         from services.tag_preset_service import tag_preset_service
         
-        activity_type_preset = next(
-            (p for p in tag_preset_service.get_active_presets('activity_type') if p.value == file.activity_type),
-            None
-        )
-        activity_type_display = activity_type_preset.display_name if activity_type_preset else file.activity_type
-        
-        instructor_preset = next(
-            (p for p in tag_preset_service.get_active_presets('instructor') if p.value == file.instructor),
-            None
-        )
-        instructor_display = instructor_preset.display_name if instructor_preset else file.instructor
+        activity_type_display = tag_preset_service.get_display_name('activity_type', file.activity_type)
+        instructor_display = tag_preset_service.get_display_name('instructor', file.instructor)
         
         # Build response with display names
         file_dict = file.to_dict(include_uploader=True)
@@ -1523,6 +2607,8 @@ def update_file(file_id):
         
     except Exception as e:
         db.session.rollback()
+        # No-op once committed: discard keeps keys a file points at
+        move_service.discard(copied_keys)
         current_app.logger.error(f'Error updating file {file_id}: {str(e)}')
         return jsonify({
             'error': {
@@ -1546,6 +2632,10 @@ def check_filenames():
         "activity_type": "regular_training"
     }
     
+    Names are looked up on the unique (directory, filename) index in chunks,
+    so up to MAX_FILENAME_CHECK names cost one index probe each. A name is
+    also taken while a deduplicated file's object is stored at its key.
+    
     Returns:
         200: Check completed successfully
         {
@@ -1585,6 +2675,14 @@ def check_filenames():
                 }
             }), 400
         
+        if len(filenames) > MAX_FILENAME_CHECK:
+            return jsonify({
+                'error': {
+                    'code': 'BATCH_002',
+                    'message': f'单次最多检查{MAX_FILENAME_CHECK}个文件名'
+                }
+            }), 400
+        
         if not activity_date_str or not activity_type:
             return jsonify({
                 'error': {
@@ -1604,20 +2702,17 @@ def check_filenames():
                 }
             }), 400
         
-        year = activity_date.year
-        month = activity_date.month
-        
         # Query existing files in the same directory (activity_type/year/month)
-        existing_files_query = File.query.filter(
-            File.activity_type == activity_type,
-            db.func.extract('year', File.activity_date) == year,
-            db.func.extract('month', File.activity_date) == month,
-            File.filename.in_(filenames)
-        ).all()
+        directory = f"{activity_type}/{activity_date.year}/{activity_date.month:02d}"
+        taken = {
+            filename for _, filename in _existing_names(
+                ((directory, name) for name in filenames), match_keys=True
+            )
+        }
         
-        # Get list of existing filenames
-        existing_filenames = [f.filename for f in existing_files_query]
-        available_filenames = [f for f in filenames if f not in existing_filenames]
+        # Get list of existing filenames (request order, without repeats)
+        existing_filenames = [name for name in dict.fromkeys(filenames) if name in taken]
+        available_filenames = [name for name in filenames if name not in taken]
         
         current_app.logger.info(
             f'User {current_user_id} checked {len(filenames)} filenames, '
@@ -1983,32 +3078,191 @@ def remove_file_tag(file_id, tag_id):
         current_app.logger.info(
             f'User {current_user_id} removed tag {tag_id} from file {file_id}'
         )
-        
-        return jsonify({
-            'success': True,
-            'message': '标签移除成功'
-        }), 200
-        
-    except ValueError as e:
-        return jsonify({
-            'error': {
-                'code': 'VALIDATION_001',
-                'message': str(e)
-            }
-        }), 400
-    except Exception as e:
-        current_app.logger.error(f'Error removing tag {tag_id} from file {file_id}: {str(e)}')
-        return jsonify({
-            'error': {
-                'code': 'INTERNAL_ERROR',
-                'message': '移除标签失败，请稍后重试'
+        
+        return jsonify({
+            'success': True,
+            'message': '标签移除成功'
+        }), 200
+        
+    except ValueError as e:
+        return jsonify({
+            'error': {
+                'code': 'VALIDATION_001',
+                'message': str(e)
+            }
+        }), 400
+    except Exception as e:
+        current_app.logger.error(f'Error removing tag {tag_id} from file {file_id}: {str(e)}')
+        return jsonify({
+            'error': {
+                'code': 'INTERNAL_ERROR',
+                'message': '移除标签失败，请稍后重试'
+            }
+        }), 500
+
+
+# ============================================================================
+# Batch Operations Endpoints
+# ============================================================================
+#
+# Each batch operation is a function (user_id, file_ids, params, on_results)
+# shared by the endpoint and the job queue: batches above JOB_ASYNC_THRESHOLD
+# are stored as a job and processed in chunks by services.job_service, which
+# passes ``on_results`` to commit each chunk's progress with its changes.
+
+def _commit_batch(result, on_results=None):
+    """Commit a batch's changes, together with the job progress of a job chunk"""
+    if on_results:
+        on_results(result)
+    db.session.commit()
+    return result
+
+
+def _start_batch_job(job_type, user_id, file_ids, params):
+    """Store a large batch as a background job; the client polls GET /api/jobs/<id>"""
+    if not all(isinstance(file_id, int) and not isinstance(file_id, bool) for file_id in file_ids):
+        return jsonify({
+            'error': {
+                'code': 'VALIDATION_001',
+                'message': '文件ID必须是整数'
+            }
+        }), 400
+
+    job = job_service.create(job_type, user_id, file_ids, params)
+
+    current_app.logger.info(f'User {user_id} started job {job.id} ({job_type}, {len(file_ids)} files)')
+
+    return jsonify({
+        'success': True,
+        'message': f'文件较多，已转为后台任务处理（共 {len(file_ids)} 个文件）',
+        'job': job.to_dict()
+    }), 202
+
+
+def _batch_delete(user_id, file_ids, params, on_results=None):
+    """
+    Delete files in bulk (the user must be the uploader or an admin)
+
+    Files are loaded with one query and permissions checked in memory; the
+    objects are removed with S3 multi-object delete (objects still referenced
+    by other files are kept) and the records with set-based statements.
+
+    Args:
+        user_id: Requesting user
+        file_ids: File IDs in request order
+        params: {'ip_address', 'user_agent'} for the delete logs
+        on_results: Job progress callback, called right before the commit
+
+    Returns:
+        {'succeeded': [file_id], 'failed': [{'file_id', 'error'}]}
+    """
+    from auth.models import User
+    current_user = User.query.get(user_id)
+    is_admin = current_user and current_user.is_admin
+
+    succeeded = []
+    failed = []
+    file_ids, invalid = _partition_ids(file_ids)
+
+    # Load every file in one query, check permissions in memory
+    files = {file.id: file for file in File.query.filter(File.id.in_(file_ids)).all()}
+
+    candidates = []
+    for file_id in file_ids:
+        file = files.get(file_id)
+
+        if not file:
+            failed.append({
+                'file_id': file_id,
+                'error': '文件不存在'
+            })
+            continue
+
+        # Verify user is the uploader or admin
+        if file.uploader_id != user_id and not is_admin:
+            failed.append({
+                'file_id': file_id,
+                'error': '无权删除此文件'
+            })
+            continue
+
+        candidates.append(file)
+
+    # Delete objects from S3 in bulk, keeping objects other files still reference
+    s3_errors = {}
+    if candidates:
+        shared = content_hash_service.shared_keys(
+            {file.s3_key for file in candidates}, [file.id for file in candidates]
+        )
+        try:
+            s3_errors = s3_service.delete_files(
+                [file.s3_key for file in candidates if file.s3_key not in shared]
+            )
+        except Exception as e:
+            current_app.logger.error(f'Failed to delete files from S3: {str(e)}')
+            s3_errors = {file.s3_key: str(e) for file in candidates}
+
+    deleted = []
+    for file in candidates:
+        if file.s3_key in s3_errors:
+            current_app.logger.error(f'Failed to delete file {file.id} from S3: {s3_errors[file.s3_key]}')
+            failed.append({
+                'file_id': file.id,
+                'error': 'S3删除失败'
+            })
+            continue
+        deleted.append(file)
+        succeeded.append(file.id)
+
+    if deleted:
+        from sqlalchemy import delete, insert, update
+        from files.request_models import FileRequest
+        from services.preheat_job_service import preheat_job_service
+        from services.tag_service import tag_service
+
+        deleted_ids = [file.id for file in deleted]
+        now = datetime.utcnow()
+
+        # Same statements the ORM emits per file, once for the whole batch:
+        # detach earlier logs, write delete logs, drop requests, tags and records
+        db.session.execute(
+            update(FileLog).where(FileLog.file_id.in_(deleted_ids)).values(file_id=None)
+        )
+        db.session.execute(insert(FileLog), [
+            {
+                'user_id': user_id,
+                'file_id': file.id,
+                'operation': OperationType.DELETE,
+                'file_path': file.s3_key,
+                'timestamp': now,
+                'ip_address': params.get('ip_address'),
+                'user_agent': params.get('user_agent')
             }
-        }), 500
+            for file in deleted
+        ])
+        db.session.execute(delete(FileRequest).where(FileRequest.file_id.in_(deleted_ids)))
+        tag_service.detach_files(deleted_ids)
+        preheat_job_service.delete_for_files(deleted_ids)
+        db.session.execute(
+            delete(File).where(File.id.in_(deleted_ids)).execution_options(synchronize_session=False)
+        )
+        for file in deleted:
+            db.session.expunge(file)
 
+    # Report failures in request order (non-integer IDs first)
+    position = {file_id: index for index, file_id in enumerate(file_ids)}
+    failed.sort(key=lambda f: position[f['file_id']])
+    failed = invalid + failed
+
+    # Commit all successful deletions
+    _commit_batch({'succeeded': succeeded, 'failed': failed}, on_results)
+
+    current_app.logger.info(
+        f'User {user_id} batch deleted {len(succeeded)} files, {len(failed)} failed'
+    )
+
+    return {'succeeded': succeeded, 'failed': failed}
 
-# ============================================================================
-# Batch Operations Endpoints
-# ============================================================================
 
 @files_bp.route('/batch/delete', methods=['POST'])
 @jwt_required()
@@ -2022,8 +3276,11 @@ def batch_delete_files():
         "file_ids": [1, 2, 3, ...]
     }
     
+    Batches of more than JOB_ASYNC_THRESHOLD files run as a background job.
+    
     Returns:
         200: All files deleted successfully
+        202: Background job created (poll GET /api/jobs/<id>)
         207: Partial success (some files failed)
         400: Invalid input
         401: Unauthorized
@@ -2054,82 +3311,26 @@ def batch_delete_files():
                 }
             }), 400
         
-        # Validate batch size limit (max 100)
-        if len(file_ids) > 100:
+        # Validate batch size limit
+        if len(file_ids) > MAX_BATCH_DELETE:
             return jsonify({
                 'error': {
                     'code': 'BATCH_002',
-                    'message': '批量操作限制最多100个文件'
+                    'message': f'批量操作限制最多{MAX_BATCH_DELETE}个文件'
                 }
             }), 400
         
-        # Get current user info for admin check
-        from auth.models import User
-        current_user = User.query.get(current_user_id)
-        is_admin = current_user and current_user.is_admin
-        
-        succeeded = []
-        failed = []
-        
-        for file_id in file_ids:
-            try:
-                # Find file by ID
-                file = File.query.get(file_id)
-                
-                if not file:
-                    failed.append({
-                        'file_id': file_id,
-                        'error': '文件不存在'
-                    })
-                    continue
-                
-                # Verify user is the uploader or admin
-                if file.uploader_id != current_user_id and not is_admin:
-                    failed.append({
-                        'file_id': file_id,
-                        'error': '无权删除此文件'
-                    })
-                    continue
-                
-                # Delete file from S3
-                try:
-                    s3_service.delete_file(file.s3_key)
-                except Exception as e:
-                    current_app.logger.error(f'Failed to delete file {file_id} from S3: {str(e)}')
-                    failed.append({
-                        'file_id': file_id,
-                        'error': 'S3删除失败'
-                    })
-                    continue
-                
-                # Create log entry before deleting file record
-                log = FileLog.create_log(
-                    user_id=current_user_id,
-                    operation=OperationType.DELETE,
-                    file_id=file.id,
-                    file_path=file.s3_key,
-                    ip_address=request.remote_addr,
-                    user_agent=request.headers.get('User-Agent')
-                )
-                db.session.add(log)
-                
-                # Delete file record from database
-                db.session.delete(file)
-                succeeded.append(file_id)
-                
-            except Exception as e:
-                current_app.logger.error(f'Error deleting file {file_id}: {str(e)}')
-                failed.append({
-                    'file_id': file_id,
-                    'error': '删除失败'
-                })
+        params = {
+            'ip_address': request.remote_addr,
+            'user_agent': request.headers.get('User-Agent')
+        }
         
-        # Commit all successful deletions
-        db.session.commit()
+        # Large selections run as a background job
+        if len(file_ids) > job_service.async_threshold():
+            return _start_batch_job('batch_delete', current_user_id, file_ids, params)
         
-        current_app.logger.info(
-            f'User {current_user_id} batch deleted {len(succeeded)} files, {len(failed)} failed'
-        )
+        result = _batch_delete(current_user_id, file_ids, params)
+        succeeded, failed = result['succeeded'], result['failed']
         
         # Return appropriate status code
         if len(failed) == 0:
@@ -2173,6 +3374,101 @@ def batch_delete_files():
         }), 500
 
 
+def _int_ids(file_ids):
+    """Integer IDs from a client-supplied list (other values cannot match a file)"""
+    return {file_id for file_id in file_ids if isinstance(file_id, int) and not isinstance(file_id, bool)}
+
+
+def _partition_ids(file_ids):
+    """Split requested IDs into unique integer IDs (in order) and 文件不存在 failures for other values"""
+    ids = []
+    failed = []
+    seen = set()
+    for file_id in file_ids:
+        if not isinstance(file_id, int) or isinstance(file_id, bool):
+            failed.append({
+                'file_id': file_id,
+                'error': '文件不存在'
+            })
+        elif file_id not in seen:
+            seen.add(file_id)
+            ids.append(file_id)
+    return ids, failed
+
+
+def _split_existing(file_ids, existing_ids):
+    """Split requested IDs (deduplicated, in order) into succeeded IDs and 文件不存在 failures"""
+    succeeded = []
+    file_ids, failed = _partition_ids(file_ids)
+    for file_id in file_ids:
+        if file_id in existing_ids:
+            succeeded.append(file_id)
+        else:
+            failed.append({
+                'file_id': file_id,
+                'error': '文件不存在'
+            })
+    return succeeded, failed
+
+
+def _batch_add_tag(user_id, file_ids, params, on_results=None):
+    """
+    Add a tag to files in bulk
+
+    Missing files are filtered out in SQL; one INSERT ... SELECT tags the rest.
+
+    Args:
+        user_id: Requesting user
+        file_ids: File IDs in request order
+        params: {'tag_id'} of an existing tag
+        on_results: Job progress callback, called right before the commit
+
+    Returns:
+        {'succeeded', 'failed', 'inserted'}
+    """
+    from services.tag_service import tag_service
+
+    existing_ids = tag_service.existing_file_ids(_int_ids(file_ids))
+    inserted = tag_service.attach_tag(params['tag_id'], existing_ids)
+    succeeded, failed = _split_existing(file_ids, existing_ids)
+    result = _commit_batch({'succeeded': succeeded, 'failed': failed, 'inserted': inserted}, on_results)
+
+    current_app.logger.info(
+        f'User {user_id} batch added tag {params["tag_id"]} to {inserted} files '
+        f'({len(succeeded)} requested, {len(failed)} failed)'
+    )
+    return result
+
+
+def _batch_remove_tag(user_id, file_ids, params, on_results=None):
+    """
+    Remove a tag from files in bulk
+
+    One DELETE for the whole batch; removing an absent tag counts as success.
+
+    Args:
+        user_id: Requesting user
+        file_ids: File IDs in request order
+        params: {'tag_id'}
+        on_results: Job progress callback, called right before the commit
+
+    Returns:
+        {'succeeded', 'failed', 'removed'}
+    """
+    from services.tag_service import tag_service
+
+    existing_ids = tag_service.existing_file_ids(_int_ids(file_ids))
+    removed = tag_service.detach_tag(params['tag_id'], existing_ids)
+    succeeded, failed = _split_existing(file_ids, existing_ids)
+    result = _commit_batch({'succeeded': succeeded, 'failed': failed, 'removed': removed}, on_results)
+
+    current_app.logger.info(
+        f'User {user_id} batch removed tag {params["tag_id"]} from {removed} files '
+        f'({len(succeeded)} requested, {len(failed)} failed)'
+    )
+    return result
+
+
 @files_bp.route('/batch/tags', methods=['POST'])
 @jwt_required()
 def batch_add_tag():
@@ -2188,6 +3484,7 @@ def batch_add_tag():
     
     Returns:
         200: Tag added to all files successfully
+        202: Background job created (poll GET /api/jobs/<id>)
         207: Partial success (some files failed)
         400: Invalid input
         401: Unauthorized
@@ -2236,12 +3533,12 @@ def batch_add_tag():
                 }
             }), 400
         
-        # Validate batch size limit (max 100)
-        if len(file_ids) > 100:
+        # Validate batch size limit
+        if len(file_ids) > MAX_BATCH_TAG:
             return jsonify({
                 'error': {
                     'code': 'BATCH_002',
-                    'message': '批量操作限制最多100个文件'
+                    'message': f'批量操作限制最多{MAX_BATCH_TAG}个文件'
                 }
             }), 400
         
@@ -2258,49 +3555,12 @@ def batch_add_tag():
                 }
             }), 400
         
-        succeeded = []
-        failed = []
-        
-        for file_id in file_ids:
-            try:
-                # Verify file exists
-                file = File.query.get(file_id)
-                if not file:
-                    failed.append({
-                        'file_id': file_id,
-                        'error': '文件不存在'
-                    })
-                    continue
-                
-                # Check if association already exists
-                from files.models import FileTag
-                existing = FileTag.query.filter_by(
-                    file_id=file_id,
-                    tag_id=tag.id
-                ).first()
-                
-                if existing:
-                    # Already has the tag, count as success
-                    succeeded.append(file_id)
-                    continue
-                
-                # Create new association
-                file_tag = FileTag(file_id=file_id, tag_id=tag.id)
-                db.session.add(file_tag)
-                succeeded.append(file_id)
-                
-            except Exception as e:
-                current_app.logger.error(f'Error adding tag to file {file_id}: {str(e)}')
-                failed.append({
-                    'file_id': file_id,
-                    'error': '添加标签失败'
-                })
-        
-        db.session.commit()
+        # Large selections run as a background job
+        if len(file_ids) > job_service.async_threshold():
+            return _start_batch_job('batch_add_tag', current_user_id, file_ids, {'tag_id': tag.id})
         
-        current_app.logger.info(
-            f'User {current_user_id} batch added tag "{tag.name}" to {len(succeeded)} files, {len(failed)} failed'
-        )
+        result = _batch_add_tag(current_user_id, file_ids, {'tag_id': tag.id})
+        succeeded, failed, inserted = result['succeeded'], result['failed'], result['inserted']
         
         # Return appropriate status code
         if len(failed) == 0:
@@ -2308,6 +3568,7 @@ def batch_add_tag():
                 'success': True,
                 'message': f'成功为 {len(succeeded)} 个文件添加标签',
                 'tag': {'id': tag.id, 'name': tag.name},
+                'inserted': inserted,
                 'results': {
                     'succeeded': succeeded,
                     'failed': failed
@@ -2319,6 +3580,7 @@ def batch_add_tag():
                 'code': 'TAG_004',
                 'message': '所有文件添加标签失败',
                 'tag': {'id': tag.id, 'name': tag.name},
+                'inserted': inserted,
                 'results': {
                     'succeeded': succeeded,
                     'failed': failed
@@ -2330,6 +3592,7 @@ def batch_add_tag():
                 'code': 'TAG_004',
                 'message': f'部分操作失败: 成功 {len(succeeded)}, 失败 {len(failed)}',
                 'tag': {'id': tag.id, 'name': tag.name},
+                'inserted': inserted,
                 'results': {
                     'succeeded': succeeded,
                     'failed': failed
@@ -2362,6 +3625,7 @@ def batch_remove_tag():
     
     Returns:
         200: Tag removed from all files successfully
+        202: Background job created (poll GET /api/jobs/<id>)
         207: Partial success (some files failed)
         400: Invalid input
         401: Unauthorized
@@ -2402,17 +3666,17 @@ def batch_remove_tag():
                 }
             }), 400
         
-        # Validate batch size limit (max 100)
-        if len(file_ids) > 100:
+        # Validate batch size limit
+        if len(file_ids) > MAX_BATCH_TAG:
             return jsonify({
                 'error': {
                     'code': 'BATCH_002',
-                    'message': '批量操作限制最多100个文件'
+                    'message': f'批量操作限制最多{MAX_BATCH_TAG}个文件'
                 }
             }), 400
         
         # Verify tag exists
-        from files.models import Tag, FileTag
+        from files.models import Tag
         tag = Tag.query.get(tag_id)
         if not tag:
             return jsonify({
@@ -2422,51 +3686,19 @@ def batch_remove_tag():
                 }
             }), 404
         
-        succeeded = []
-        failed = []
-        
-        for file_id in file_ids:
-            try:
-                # Verify file exists
-                file = File.query.get(file_id)
-                if not file:
-                    failed.append({
-                        'file_id': file_id,
-                        'error': '文件不存在'
-                    })
-                    continue
-                
-                # Find and delete the association
-                file_tag = FileTag.query.filter_by(
-                    file_id=file_id,
-                    tag_id=tag_id
-                ).first()
-                
-                if file_tag:
-                    db.session.delete(file_tag)
-                    succeeded.append(file_id)
-                else:
-                    # File doesn't have this tag, count as success (idempotent)
-                    succeeded.append(file_id)
-                
-            except Exception as e:
-                current_app.logger.error(f'Error removing tag from file {file_id}: {str(e)}')
-                failed.append({
-                    'file_id': file_id,
-                    'error': '移除标签失败'
-                })
-        
-        db.session.commit()
+        # Large selections run as a background job
+        if len(file_ids) > job_service.async_threshold():
+            return _start_batch_job('batch_remove_tag', current_user_id, file_ids, {'tag_id': tag.id})
         
-        current_app.logger.info(
-            f'User {current_user_id} batch removed tag {tag_id} from {len(succeeded)} files, {len(failed)} failed'
-        )
+        result = _batch_remove_tag(current_user_id, file_ids, {'tag_id': tag.id})
+        succeeded, failed, removed = result['succeeded'], result['failed'], result['removed']
         
         # Return appropriate status code
         if len(failed) == 0:
             return jsonify({
                 'success': True,
                 'message': f'成功从 {len(succeeded)} 个文件移除标签',
+                'removed': removed,
                 'results': {
                     'succeeded': succeeded,
                     'failed': failed
@@ -2477,6 +3709,7 @@ def batch_remove_tag():
                 'success': False,
                 'code': 'TAG_004',
                 'message': '所有文件移除标签失败',
+                'removed': removed,
                 'results': {
                     'succeeded': succeeded,
                     'failed': failed
@@ -2487,6 +3720,7 @@ def batch_remove_tag():
                 'success': False,
                 'code': 'TAG_004',
                 'message': f'部分操作失败: 成功 {len(succeeded)}, 失败 {len(failed)}',
+                'removed': removed,
                 'results': {
                     'succeeded': succeeded,
                     'failed': failed
@@ -2504,6 +3738,173 @@ def batch_remove_tag():
         }), 500
 
 
+def _batch_update(user_id, file_ids, params, on_results=None):
+    """
+    Update the activity fields and tags of files in bulk (owner or admin only)
+
+    Files whose directory changes are moved in S3: all copies run in parallel,
+    the records are switched in one commit and the old keys deleted afterwards.
+
+    Args:
+        user_id: Requesting user
+        file_ids: File IDs in request order
+        params: {'updates'} as validated by the endpoint
+        on_results: Job progress callback, called right before the commit
+
+    Returns:
+        {'succeeded': [file_id], 'failed': [{'file_id', 'error'}]}
+    """
+    from auth.models import User
+    from services.tag_service import tag_service
+
+    current_user = User.query.get(user_id)
+    is_admin = current_user and current_user.is_admin
+
+    updates = params['updates']
+    new_activity_date = None
+    if updates.get('activity_date'):
+        new_activity_date = datetime.fromisoformat(updates['activity_date']).date()
+
+    # Get tag mode
+    tag_mode = updates.get('tag_mode', 'add')  # 'add' or 'replace'
+    new_tags = updates.get('free_tags', [])
+
+    succeeded = []
+    failed = []
+    file_ids, invalid = _partition_ids(file_ids)
+
+    # Get all files
+    files = File.query.filter(File.id.in_(file_ids)).all()
+    file_map = {f.id: f for f in files}
+
+    new_activity_type = updates.get('activity_type') or None
+
+    # Plan: validate every file and work out its new S3 key, without changing anything yet
+    planned = []
+    moves = {}
+    claimed = set()
+    for file_id in file_ids:
+        file = file_map.get(file_id)
+
+        if not file:
+            failed.append({
+                'file_id': file_id,
+                'error': '文件不存在'
+            })
+            continue
+
+        # Check permission
+        if file.uploader_id != user_id and not is_admin:
+            failed.append({
+                'file_id': file_id,
+                'error': '无权编辑此文件'
+            })
+            continue
+
+        try:
+            activity_date = new_activity_date or file.activity_date
+            activity_type = new_activity_type or file.activity_type
+
+            # Update directory path if needed
+            if activity_date and activity_type:
+                new_directory = f"{activity_type}/{activity_date.year}/{activity_date.month:02d}"
+
+                if new_directory != file.directory:
+                    new_s3_key = f"{new_directory}/{file.filename}"
+
+                    # Check for duplicate, including files moved earlier in this batch
+                    existing = _find_name_conflict(
+                        new_directory, file.filename, exclude_id=file.id, s3_key=new_s3_key
+                    )
+
+                    if existing or (new_directory, file.filename) in claimed:
+                        failed.append({
+                            'file_id': file_id,
+                            'error': f'目标位置已存在同名文件: {file.filename}'
+                        })
+                        continue
+
+                    claimed.add((new_directory, file.filename))
+                    moves[file.id] = (file.s3_key, new_directory, new_s3_key)
+
+            planned.append(file)
+
+        except Exception as e:
+            current_app.logger.error(f'Error updating file {file_id}: {str(e)}')
+            failed.append({
+                'file_id': file_id,
+                'error': str(e)
+            })
+
+    # Copy all moved objects in parallel; old keys are deleted after the commit
+    copy_errors = move_service.copy_objects(
+        (old_s3_key, new_s3_key) for old_s3_key, _, new_s3_key in moves.values()
+    )
+
+    copied = [new_s3_key for _, _, new_s3_key in moves.values() if new_s3_key not in copy_errors]
+
+    # Until the commit, a failure (including a lost job lock) discards the copies
+    with move_service.discard_on_error(copied):
+        bucket = s3_service.get_bucket_name()
+        endpoint = current_app.config.get('S3_ENDPOINT', 'https://s3.bitiful.net')
+
+        # Apply: update the records of files whose copy succeeded
+        journal = []
+        for file in planned:
+            move = moves.get(file.id)
+            if move and move[2] in copy_errors:
+                current_app.logger.error(f'Failed to move file {file.id} in S3: {copy_errors[move[2]]}')
+                failed.append({
+                    'file_id': file.id,
+                    'error': '移动文件失败'
+                })
+                continue
+
+            if new_activity_date:
+                file.activity_date = new_activity_date
+
+            if new_activity_type:
+                file.activity_type = new_activity_type
+
+            if 'activity_name' in updates:
+                file.activity_name = updates['activity_name'] if updates['activity_name'] else None
+
+            if move:
+                old_s3_key, new_directory, new_s3_key = move
+                file.directory = new_directory
+                file.s3_key = new_s3_key
+                file.public_url = f"{endpoint}/{bucket}/{new_s3_key}"
+                journal.append((file.id, old_s3_key, new_s3_key))
+
+            succeeded.append(file.id)
+
+        # Tags of all updated files in one diff, committed with the other changes
+        if new_tags and succeeded:
+            tag_service.set_file_tags(
+                succeeded, new_tags, user_id,
+                replace=(tag_mode == 'replace'), commit=False
+            )
+
+        move_batch = move_service.record(journal) if journal else None
+
+        # Report failures in request order (non-integer IDs first)
+        position = {file_id: index for index, file_id in enumerate(file_ids)}
+        failed.sort(key=lambda f: position.get(f['file_id'], len(file_ids)))
+        failed = invalid + failed
+
+        # Commit all successful updates
+        _commit_batch({'succeeded': succeeded, 'failed': failed}, on_results)
+
+    if move_batch:
+        move_service.finish(move_batch)
+
+    current_app.logger.info(
+        f'User {user_id} batch updated {len(succeeded)} files, {len(failed)} failed'
+    )
+
+    return {'succeeded': succeeded, 'failed': failed}
+
+
 @files_bp.route('/batch/update', methods=['POST'])
 @jwt_required()
 def batch_update_files():
@@ -2525,19 +3926,16 @@ def batch_update_files():
     
     Returns:
         200: All files updated successfully
+        202: Background job created (poll GET /api/jobs/<id>)
         207: Partial success (some files failed)
         400: Invalid input
         401: Unauthorized
         500: Update failed
     """
     try:
-        from auth.models import User
-        from services.tag_service import tag_service
         from services.tag_preset_service import tag_preset_service
         
         current_user_id = int(get_jwt_identity())
-        current_user = User.query.get(current_user_id)
-        is_admin = current_user and current_user.is_admin
         
         data = request.get_json()
         
@@ -2568,19 +3966,18 @@ def batch_update_files():
                 }
             }), 400
         
-        # Validate batch size limit (max 100)
-        if len(file_ids) > 100:
+        # Validate batch size limit
+        if len(file_ids) > MAX_BATCH_UPDATE:
             return jsonify({
                 'error': {
                     'code': 'BATCH_002',
-                    'message': '批量操作限制最多100个文件'
+                    'message': f'批量操作限制最多{MAX_BATCH_UPDATE}个文件'
                 }
             }), 400
         
         # Validate activity_type if provided
         if 'activity_type' in updates and updates['activity_type']:
-            activity_type_presets = tag_preset_service.get_active_presets('activity_type')
-            valid_activity_types = [preset.value for preset in activity_type_presets]
+            valid_activity_types = tag_preset_service.get_display_names('activity_type')
             if updates['activity_type'] not in valid_activity_types:
                 return jsonify({
                     'error': {
@@ -2590,10 +3987,9 @@ def batch_update_files():
                 }), 400
         
         # Validate activity_date if provided
-        new_activity_date = None
         if 'activity_date' in updates and updates['activity_date']:
             try:
-                new_activity_date = datetime.fromisoformat(updates['activity_date']).date()
+                datetime.fromisoformat(updates['activity_date'])
             except ValueError:
                 return jsonify({
                     'error': {
@@ -2602,119 +3998,13 @@ def batch_update_files():
                     }
                 }), 400
         
-        # Get tag mode
-        tag_mode = updates.get('tag_mode', 'add')  # 'add' or 'replace'
-        new_tags = updates.get('free_tags', [])
-        
-        succeeded = []
-        failed = []
-        
-        # Get all files
-        files = File.query.filter(File.id.in_(file_ids)).all()
-        file_map = {f.id: f for f in files}
-        
-        for file_id in file_ids:
-            file = file_map.get(file_id)
-            
-            if not file:
-                failed.append({
-                    'file_id': file_id,
-                    'error': '文件不存在'
-                })
-                continue
-            
-            # Check permission
-            if file.uploader_id != current_user_id and not is_admin:
-                failed.append({
-                    'file_id': file_id,
-                    'error': '无权编辑此文件'
-                })
-                continue
-            
-            try:
-                # Apply updates
-                if new_activity_date:
-                    file.activity_date = new_activity_date
-                
-                if 'activity_type' in updates and updates['activity_type']:
-                    file.activity_type = updates['activity_type']
-                
-                if 'activity_name' in updates:
-                    file.activity_name = updates['activity_name'] if updates['activity_name'] else None
-                
-                # Handle tags
-                if new_tags:
-                    if tag_mode == 'replace':
-                        # Remove all existing tags
-                        for tag in list(file.tags):
-                            tag_service.remove_tag_from_file(file.id, tag.id)
-                    
-                    # Add new tags
-                    current_tag_names = set(t.name for t in file.tags)
-                    for tag_name in new_tags:
-                        tag_name = tag_name.strip()
-                        if tag_name and tag_name not in current_tag_names:
-                            tag_service.add_tag_to_file(file.id, tag_name, current_user_id)
-                
-                # Update directory path if needed
-                if file.activity_date and file.activity_type:
-                    year = file.activity_date.year
-                    month = f"{file.activity_date.month:02d}"
-                    new_directory = f"{file.activity_type}/{year}/{month}"
-                    
-                    if new_directory != file.directory:
-                        old_s3_key = file.s3_key
-                        file.directory = new_directory
-                        new_s3_key = f"{new_directory}/{file.filename}"
-                        
-                        # Check for duplicate
-                        existing = File.query.filter(
-                            File.s3_key == new_s3_key,
-                            File.id != file.id
-                        ).first()
-                        
-                        if existing:
-                            failed.append({
-                                'file_id': file_id,
-                                'error': f'目标位置已存在同名文件: {file.filename}'
-                            })
-                            db.session.rollback()
-                            continue
-                        
-                        # Move file in S3
-                        try:
-                            s3_service.copy_file(old_s3_key, new_s3_key)
-                            s3_service.delete_file(old_s3_key)
-                            file.s3_key = new_s3_key
-                            
-                            bucket = s3_service.get_bucket_name()
-                            endpoint = current_app.config.get('S3_ENDPOINT', 'https://s3.bitiful.net')
-                            file.public_url = f"{endpoint}/{bucket}/{new_s3_key}"
-                        except Exception as e:
-                            current_app.logger.error(f'Failed to move file {file_id} in S3: {str(e)}')
-                            failed.append({
-                                'file_id': file_id,
-                                'error': '移动文件失败'
-                            })
-                            db.session.rollback()
-                            continue
-                
-                succeeded.append(file_id)
-                
-            except Exception as e:
-                current_app.logger.error(f'Error updating file {file_id}: {str(e)}')
-                failed.append({
-                    'file_id': file_id,
-                    'error': str(e)
-                })
-        
-        # Commit all successful updates
-        if succeeded:
-            db.session.commit()
+        # Large selections run as a background job
+        params = {'updates': updates}
+        if len(file_ids) > job_service.async_threshold():
+            return _start_batch_job('batch_update', current_user_id, file_ids, params)
         
-        current_app.logger.info(
-            f'User {current_user_id} batch updated {len(succeeded)} files, {len(failed)} failed'
-        )
+        result = _batch_update(current_user_id, file_ids, params)
+        succeeded, failed = result['succeeded'], result['failed']
         
         # Return appropriate response
         if len(failed) == 0:
@@ -2757,6 +4047,13 @@ def batch_update_files():
         }), 500
 
 
+# Batch operations run by the job queue
+job_service.register('batch_delete', _batch_delete)
+job_service.register('batch_add_tag', _batch_add_tag)
+job_service.register('batch_remove_tag', _batch_remove_tag)
+job_service.register('batch_update', _batch_update)
+
+
 # ============================================================================
 # Activity Names Endpoints
 # ============================================================================
@@ -2824,10 +4121,7 @@ def get_activity_names_by_date():
         
         # Get activity type display names
         from services.tag_preset_service import tag_preset_service
-        activity_type_presets = {
-            p.value: p.display_name 
-            for p in tag_preset_service.get_active_presets('activity_type')
-        }
+        activity_type_presets = tag_preset_service.get_display_names('activity_type')
         
         # Build response
         activity_names = []
@@ -2941,10 +4235,7 @@ def get_activity_directory_info():
         
         # Get activity type display name
         from services.tag_preset_service import tag_preset_service
-        activity_type_presets = {
-            p.value: p.display_name 
-            for p in tag_preset_service.get_active_presets('activity_type')
-        }
+        activity_type_presets = tag_preset_service.get_display_names('activity_type')
         
         return jsonify({
             'success': True,
@@ -3039,8 +4330,7 @@ def update_activity_directory():
         # Validate new_activity_type if provided
         if new_activity_type:
             from services.tag_preset_service import tag_preset_service
-            activity_type_presets = tag_preset_service.get_active_presets('activity_type')
-            valid_types = [p.value for p in activity_type_presets]
+            valid_types = tag_preset_service.get_display_names('activity_type')
             if new_activity_type not in valid_types:
                 return jsonify({
                     'error': {
@@ -3080,22 +4370,20 @@ def update_activity_directory():
                 }
             }), 403
         
-        # Owner can update directly
-        files_to_update = File.query.filter(
+        # Owner can update directly, with one UPDATE however large the directory
+        values = {}
+        if new_activity_name:
+            values['activity_name'] = new_activity_name
+        if new_activity_type:
+            # Only update the activity_type field, not directory or s3_key
+            # S3 files remain in their original location
+            values['activity_type'] = new_activity_type
+        
+        updated_count = File.query.filter(
             File.activity_date == activity_date,
             File.activity_name == activity_name,
             File.activity_type == activity_type
-        ).all()
-        
-        updated_count = 0
-        for file in files_to_update:
-            if new_activity_name:
-                file.activity_name = new_activity_name
-            if new_activity_type:
-                # Only update the activity_type field, not directory or s3_key
-                # S3 files remain in their original location
-                file.activity_type = new_activity_type
-            updated_count += 1
+        ).update(values, synchronize_session=False)
         
         db.session.commit()
         
@@ -3175,6 +4463,8 @@ def get_signed_url(file_id):
             style=style if style else None
         )
         
+        access_counter.record(file.id, user_id=current_user_id)
+        
         return jsonify({
             'success': True,
             'signed_url': signed_url,
@@ -3279,6 +4569,7 @@ def get_signed_urls_batch():
                 's3_key': file.s3_key,
                 'content_type': file.content_type
             }
+            access_counter.record(file.id, user_id=current_user_id, weight=THUMBNAIL_WEIGHT)
         
         return jsonify({
             'success': True,
@@ -3320,8 +4611,8 @@ def get_hls_qualities(file_id):
         404: 文件不存在
         401: 未授权
     """
-    import requests
     import re
+    from services.http_client import http_client
     
     try:
         # 获取文件
@@ -3349,7 +4640,7 @@ def get_hls_qualities(file_id):
         master_key = f"{file.s3_key}!style:medium/auto_medium.m3u8"
         master_url = s3_service.generate_signed_url(key=master_key, expiration=expiration)
         
-        resp = requests.get(master_url, timeout=10)
+        resp = http_client.get(master_url, timeout=10)
         if resp.status_code != 200:
             # 主播放列表不存在，返回默认清晰度列表
             return jsonify({
@@ -3414,6 +4705,16 @@ def get_hls_qualities(file_id):
         # 按高度降序排序
         qualities.sort(key=lambda x: x['height'], reverse=True)
         
+        # 主播放列表可用，记录转码已就绪（已就绪且刚检查过时不重复写库）
+        if file.hls_state != File.HLS_READY or not file.hls_checked_at or \
+                file.hls_checked_at < datetime.utcnow() - timedelta(minutes=10):
+            try:
+                from services.video_preheat_service import video_preheat_service
+                video_preheat_service.set_hls_state(file.id, File.HLS_READY)
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.warning(f'Failed to update HLS state for file {file.id}: {str(e)}')
+        
         return jsonify({
             'success': True,
             'qualities': qualities,
@@ -3515,8 +4816,8 @@ def proxy_hls_content(file_id, hls_path):
         404: 文件不存在
         401: 未授权
     """
-    import requests
     from urllib.parse import urlparse, urljoin, quote
+    from services.http_client import http_client
     
     try:
         # 获取文件
@@ -3544,7 +4845,7 @@ def proxy_hls_content(file_id, hls_path):
             )
             
             # 获取 m3u8 内容
-            resp = requests.get(m3u8_signed_url, timeout=10)
+            resp = http_client.get(m3u8_signed_url, timeout=10)
             if resp.status_code != 200:
                 return jsonify({
                     'error': {
@@ -3555,6 +4856,9 @@ def proxy_hls_content(file_id, hls_path):
             
             m3u8_content = resp.text
             
+            # 一次播放会请求主/子播放列表，按用户去重后只计一次访问
+            access_counter.record(file.id, user_id=int(get_jwt_identity()))
+            
             # 解析并替换分片 URL 为签名 URL
             lines = m3u8_content.split('\n')
             new_lines = []
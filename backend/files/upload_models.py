@@ -0,0 +1,65 @@
+"""
+Upload session models for LockCloud
+Resumable multipart upload sessions for large files
+"""
+from datetime import datetime
+from extensions import db
+
+
+class UploadSession(db.Model):
+    """One S3 multipart upload, kept so an interrupted upload can be resumed or cleaned up"""
+    __tablename__ = 'upload_sessions'
+
+    STATUS_ACTIVE = 'active'
+    STATUS_COMPLETED = 'completed'
+    STATUS_ABORTED = 'aborted'
+
+    id = db.Column(db.Integer, primary_key=True)
+    upload_id = db.Column(db.String(1024), nullable=False)  # S3 UploadId
+    s3_key = db.Column(db.String(1000), nullable=False, index=True)
+    uploader_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+
+    original_filename = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(100), nullable=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    part_size = db.Column(db.BigInteger, nullable=False)
+    part_count = db.Column(db.Integer, nullable=False)
+
+    # Status: 'active', 'completed', 'aborted'
+    status = db.Column(db.String(20), default=STATUS_ACTIVE, nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)  # Abandoned after this time, aborted by cleanup
+    completed_at = db.Column(db.DateTime, nullable=True)
+
+    # Relationships
+    uploader = db.relationship('User', backref=db.backref('upload_sessions', lazy='dynamic'))
+
+    __table_args__ = (
+        db.Index('idx_upload_sessions_status_expires', 'status', 'expires_at'),
+    )
+
+    def __repr__(self):
+        return f'<UploadSession {self.s3_key} {self.status}>'
+
+    def to_dict(self):
+        """
+        Convert upload session to dictionary for JSON serialization
+
+        Returns:
+            dict: Upload session data
+        """
+        return {
+            'id': self.id,
+            's3_key': self.s3_key,
+            'original_filename': self.original_filename,
+            'content_type': self.content_type,
+            'size': self.size,
+            'part_size': self.part_size,
+            'part_count': self.part_count,
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
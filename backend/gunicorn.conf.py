@@ -6,8 +6,14 @@ import os
 bind = "0.0.0.0:5001"
 
 # Worker 配置
-workers = 2
-worker_class = "sync"  # 同步 worker
+# 默认使用 gthread：HLS 代理/清单、SSO 登录等接口主要在等待缤纷云/SSO 的响应，
+# 线程 worker 让一个慢请求只占用一个线程，而不是整个进程。
+# 需要回退到同步模式时设置 GUNICORN_WORKER_CLASS=sync。
+# 注意 HTTP_POOL_MAXSIZE 应不小于 threads，否则并发出站请求会新建不复用的连接。
+workers = int(os.environ.get("GUNICORN_WORKERS", 2))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", 8)) if worker_class == "gthread" else 1
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 100))
 
 # Timeout 配置 - 关键！
 # AI 请求最多需要 300 秒，所以设置为 360 秒（6 分钟）留出缓冲
@@ -26,11 +32,21 @@ def on_starting(server):
     """服务器启动时的回调"""
     server.log.info("=" * 80)
     server.log.info("LockCloud Backend 正在启动...")
-    server.log.info(f"Workers: {workers}")
+    server.log.info(f"Workers: {workers} ({worker_class}, threads={threads})")
     server.log.info(f"Timeout: {timeout}s")
     server.log.info(f"日志级别: {loglevel}")
     server.log.info("=" * 80)
 
+def worker_exit(server, worker):
+    """Worker 退出时（含 max_requests 回收）排空后台任务队列，并写入剩余的访问计数"""
+    from services.background_executor import shutdown_executors
+    from services.access_counter import access_counter
+    
+    drain_timeout = float(os.environ.get("BACKGROUND_DRAIN_TIMEOUT", graceful_timeout - 5))
+    server.log.info(f"Worker {worker.pid} 退出，等待后台任务最多 {drain_timeout}s")
+    shutdown_executors(timeout=drain_timeout)
+    access_counter.flush_on_exit()
+
 # 进程命名
 proc_name = "lockcloud-backend"
 
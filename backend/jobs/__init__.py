@@ -0,0 +1,4 @@
+"""
+Jobs module for LockCloud
+Progress and results of background batch jobs
+"""
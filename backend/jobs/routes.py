@@ -0,0 +1,137 @@
+"""
+Job routes for LockCloud
+Progress and per-item results of background batch jobs
+"""
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from auth.models import User
+from files.job_models import JobItem
+from services.job_service import job_service
+
+
+# Create blueprint
+jobs_bp = Blueprint('jobs', __name__)
+
+# Exempt OPTIONS requests from rate limiting (for CORS preflight)
+@jobs_bp.before_request
+def handle_preflight():
+    if request.method == 'OPTIONS':
+        return '', 200
+
+
+def _job_or_404(job_id):
+    """Load a job visible to the current user, or an error response"""
+    current_user_id = int(get_jwt_identity())
+    current_user = User.query.get(current_user_id)
+    job = job_service.get_for_user(job_id, current_user_id, is_admin=bool(current_user and current_user.is_admin))
+    if job is None:
+        return None, (jsonify({
+            'error': {
+                'code': 'JOB_001',
+                'message': '任务不存在'
+            }
+        }), 404)
+    return job, None
+
+
+@jobs_bp.route('/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    """
+    Get a background job's status and progress (creator or admin)
+    
+    GET /api/jobs/{job_id}
+    Headers: Authorization: Bearer <token>
+    
+    Returns:
+        200: Job with total/processed/succeeded/failed counts
+        401: Unauthorized
+        404: Job not found
+        500: Query failed
+    """
+    try:
+        job, error = _job_or_404(job_id)
+        if error:
+            return error
+        
+        return jsonify({
+            'success': True,
+            'job': job.to_dict()
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f'Error getting job {job_id}: {str(e)}')
+        return jsonify({
+            'error': {
+                'code': 'INTERNAL_ERROR',
+                'message': '获取任务失败'
+            }
+        }), 500
+
+
+@jobs_bp.route('/<int:job_id>/items', methods=['GET'])
+@jwt_required()
+def list_job_items(job_id):
+    """
+    Page through a job's per-item results in request order
+    
+    GET /api/jobs/{job_id}/items?status=failed&page=1&per_page=100
+    Headers: Authorization: Bearer <token>
+    
+    Query Parameters:
+        - status: 'succeeded' or 'failed' (optional)
+        - page: Page number (default: 1)
+        - per_page: Items per page (default: 100, max: 1000)
+    
+    Returns:
+        200: Items of processed chunks with pagination
+        401: Unauthorized
+        404: Job not found
+        500: Query failed
+    """
+    try:
+        job, error = _job_or_404(job_id)
+        if error:
+            return error
+        
+        status = request.args.get('status')
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 100, type=int)
+        
+        if page < 1:
+            page = 1
+        if per_page < 1 or per_page > 1000:
+            per_page = 100
+        
+        query = JobItem.query.filter(JobItem.job_id == job.id)
+        if status:
+            query = query.filter(JobItem.status == status)
+        
+        pagination = query.order_by(JobItem.seq).paginate(
+            page=page,
+            per_page=per_page,
+            error_out=False
+        )
+        
+        return jsonify({
+            'success': True,
+            'job': job.to_dict(),
+            'items': [item.to_dict() for item in pagination.items],
+            'pagination': {
+                'page': pagination.page,
+                'per_page': pagination.per_page,
+                'total': pagination.total,
+                'pages': pagination.pages,
+                'has_next': pagination.has_next,
+                'has_prev': pagination.has_prev
+            }
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f'Error listing items of job {job_id}: {str(e)}')
+        return jsonify({
+            'error': {
+                'code': 'INTERNAL_ERROR',
+                'message': '获取任务结果失败'
+            }
+        }), 500
@@ -100,3 +100,42 @@ class FileLog(db.Model):
         )
         
         return log
+
+
+class FileAccessStat(db.Model):
+    """
+    Per-file access counters (OperationType.ACCESS), aggregated in memory and flushed periodically
+
+    ``score`` decays exponentially with a configurable half-life. ``popularity``
+    stores log2(score) + hours_since_epoch / half_life, which orders files by
+    their *current* decayed score without recomputing every row.
+    """
+    __tablename__ = 'file_access_stats'
+    
+    file_id = db.Column(db.Integer, db.ForeignKey('files.id', ondelete='CASCADE'), primary_key=True)
+    access_count = db.Column(db.Integer, default=0, nullable=False)
+    score = db.Column(db.Float, default=0.0, nullable=False)
+    popularity = db.Column(db.Float, nullable=True, index=True)
+    last_accessed_at = db.Column(db.DateTime, nullable=True)
+    score_updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Relationships
+    file = db.relationship('File', backref=db.backref('access_stat', uselist=False, passive_deletes=True))
+    
+    def __repr__(self):
+        return f'<FileAccessStat file_id={self.file_id} count={self.access_count}>'
+    
+    def to_dict(self):
+        """
+        Convert access stat to dictionary for JSON serialization
+        
+        Returns:
+            dict: Access stat data
+        """
+        return {
+            'file_id': self.file_id,
+            'access_count': self.access_count,
+            'score': self.score,
+            'last_accessed_at': self.last_accessed_at.isoformat() if self.last_accessed_at else None,
+            'score_updated_at': self.score_updated_at.isoformat() if self.score_updated_at else None
+        }
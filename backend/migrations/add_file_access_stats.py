@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Migration: Add file_access_stats table
+Date: 2026-10-19
+Description: Per-file access counters with a decayed popularity score, used to prioritise transcode preheat
+
+Usage:
+    python migrations/add_file_access_stats.py
+"""
+
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from flask import Flask
+from extensions import db
+from config import config
+
+
+def run_migration():
+    """Run the migration"""
+    app = Flask(__name__)
+    app.config.from_object(config[os.environ.get('FLASK_ENV', 'development')])
+    
+    db.init_app(app)
+    
+    with app.app_context():
+        from sqlalchemy import inspect
+        from auth.models import User  # noqa: F401 - referenced by files
+        from files.models import File  # noqa: F401 - referenced by file_access_stats
+        from logs.models import FileAccessStat
+        
+        inspector = inspect(db.engine)
+        if 'file_access_stats' in inspector.get_table_names():
+            print("[SKIP] Table 'file_access_stats' already exists")
+            return
+        
+        print("[...] Creating 'file_access_stats' table")
+        FileAccessStat.__table__.create(db.engine, checkfirst=True)
+        print("[OK] Migration completed successfully")
+
+
+if __name__ == '__main__':
+    run_migration()
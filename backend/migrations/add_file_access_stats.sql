@@ -0,0 +1,17 @@
+-- Migration: Add file_access_stats table
+-- Date: 2026-10-19
+-- Description: Per-file access counters with a decayed popularity score, used to prioritise transcode preheat
+
+CREATE TABLE IF NOT EXISTS file_access_stats (
+    file_id INTEGER PRIMARY KEY REFERENCES files(id) ON DELETE CASCADE,
+    access_count INTEGER NOT NULL DEFAULT 0,
+    score DOUBLE PRECISION NOT NULL DEFAULT 0,
+    popularity DOUBLE PRECISION,
+    last_accessed_at TIMESTAMP,
+    score_updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Top-N by current decayed score
+CREATE INDEX IF NOT EXISTS idx_file_access_stats_popularity ON file_access_stats(popularity);
+
+COMMENT ON COLUMN file_access_stats.popularity IS 'log2(score) + hours_since_2024-01-01 / half_life; orders by current decayed score';
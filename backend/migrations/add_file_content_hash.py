@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Migration: Add content hash to files table
+Date: 2026-10-19
+Description: content_hash (SHA-256) for upload dedup; s3_key becomes non-unique because
+             deduplicated files reference the same object
+
+Usage:
+    python migrations/add_file_content_hash.py
+"""
+
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from flask import Flask
+from extensions import db
+from config import config
+
+
+def run_migration():
+    """Run the migration"""
+    app = Flask(__name__)
+    app.config.from_object(config[os.environ.get('FLASK_ENV', 'development')])
+    
+    db.init_app(app)
+    
+    with app.app_context():
+        # Check if column already exists
+        from sqlalchemy import inspect
+        inspector = inspect(db.engine)
+        columns = [col['name'] for col in inspector.get_columns('files')]
+        
+        if 'content_hash' not in columns:
+            print("[...] Adding 'content_hash' column to files table")
+            db.session.execute(db.text(
+                "ALTER TABLE files ADD COLUMN content_hash VARCHAR(64) DEFAULT NULL"
+            ))
+        else:
+            print("[SKIP] Column 'content_hash' already exists in files table")
+        
+        print("[...] Creating index on files.content_hash")
+        db.session.execute(db.text(
+            "CREATE INDEX IF NOT EXISTS ix_files_content_hash ON files(content_hash)"
+        ))
+        
+        # s3_key is no longer unique: deduplicated files reference the same object
+        unique_s3_key = [
+            constraint['name'] for constraint in inspector.get_unique_constraints('files')
+            if constraint['column_names'] == ['s3_key']
+        ]
+        for name in unique_s3_key:
+            print(f"[...] Dropping unique constraint '{name}' on files.s3_key")
+            db.session.execute(db.text(f'ALTER TABLE files DROP CONSTRAINT "{name}"'))
+        if not unique_s3_key:
+            print("[SKIP] files.s3_key has no unique constraint")
+        
+        for index in inspector.get_indexes('files'):
+            if index['column_names'] == ['s3_key'] and index.get('unique'):
+                print(f"[...] Dropping unique index '{index['name']}' on files.s3_key")
+                db.session.execute(db.text(f'DROP INDEX IF EXISTS "{index["name"]}"'))
+        
+        db.session.execute(db.text(
+            "CREATE INDEX IF NOT EXISTS ix_files_s3_key ON files(s3_key)"
+        ))
+        
+        db.session.commit()
+        print("[OK] Migration completed successfully")
+
+
+if __name__ == '__main__':
+    run_migration()
@@ -0,0 +1,14 @@
+-- Migration: Add content hash to files table
+-- Date: 2026-10-19
+-- Description: content_hash (SHA-256) lets uploads of an existing object create a record that
+--              references it instead of storing another copy, so several files may share one s3_key
+
+ALTER TABLE files ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64) DEFAULT NULL;
+
+CREATE INDEX IF NOT EXISTS ix_files_content_hash ON files(content_hash);
+
+-- s3_key is no longer unique: deduplicated files reference the same object
+ALTER TABLE files DROP CONSTRAINT IF EXISTS files_s3_key_key;
+CREATE INDEX IF NOT EXISTS ix_files_s3_key ON files(s3_key);
+
+COMMENT ON COLUMN files.content_hash IS 'Hex SHA-256 of the object content, backfilled by flask backfill-content-hash';
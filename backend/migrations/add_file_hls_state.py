@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Migration: Add HLS transcode readiness to files table
+Date: 2026-10-19
+Description: hls_state (unknown/warming/ready/failed) and hls_checked_at, updated by preheat and HLS quality lookups
+
+Usage:
+    python migrations/add_file_hls_state.py
+"""
+
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from flask import Flask
+from extensions import db
+from config import config
+
+
+def run_migration():
+    """Run the migration"""
+    app = Flask(__name__)
+    app.config.from_object(config[os.environ.get('FLASK_ENV', 'development')])
+    
+    db.init_app(app)
+    
+    with app.app_context():
+        # Check if columns already exist
+        from sqlalchemy import inspect
+        inspector = inspect(db.engine)
+        columns = [col['name'] for col in inspector.get_columns('files')]
+        
+        if 'hls_state' not in columns:
+            print("[...] Adding 'hls_state' column to files table")
+            db.session.execute(db.text(
+                "ALTER TABLE files ADD COLUMN hls_state VARCHAR(20) DEFAULT NULL"
+            ))
+        else:
+            print("[SKIP] Column 'hls_state' already exists in files table")
+        
+        if 'hls_checked_at' not in columns:
+            print("[...] Adding 'hls_checked_at' column to files table")
+            db.session.execute(db.text(
+                "ALTER TABLE files ADD COLUMN hls_checked_at TIMESTAMP DEFAULT NULL"
+            ))
+        else:
+            print("[SKIP] Column 'hls_checked_at' already exists in files table")
+        
+        if 'preheat_jobs' in inspector.get_table_names():
+            print("[...] Marking successfully preheated videos as ready")
+            db.session.execute(db.text(
+                "UPDATE files SET hls_state = 'ready', hls_checked_at = ("
+                "SELECT last_preheated_at FROM preheat_jobs WHERE preheat_jobs.file_id = files.id) "
+                "WHERE hls_state IS NULL AND id IN "
+                "(SELECT file_id FROM preheat_jobs WHERE status = 'succeeded')"
+            ))
+        
+        db.session.commit()
+        print("[OK] Migration completed successfully")
+
+
+if __name__ == '__main__':
+    run_migration()
@@ -0,0 +1,12 @@
+-- Migration: Add HLS transcode readiness to files table
+-- Date: 2026-10-19
+-- Description: hls_state (unknown/warming/ready/failed) and hls_checked_at, updated by preheat and HLS quality lookups
+
+ALTER TABLE files ADD COLUMN hls_state VARCHAR(20) DEFAULT NULL;
+ALTER TABLE files ADD COLUMN hls_checked_at TIMESTAMP DEFAULT NULL;
+
+-- Videos that were already preheated successfully are ready
+UPDATE files SET hls_state = 'ready', hls_checked_at = (
+    SELECT last_preheated_at FROM preheat_jobs WHERE preheat_jobs.file_id = files.id
+)
+WHERE hls_state IS NULL AND id IN (SELECT file_id FROM preheat_jobs WHERE status = 'succeeded');
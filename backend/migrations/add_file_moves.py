@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Migration: Add file_moves table
+Date: 2026-10-19
+Description: Journal of S3 object moves; old keys are deleted in bulk after the files
+             point at their new keys
+
+Usage:
+    python migrations/add_file_moves.py
+"""
+
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from flask import Flask
+from extensions import db
+from config import config
+
+
+def run_migration():
+    """Run the migration"""
+    app = Flask(__name__)
+    app.config.from_object(config[os.environ.get('FLASK_ENV', 'development')])
+    
+    db.init_app(app)
+    
+    with app.app_context():
+        from sqlalchemy import inspect
+        from files.models import File  # noqa: F401 - referenced by file_moves
+        from files.move_models import FileMove
+        
+        inspector = inspect(db.engine)
+        if 'file_moves' in inspector.get_table_names():
+            print("[SKIP] Table 'file_moves' already exists")
+            return
+        
+        print("[...] Creating 'file_moves' table")
+        FileMove.__table__.create(db.engine, checkfirst=True)
+        print("[OK] Migration completed successfully")
+
+
+if __name__ == '__main__':
+    run_migration()
@@ -0,0 +1,23 @@
+-- Migration: Add file_moves table
+-- Date: 2026-10-19
+-- Description: Journal of S3 object moves; old keys are deleted in bulk after the files
+--              point at their new keys, unfinished cleanup is retried by flask cleanup-moves
+
+CREATE TABLE IF NOT EXISTS file_moves (
+    id SERIAL PRIMARY KEY,
+    batch_id VARCHAR(36) NOT NULL,
+    file_id INTEGER REFERENCES files(id) ON DELETE SET NULL,
+    source_key VARCHAR(1000) NOT NULL,
+    target_key VARCHAR(1000) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    error TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_file_moves_batch_id ON file_moves(batch_id);
+
+-- flask cleanup-moves finds pending rows by (status, created_at)
+CREATE INDEX IF NOT EXISTS idx_file_moves_status_created ON file_moves(status, created_at);
+
+COMMENT ON COLUMN file_moves.source_key IS 'Old S3 key, deleted once no file references it';
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Migration: Add file_name_sequences table
+Date: 2026-10-19
+Description: Per-date counters for sequential YYYY-MM-DD_XXX filenames, reserved atomically
+             instead of counting files per upload
+
+Usage:
+    python migrations/add_file_name_sequences.py
+"""
+
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from flask import Flask
+from extensions import db
+from config import config
+
+
+def run_migration():
+    """Run the migration"""
+    app = Flask(__name__)
+    app.config.from_object(config[os.environ.get('FLASK_ENV', 'development')])
+    
+    db.init_app(app)
+    
+    with app.app_context():
+        from sqlalchemy import inspect
+        from files.naming_models import FileNameSequence
+        
+        inspector = inspect(db.engine)
+        if 'file_name_sequences' in inspector.get_table_names():
+            print("[SKIP] Table 'file_name_sequences' already exists")
+        else:
+            print("[...] Creating 'file_name_sequences' table")
+            FileNameSequence.__table__.create(db.engine, checkfirst=True)
+        
+        from auth.models import User  # noqa: F401 - referenced by files
+        from files.models import File
+        from services.file_naming_service import file_naming_service
+        
+        # Continue after the highest index already used (or the file count of the old scheme)
+        print("[...] Seeding sequences from existing files")
+        counts = {}
+        filenames = {}
+        rows = db.session.query(File.activity_date, File.filename).filter(
+            File.activity_date.isnot(None)
+        ).yield_per(1000)
+        for activity_date, filename in rows:
+            counts[activity_date] = counts.get(activity_date, 0) + 1
+            filenames.setdefault(activity_date, []).append(filename)
+        
+        current = {
+            row.activity_date: row.last_index
+            for row in FileNameSequence.query.all()
+        }
+        seeded = 0
+        raised = 0
+        for activity_date, file_count in counts.items():
+            last_index = file_naming_service.highest_index(activity_date, filenames[activity_date], file_count)
+            if activity_date not in current:
+                db.session.add(FileNameSequence(activity_date=activity_date, last_index=last_index))
+                seeded += 1
+            elif current[activity_date] < last_index:
+                FileNameSequence.query.filter_by(activity_date=activity_date).update({'last_index': last_index})
+                raised += 1
+        db.session.commit()
+        print(f"[OK] Migration completed successfully ({seeded} dates seeded, {raised} raised)")
+
+if __name__ == '__main__':
+    run_migration()
@@ -0,0 +1,26 @@
+-- Migration: Add file_name_sequences table
+-- Date: 2026-10-19
+-- Description: Per-date counters for sequential YYYY-MM-DD_XXX filenames, reserved atomically
+--              (UPDATE ... RETURNING / INSERT ... ON CONFLICT) instead of counting files per upload
+
+CREATE TABLE IF NOT EXISTS file_name_sequences (
+    activity_date DATE PRIMARY KEY,
+    last_index INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Continue after the highest YYYY-MM-DD_XXX index already used for each date,
+-- or the file count of the previous count-based scheme if that is larger
+INSERT INTO file_name_sequences (activity_date, last_index)
+SELECT activity_date,
+       GREATEST(
+           COUNT(*),
+           COALESCE(MAX(CAST(substring(
+               filename FROM '^' || to_char(activity_date, 'YYYY-MM-DD') || '_([0-9]{1,9})(\.[^.]*)?$'
+           ) AS INTEGER)), 0)
+       )
+FROM files
+WHERE activity_date IS NOT NULL
+GROUP BY activity_date
+ON CONFLICT (activity_date) DO UPDATE
+SET last_index = GREATEST(file_name_sequences.last_index, EXCLUDED.last_index);
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Migration: Add thumbhash generation attempts to files table
+Date: 2026-10-19
+Description: thumbhash_attempts counts failed background/backfill thumbhash fetches so persistent failures can be skipped
+
+Usage:
+    python migrations/add_file_thumbhash_attempts.py
+"""
+
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from flask import Flask
+from extensions import db
+from config import config
+
+
+def run_migration():
+    """Run the migration"""
+    app = Flask(__name__)
+    app.config.from_object(config[os.environ.get('FLASK_ENV', 'development')])
+    
+    db.init_app(app)
+    
+    with app.app_context():
+        # Check if column already exists
+        from sqlalchemy import inspect
+        inspector = inspect(db.engine)
+        columns = [col['name'] for col in inspector.get_columns('files')]
+        
+        if 'thumbhash_attempts' in columns:
+            print("[SKIP] Column 'thumbhash_attempts' already exists in files table")
+            return
+        
+        print("[...] Adding 'thumbhash_attempts' column to files table")
+        db.session.execute(db.text(
+            "ALTER TABLE files ADD COLUMN thumbhash_attempts INTEGER NOT NULL DEFAULT 0"
+        ))
+        db.session.commit()
+        print("[OK] Migration completed successfully")
+
+
+if __name__ == '__main__':
+    run_migration()
@@ -0,0 +1,5 @@
+-- Migration: Add thumbhash generation attempts to files table
+-- Date: 2026-10-19
+-- Description: thumbhash_attempts counts failed background/backfill thumbhash fetches so persistent failures can be skipped
+
+ALTER TABLE files ADD COLUMN thumbhash_attempts INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Migration: Add unique (directory, filename) index to files table
+Date: 2026-10-19
+Description: directory + filename is a file's identity (s3_key is shared by deduplicated files);
+             upload-url and check-filenames duplicate checks become lookups on this index
+
+Usage:
+    python migrations/add_files_directory_filename_unique.py
+"""
+
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from flask import Flask
+from extensions import db
+from config import config
+
+
+def run_migration():
+    """Run the migration"""
+    app = Flask(__name__)
+    app.config.from_object(config[os.environ.get('FLASK_ENV', 'development')])
+    
+    db.init_app(app)
+    
+    with app.app_context():
+        # Check if index already exists
+        from sqlalchemy import inspect
+        inspector = inspect(db.engine)
+        indexes = [index['name'] for index in inspector.get_indexes('files')]
+        
+        if 'uq_files_directory_filename' in indexes:
+            print("[SKIP] Index 'uq_files_directory_filename' already exists on files table")
+            return
+        
+        # The unique index cannot be built while duplicates exist
+        duplicates = db.session.execute(db.text(
+            "SELECT directory, filename, COUNT(*) AS count FROM files "
+            "GROUP BY directory, filename HAVING COUNT(*) > 1 "
+            "ORDER BY directory, filename"
+        )).fetchall()
+        
+        if duplicates:
+            print(f"[ERROR] {len(duplicates)} duplicate directory/filename pairs, resolve them first:")
+            for row in duplicates[:50]:
+                print(f"  {row.directory}/{row.filename} ({row.count} files)")
+            if len(duplicates) > 50:
+                print(f"  ... and {len(duplicates) - 50} more")
+            sys.exit(1)
+        
+        print("[...] Creating unique index 'uq_files_directory_filename' on files(directory, filename)")
+        db.session.execute(db.text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_files_directory_filename ON files(directory, filename)"
+        ))
+        db.session.commit()
+        print("[OK] Migration completed successfully")
+
+
+if __name__ == '__main__':
+    run_migration()
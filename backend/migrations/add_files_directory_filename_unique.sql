@@ -0,0 +1,9 @@
+-- Migration: Add unique (directory, filename) index to files table
+-- Date: 2026-10-19
+-- Description: directory + filename is a file's identity (s3_key is shared by deduplicated files);
+--              upload-url and check-filenames duplicate checks become lookups on this index
+
+-- Existing duplicates must be resolved first, otherwise the index cannot be created:
+-- SELECT directory, filename, COUNT(*) FROM files GROUP BY directory, filename HAVING COUNT(*) > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_files_directory_filename ON files(directory, filename);
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Migration: Add jobs and job_items tables
+Date: 2026-10-19
+Description: Background jobs for large batch operations with resumable progress and
+             per-item results
+
+Usage:
+    python migrations/add_jobs.py
+"""
+
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from flask import Flask
+from extensions import db
+from config import config
+
+
+def run_migration():
+    """Run the migration"""
+    app = Flask(__name__)
+    app.config.from_object(config[os.environ.get('FLASK_ENV', 'development')])
+    
+    db.init_app(app)
+    
+    with app.app_context():
+        from sqlalchemy import inspect
+        from auth.models import User  # noqa: F401 - referenced by jobs
+        from files.job_models import Job, JobItem
+        
+        inspector = inspect(db.engine)
+        tables = inspector.get_table_names()
+        
+        for model in (Job, JobItem):
+            name = model.__tablename__
+            if name in tables:
+                print(f"[SKIP] Table '{name}' already exists")
+                continue
+            
+            print(f"[...] Creating '{name}' table")
+            model.__table__.create(db.engine, checkfirst=True)
+        
+        print("[OK] Migration completed successfully")
+
+
+if __name__ == '__main__':
+    run_migration()
@@ -0,0 +1,44 @@
+-- Migration: Add jobs and job_items tables
+-- Date: 2026-10-19
+-- Description: Background jobs for large batch operations (delete, update, tag) with
+--              resumable progress and per-item results
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id SERIAL PRIMARY KEY,
+    type VARCHAR(50) NOT NULL,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    params JSON NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    total INTEGER NOT NULL DEFAULT 0,
+    processed INTEGER NOT NULL DEFAULT 0,
+    succeeded_count INTEGER NOT NULL DEFAULT 0,
+    failed_count INTEGER NOT NULL DEFAULT 0,
+    result JSON,
+    locked_by VARCHAR(100),
+    heartbeat_at TIMESTAMP,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_jobs_user_id ON jobs(user_id);
+
+-- Workers claim pending jobs by (status, created_at)
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at);
+
+CREATE TABLE IF NOT EXISTS job_items (
+    id SERIAL PRIMARY KEY,
+    job_id INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    item_id INTEGER NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    error TEXT
+);
+
+-- GET /api/jobs/<id>/items pages by (job_id, seq)
+CREATE INDEX IF NOT EXISTS idx_job_items_job_seq ON job_items(job_id, seq);
+
+COMMENT ON COLUMN jobs.processed IS 'Items before this position are done; an interrupted job resumes here';
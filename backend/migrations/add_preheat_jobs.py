@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Migration: Add preheat_jobs table
+Date: 2026-10-19
+Description: Persistent, resumable queue for HLS transcode preheat
+
+Usage:
+    python migrations/add_preheat_jobs.py
+"""
+
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from flask import Flask
+from extensions import db
+from config import config
+
+
+def run_migration():
+    """Run the migration"""
+    app = Flask(__name__)
+    app.config.from_object(config[os.environ.get('FLASK_ENV', 'development')])
+    
+    db.init_app(app)
+    
+    with app.app_context():
+        from sqlalchemy import inspect
+        from auth.models import User  # noqa: F401 - referenced by files
+        from files.models import File  # noqa: F401 - referenced by preheat_jobs
+        from files.preheat_models import PreheatJob
+        
+        inspector = inspect(db.engine)
+        if 'preheat_jobs' in inspector.get_table_names():
+            print("[SKIP] Table 'preheat_jobs' already exists")
+            return
+        
+        print("[...] Creating 'preheat_jobs' table")
+        PreheatJob.__table__.create(db.engine, checkfirst=True)
+        print("[OK] Migration completed successfully")
+
+
+if __name__ == '__main__':
+    run_migration()
@@ -0,0 +1,25 @@
+-- Migration: Add preheat_jobs table
+-- Date: 2026-10-19
+-- Description: Persistent, resumable queue for HLS transcode preheat
+
+CREATE TABLE IF NOT EXISTS preheat_jobs (
+    id SERIAL PRIMARY KEY,
+    file_id INTEGER NOT NULL UNIQUE REFERENCES files(id) ON DELETE CASCADE,
+    s3_key VARCHAR(1000) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    segments_done INTEGER NOT NULL DEFAULT 0,
+    segments_total INTEGER NOT NULL DEFAULT 0,
+    next_run_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    locked_by VARCHAR(100),
+    heartbeat_at TIMESTAMP,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- Workers claim due jobs by (status, next_run_at)
+CREATE INDEX IF NOT EXISTS idx_preheat_jobs_status_next_run ON preheat_jobs(status, next_run_at);
+
+COMMENT ON COLUMN preheat_jobs.segments_done IS 'Resume point: segments before this index were already requested';
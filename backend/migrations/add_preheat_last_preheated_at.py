@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Migration: Add last_preheated_at to preheat_jobs
+Date: 2026-10-19
+Description: Track when each video was last fully warmed so nightly preheat only re-warms what is about to expire
+
+Usage:
+    python migrations/add_preheat_last_preheated_at.py
+"""
+
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from flask import Flask
+from extensions import db
+from config import config
+
+
+def run_migration():
+    """Run the migration"""
+    app = Flask(__name__)
+    app.config.from_object(config[os.environ.get('FLASK_ENV', 'development')])
+    
+    db.init_app(app)
+    
+    with app.app_context():
+        # Check if column already exists
+        from sqlalchemy import inspect
+        inspector = inspect(db.engine)
+        columns = [col['name'] for col in inspector.get_columns('preheat_jobs')]
+        
+        if 'last_preheated_at' in columns:
+            print("[SKIP] Column 'last_preheated_at' already exists in preheat_jobs table")
+            return
+        
+        print("[...] Adding 'last_preheated_at' column to preheat_jobs table")
+        db.session.execute(db.text(
+            "ALTER TABLE preheat_jobs ADD COLUMN last_preheated_at TIMESTAMP DEFAULT NULL"
+        ))
+        db.session.execute(db.text(
+            "CREATE INDEX IF NOT EXISTS idx_preheat_jobs_last_preheated_at ON preheat_jobs(last_preheated_at)"
+        ))
+        
+        print("[...] Backfilling from succeeded jobs")
+        db.session.execute(db.text(
+            "UPDATE preheat_jobs SET last_preheated_at = finished_at "
+            "WHERE status = 'succeeded' AND last_preheated_at IS NULL"
+        ))
+        
+        db.session.commit()
+        print("[OK] Migration completed successfully")
+
+
+if __name__ == '__main__':
+    run_migration()
@@ -0,0 +1,10 @@
+-- Migration: Add last_preheated_at to preheat_jobs
+-- Date: 2026-10-19
+-- Description: Track when each video was last fully warmed so nightly preheat only re-warms what is about to expire
+
+ALTER TABLE preheat_jobs ADD COLUMN last_preheated_at TIMESTAMP DEFAULT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_preheat_jobs_last_preheated_at ON preheat_jobs(last_preheated_at);
+
+-- Backfill from jobs that already succeeded
+UPDATE preheat_jobs SET last_preheated_at = finished_at WHERE status = 'succeeded' AND last_preheated_at IS NULL;
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Migration: Add cache_versions table and tags.version
+Date: 2026-10-19
+Description: Shared version counters for per-process caches; tags are stamped with the
+             'tags' version of their last change for the in-memory autocomplete index
+
+Usage:
+    python migrations/add_tag_index_versions.py
+"""
+
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from flask import Flask
+from extensions import db
+from config import config
+
+
+def run_migration():
+    """Run the migration"""
+    app = Flask(__name__)
+    app.config.from_object(config[os.environ.get('FLASK_ENV', 'development')])
+    
+    db.init_app(app)
+    
+    with app.app_context():
+        from sqlalchemy import inspect
+        from files.cache_models import CacheVersion
+        
+        inspector = inspect(db.engine)
+        if 'cache_versions' in inspector.get_table_names():
+            print("[SKIP] Table 'cache_versions' already exists")
+        else:
+            print("[...] Creating 'cache_versions' table")
+            CacheVersion.__table__.create(db.engine, checkfirst=True)
+        
+        columns = [col['name'] for col in inspector.get_columns('tags')]
+        if 'version' not in columns:
+            print("[...] Adding 'version' column to tags table")
+            db.session.execute(db.text(
+                "ALTER TABLE tags ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+            ))
+        else:
+            print("[SKIP] Column 'version' already exists in tags table")
+        
+        print("[...] Creating index on tags.version")
+        db.session.execute(db.text(
+            "CREATE INDEX IF NOT EXISTS ix_tags_version ON tags(version)"
+        ))
+        
+        db.session.commit()
+        print("[OK] Migration completed successfully")
+
+
+if __name__ == '__main__':
+    run_migration()
@@ -0,0 +1,16 @@
+-- Migration: Add cache_versions table and tags.version
+-- Date: 2026-10-19
+-- Description: Shared version counters for per-process caches; every tag change stamps the tag
+--              with a new 'tags' version so the in-memory autocomplete index reloads only changed tags
+
+CREATE TABLE IF NOT EXISTS cache_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+ALTER TABLE tags ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS ix_tags_version ON tags(version);
+
+COMMENT ON COLUMN tags.version IS 'cache_versions[tags] value of the last change to the tag or its file associations';
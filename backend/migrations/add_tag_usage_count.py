@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Migration: Add tags.usage_count
+Date: 2026-10-19
+Description: Denormalized number of files per tag, maintained with every association change,
+             so tag listing and the autocomplete index no longer aggregate file_tags
+
+Usage:
+    python migrations/add_tag_usage_count.py
+"""
+
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from flask import Flask
+from extensions import db
+from config import config
+
+
+def run_migration():
+    """Run the migration"""
+    app = Flask(__name__)
+    app.config.from_object(config[os.environ.get('FLASK_ENV', 'development')])
+    
+    db.init_app(app)
+    
+    with app.app_context():
+        from sqlalchemy import inspect
+        
+        inspector = inspect(db.engine)
+        columns = [col['name'] for col in inspector.get_columns('tags')]
+        if 'usage_count' not in columns:
+            print("[...] Adding 'usage_count' column to tags table")
+            db.session.execute(db.text(
+                "ALTER TABLE tags ADD COLUMN usage_count INTEGER NOT NULL DEFAULT 0"
+            ))
+        else:
+            print("[SKIP] Column 'usage_count' already exists in tags table")
+        
+        print("[...] Backfilling tags.usage_count from file_tags")
+        result = db.session.execute(db.text(
+            "UPDATE tags SET usage_count = ("
+            "SELECT COUNT(*) FROM file_tags WHERE file_tags.tag_id = tags.id)"
+        ))
+        print(f"[OK] Updated {result.rowcount} tags")
+        
+        print("[...] Creating index on tags(usage_count DESC, name)")
+        db.session.execute(db.text(
+            "CREATE INDEX IF NOT EXISTS idx_tags_usage_count_name ON tags(usage_count DESC, name)"
+        ))
+        
+        db.session.commit()
+        print("[OK] Migration completed successfully")
+
+
+if __name__ == '__main__':
+    run_migration()
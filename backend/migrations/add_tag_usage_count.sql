@@ -0,0 +1,15 @@
+-- Migration: Add tags.usage_count
+-- Date: 2026-10-19
+-- Description: Denormalized number of files per tag, maintained with every association change,
+--              so tag listing and the autocomplete index no longer aggregate file_tags
+
+ALTER TABLE tags ADD COLUMN IF NOT EXISTS usage_count INTEGER NOT NULL DEFAULT 0;
+
+-- Backfill from the junction table (check later with: flask verify-tag-counts)
+UPDATE tags SET usage_count = (
+    SELECT COUNT(*) FROM file_tags WHERE file_tags.tag_id = tags.id
+);
+
+CREATE INDEX IF NOT EXISTS idx_tags_usage_count_name ON tags(usage_count DESC, name);
+
+COMMENT ON COLUMN tags.usage_count IS 'Number of file_tags rows for the tag, maintained by TagService';
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Migration: Add upload_sessions table
+Date: 2026-10-19
+Description: Resumable S3 multipart upload sessions for large files
+
+Usage:
+    python migrations/add_upload_sessions.py
+"""
+
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from flask import Flask
+from extensions import db
+from config import config
+
+
+def run_migration():
+    """Run the migration"""
+    app = Flask(__name__)
+    app.config.from_object(config[os.environ.get('FLASK_ENV', 'development')])
+    
+    db.init_app(app)
+    
+    with app.app_context():
+        from sqlalchemy import inspect
+        from auth.models import User  # noqa: F401 - referenced by upload_sessions
+        from files.upload_models import UploadSession
+        
+        inspector = inspect(db.engine)
+        if 'upload_sessions' in inspector.get_table_names():
+            print("[SKIP] Table 'upload_sessions' already exists")
+            return
+        
+        print("[...] Creating 'upload_sessions' table")
+        UploadSession.__table__.create(db.engine, checkfirst=True)
+        print("[OK] Migration completed successfully")
+
+
+if __name__ == '__main__':
+    run_migration()
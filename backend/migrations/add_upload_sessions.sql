@@ -0,0 +1,28 @@
+-- Migration: Add upload_sessions table
+-- Date: 2026-10-19
+-- Description: Resumable S3 multipart upload sessions for large files
+
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    id SERIAL PRIMARY KEY,
+    upload_id VARCHAR(1024) NOT NULL,
+    s3_key VARCHAR(1000) NOT NULL,
+    uploader_id INTEGER NOT NULL REFERENCES users(id),
+    original_filename VARCHAR(255) NOT NULL,
+    content_type VARCHAR(100),
+    size BIGINT NOT NULL,
+    part_size BIGINT NOT NULL,
+    part_count INTEGER NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'active',
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    completed_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_upload_sessions_s3_key ON upload_sessions(s3_key);
+CREATE INDEX IF NOT EXISTS ix_upload_sessions_uploader_id ON upload_sessions(uploader_id);
+
+-- flask cleanup-multipart finds expired active sessions by (status, expires_at)
+CREATE INDEX IF NOT EXISTS idx_upload_sessions_status_expires ON upload_sessions(status, expires_at);
+
+COMMENT ON COLUMN upload_sessions.upload_id IS 'S3 multipart UploadId';
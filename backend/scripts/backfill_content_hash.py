@@ -0,0 +1,157 @@
+"""
+内容哈希补齐脚本
+为 content_hash 为空的文件计算 SHA-256，用于上传去重（相同内容的上传可直接引用已有对象）
+
+使用方式：
+1. Flask CLI: flask backfill-content-hash
+2. 直接运行: python scripts/backfill_content_hash.py
+3. cron 定时: 0 2 * * 0 cd /path/to/backend && flask backfill-content-hash --limit 5000
+
+按 id 分批读取，每批由 --concurrency 个线程同时计算不同对象的哈希；
+每个对象按 --chunk-size 分段读取（HTTP Range），最多 --range-workers 段并行预读，
+按顺序送入哈希，内存占用约为 concurrency × range-workers × chunk-size。
+共用同一对象的文件只读取一次，每批结果一次性写回数据库。
+"""
+import sys
+import os
+
+# 添加项目根目录到 path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import click
+from flask.cli import with_appcontext
+
+try:
+    from tqdm import tqdm
+    HAS_TQDM = True
+except ImportError:
+    HAS_TQDM = False
+
+
+def run_backfill(batch_size: int, concurrency: int, range_workers: int, chunk_mb: int,
+                 limit: int, echo=click.echo) -> dict:
+    """
+    补齐缺失的内容哈希，并输出进度
+
+    Args:
+        batch_size: 每批文件数
+        concurrency: 同时计算哈希的对象数
+        range_workers: 每个对象并行预读的分段数
+        chunk_mb: 每段大小（MB）
+        limit: 最多处理的文件数，0 表示不限
+        echo: 输出函数
+
+    Returns:
+        汇总结果
+    """
+    from services.content_hash_service import content_hash_service
+
+    total = content_hash_service.missing_query().count()
+    if limit:
+        total = min(total, limit)
+    echo(f'[ContentHash] 找到 {total} 个文件缺少内容哈希')
+
+    progress = tqdm(total=total, desc='补齐进度', unit='个') if HAS_TQDM else None
+    done = {'processed': 0, 'hashed': 0}
+
+    def on_batch(processed, hashed, bytes_read):
+        done['processed'] += processed
+        done['hashed'] += hashed
+        if progress is not None:
+            progress.update(processed)
+            progress.set_postfix(已读=f'{bytes_read / 1024 ** 3:.2f}GB')
+        else:
+            echo(f'  已处理 {done["processed"]}/{total}，成功 {done["hashed"]}，'
+                 f'已读取 {bytes_read / 1024 ** 3:.2f}GB')
+
+    summary = content_hash_service.backfill(
+        batch_size=batch_size,
+        concurrency=concurrency,
+        range_workers=range_workers,
+        chunk_size=chunk_mb * 1024 * 1024,
+        limit=limit,
+        on_batch=on_batch
+    )
+
+    if progress is not None:
+        progress.close()
+    return summary
+
+
+def print_summary(summary: dict, echo=click.echo):
+    """输出补齐汇总"""
+    elapsed = summary['elapsed']
+    throughput = summary['bytes'] / 1024 ** 2 / elapsed if elapsed > 0 else 0.0
+
+    echo(f'\n[ContentHash] 完成!')
+    echo(f'  文件: 成功 {summary["hashed"]}, 失败 {summary["failed"]}')
+    echo(f'  读取: {summary["bytes"] / 1024 ** 3:.2f}GB, 耗时 {elapsed:.1f} 秒, {throughput:.1f} MB/秒')
+
+
+@click.command('backfill-content-hash')
+@click.option('--batch-size', default=100, help='每批处理的文件数，默认100')
+@click.option('--concurrency', default=4, type=click.IntRange(1, 32), help='同时计算哈希的对象数，默认4')
+@click.option('--range-workers', default=4, type=click.IntRange(1, 16), help='每个对象并行预读的分段数，默认4')
+@click.option('--chunk-size', 'chunk_mb', default=8, type=click.IntRange(1, 256), help='每段大小（MB），默认8')
+@click.option('--limit', default=0, help='最多处理的文件数，0 为不限')
+@click.option('--dry-run', is_flag=True, help='只统计缺少内容哈希的文件，不实际执行')
+@with_appcontext
+def backfill_content_hash_command(batch_size: int, concurrency: int, range_workers: int, chunk_mb: int,
+                                  limit: int, dry_run: bool):
+    """为缺少内容哈希的文件补齐 SHA-256"""
+    from services.content_hash_service import content_hash_service
+
+    if dry_run:
+        from extensions import db
+        from files.models import File
+
+        query = content_hash_service.missing_query()
+        total = query.count()
+        total_bytes = query.with_entities(db.func.coalesce(db.func.sum(File.size), 0)).scalar()
+        click.echo(f'[ContentHash] Dry run 模式，{total} 个文件缺少内容哈希，共 {total_bytes / 1024 ** 3:.2f}GB')
+        return
+
+    click.echo(f'[ContentHash] 并发对象: {concurrency}, 每对象预读: {range_workers} 段 × {chunk_mb}MB, '
+               f'每批: {batch_size}')
+    summary = run_backfill(
+        batch_size=batch_size,
+        concurrency=concurrency,
+        range_workers=range_workers,
+        chunk_mb=chunk_mb,
+        limit=limit
+    )
+    print_summary(summary)
+
+
+def register_commands(app):
+    """注册 CLI 命令到 Flask app"""
+    app.cli.add_command(backfill_content_hash_command)
+
+
+if __name__ == '__main__':
+    # 直接运行时，创建 Flask app context
+    from app import create_app
+    app = create_app()
+
+    with app.app_context():
+        concurrency = 4
+        range_workers = 4
+        limit = 0
+
+        for arg in sys.argv[1:]:
+            if arg.startswith('--concurrency='):
+                concurrency = max(int(arg.split('=')[1]), 1)
+            elif arg.startswith('--range-workers='):
+                range_workers = max(int(arg.split('=')[1]), 1)
+            elif arg.startswith('--limit='):
+                limit = int(arg.split('=')[1])
+
+        summary = run_backfill(
+            batch_size=100,
+            concurrency=concurrency,
+            range_workers=range_workers,
+            chunk_mb=8,
+            limit=limit,
+            echo=print
+        )
+        print_summary(summary, echo=print)
@@ -0,0 +1,170 @@
+"""
+Thumbhash 补齐脚本
+为 thumbhash 为空的图片/视频生成缩略图占位（上传时后台生成失败或被丢弃的文件）
+
+使用方式：
+1. Flask CLI: flask backfill-thumbhash
+2. 直接运行: python scripts/backfill_thumbhash.py
+3. cron 定时: 30 4 * * * cd /path/to/backend && flask backfill-thumbhash --max-attempts 5
+
+按 id 分批读取，每批由 --concurrency 个线程并行请求缤纷云 thumbhash 服务，
+所有请求共享 --rate 令牌桶限速，每批结果一次性写回数据库。
+--local 时图片改为下载小尺寸缩略图、由 --processes 个进程在本地编码（需要 numpy 和 Pillow），
+视频仍使用缤纷云抽帧。
+失败次数记录在 files.thumbhash_attempts，--max-attempts 可跳过反复失败的文件。
+"""
+import sys
+import os
+
+# 添加项目根目录到 path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import click
+from flask.cli import with_appcontext
+
+try:
+    from tqdm import tqdm
+    HAS_TQDM = True
+except ImportError:
+    HAS_TQDM = False
+
+
+def run_backfill(batch_size: int, concurrency: int, rate: float, max_attempts: int,
+                 retries: int, limit: int, local: bool = None, processes: int = 0,
+                 echo=click.echo) -> dict:
+    """
+    补齐缺失的 thumbhash，并输出进度
+
+    Args:
+        batch_size: 每批文件数
+        concurrency: 并行请求数
+        rate: 全局请求速率上限（个/秒），0 表示不限速
+        max_attempts: 跳过已失败该次数的文件，0 表示不跳过
+        retries: 本次运行中每个文件的重试次数
+        limit: 最多处理的文件数，0 表示不限
+        local: 图片是否在本地编码，None 表示取 THUMBHASH_LOCAL_ENCODE
+        processes: 本地编码进程数，0 表示 CPU 核数
+        echo: 输出函数
+
+    Returns:
+        汇总结果
+    """
+    from services.thumbhash_service import thumbhash_service
+
+    total = thumbhash_service.missing_query(max_attempts).count()
+    if limit:
+        total = min(total, limit)
+    echo(f'[Thumbhash] 找到 {total} 个文件缺少 thumbhash')
+
+    progress = tqdm(total=total, desc='补齐进度', unit='个') if HAS_TQDM else None
+    done = {'processed': 0, 'filled': 0}
+
+    def on_batch(processed, filled):
+        done['processed'] += processed
+        done['filled'] += filled
+        if progress is not None:
+            progress.update(processed)
+        else:
+            echo(f'  已处理 {done["processed"]}/{total}，成功 {done["filled"]}')
+
+    summary = thumbhash_service.backfill(
+        batch_size=batch_size,
+        concurrency=concurrency,
+        rate=rate,
+        max_attempts=max_attempts,
+        retries=retries,
+        limit=limit,
+        local=local,
+        processes=processes,
+        on_batch=on_batch
+    )
+
+    if progress is not None:
+        progress.close()
+    return summary
+
+
+def print_summary(summary: dict, echo=click.echo):
+    """输出补齐汇总"""
+    elapsed = summary['elapsed']
+    rate = summary['processed'] / elapsed if elapsed > 0 else 0.0
+
+    echo(f'\n[Thumbhash] 完成!')
+    echo(f'  文件: 成功 {summary["filled"]}, 失败 {summary["failed"]}')
+    echo(f'  耗时: {elapsed:.1f} 秒, {rate:.2f} 个/秒')
+
+
+@click.command('backfill-thumbhash')
+@click.option('--batch-size', default=200, help='每批处理的文件数，默认200')
+@click.option('--concurrency', default=8, type=click.IntRange(1, 64), help='并行请求数，默认8')
+@click.option('--rate', default=10.0, help='全局请求速率上限（个/秒），0 为不限速，默认10')
+@click.option('--max-attempts', default=0, help='跳过已失败该次数的文件，0 为不跳过')
+@click.option('--retries', default=1, help='本次运行中每个文件的重试次数，默认1')
+@click.option('--limit', default=0, help='最多处理的文件数，0 为不限')
+@click.option('--local/--remote', default=None,
+              help='图片在本地编码 / 全部使用缤纷云 thumbhash，默认取 THUMBHASH_LOCAL_ENCODE')
+@click.option('--processes', default=0, help='本地编码进程数，0 为 CPU 核数')
+@click.option('--dry-run', is_flag=True, help='只统计缺少 thumbhash 的文件，不实际执行')
+@with_appcontext
+def backfill_thumbhash_command(batch_size: int, concurrency: int, rate: float, max_attempts: int,
+                               retries: int, limit: int, local: bool, processes: int, dry_run: bool):
+    """为缺少 thumbhash 的图片/视频补齐缩略图占位"""
+    from services.thumbhash_service import thumbhash_service
+
+    if dry_run:
+        total = thumbhash_service.missing_query(max_attempts).count()
+        click.echo(f'[Thumbhash] Dry run 模式，{total} 个文件缺少 thumbhash')
+        return
+
+    click.echo(f'[Thumbhash] 并发: {concurrency}, 限速: {rate or "不限"} 个/秒, 每批: {batch_size}')
+    try:
+        summary = run_backfill(
+            batch_size=batch_size,
+            concurrency=concurrency,
+            rate=rate,
+            max_attempts=max_attempts,
+            retries=retries,
+            limit=limit,
+            local=local,
+            processes=processes
+        )
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    print_summary(summary)
+
+
+def register_commands(app):
+    """注册 CLI 命令到 Flask app"""
+    app.cli.add_command(backfill_thumbhash_command)
+
+
+if __name__ == '__main__':
+    # 直接运行时，创建 Flask app context
+    from app import create_app
+    app = create_app()
+
+    with app.app_context():
+        concurrency = 8
+        rate = 10.0
+        max_attempts = 0
+        local = '--local' in sys.argv or None
+
+        for arg in sys.argv[1:]:
+            if arg.startswith('--concurrency='):
+                concurrency = max(int(arg.split('=')[1]), 1)
+            elif arg.startswith('--rate='):
+                rate = float(arg.split('=')[1])
+            elif arg.startswith('--max-attempts='):
+                max_attempts = int(arg.split('=')[1])
+
+        summary = run_backfill(
+            batch_size=200,
+            concurrency=concurrency,
+            rate=rate,
+            max_attempts=max_attempts,
+            retries=1,
+            limit=0,
+            local=local,
+            echo=print
+        )
+        print_summary(summary, echo=print)
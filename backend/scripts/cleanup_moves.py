@@ -0,0 +1,98 @@
+"""
+移动文件清理脚本
+删除移动文件后遗留的旧 S3 对象（请求中途崩溃或批量删除失败时留下的）
+
+使用方式：
+1. Flask CLI: flask cleanup-moves
+2. 直接运行: python scripts/cleanup_moves.py
+3. cron 定时: 30 5 * * * cd /path/to/backend && flask cleanup-moves
+
+文件记录改指向新对象时会在同一事务中写入移动日志（file_moves），旧对象在提交后批量删除；
+日志中仍为 pending 的记录由本脚本继续处理。仍被其他文件引用的旧对象会保留。
+"""
+import sys
+import os
+
+# 添加项目根目录到 path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import click
+from datetime import timedelta
+from flask.cli import with_appcontext
+
+
+RESULTS = {
+    'deleted': '已删除',
+    'kept': '仍被引用，保留',
+    'error': '删除失败'
+}
+
+
+def run_cleanup(older_than_minutes: float = 10, dry_run: bool = False, verbose: bool = False,
+                echo=click.echo) -> dict:
+    """
+    删除遗留的旧对象，并输出结果
+
+    Args:
+        older_than_minutes: 只处理早于该时长的记录（避免与正在进行的请求同时删除），0 表示全部
+        dry_run: 只列出要删除的对象
+        verbose: 显示每个处理的对象
+        echo: 输出函数
+
+    Returns:
+        汇总结果
+    """
+    from services.move_service import move_service
+
+    def on_move(row, result):
+        if verbose or dry_run or result == 'error':
+            label = '将删除' if dry_run and result == 'deleted' else RESULTS.get(result, result)
+            echo(f'  - {row.source_key} -> {row.target_key} ({label})')
+
+    older_than = timedelta(minutes=older_than_minutes) if older_than_minutes else None
+    return move_service.cleanup(older_than=older_than, dry_run=dry_run, on_move=on_move)
+
+
+def print_summary(summary: dict, dry_run: bool = False, echo=click.echo):
+    """输出清理汇总"""
+    action = '将删除' if dry_run else '已删除'
+    echo(f'\n[Move] {action}旧对象 {summary["deleted"]} 个, '
+         f'仍被引用 {summary["kept"]} 个, 失败 {summary["errors"]} 个')
+
+
+@click.command('cleanup-moves')
+@click.option('--older-than', default=10, type=float,
+              help='只处理早于多少分钟的移动记录，默认 10，0 表示全部')
+@click.option('--dry-run', is_flag=True, help='只列出要删除的旧对象，不实际执行')
+@click.option('--verbose', '-v', is_flag=True, help='显示每个处理的对象')
+@with_appcontext
+def cleanup_moves_command(older_than: float, dry_run: bool, verbose: bool):
+    """删除移动文件后遗留的旧 S3 对象"""
+    if dry_run:
+        click.echo('[Move] Dry run 模式，不会实际删除对象')
+
+    summary = run_cleanup(older_than_minutes=older_than, dry_run=dry_run, verbose=verbose)
+    print_summary(summary, dry_run=dry_run)
+
+
+def register_commands(app):
+    """注册 CLI 命令到 Flask app"""
+    app.cli.add_command(cleanup_moves_command)
+
+
+if __name__ == '__main__':
+    # 直接运行时，创建 Flask app context
+    from app import create_app
+    app = create_app()
+
+    with app.app_context():
+        dry_run = '--dry-run' in sys.argv
+        older_than_minutes = 10
+
+        for arg in sys.argv[1:]:
+            if arg.startswith('--older-than='):
+                older_than_minutes = float(arg.split('=')[1])
+
+        summary = run_cleanup(older_than_minutes=older_than_minutes, dry_run=dry_run,
+                              verbose='--verbose' in sys.argv)
+        print_summary(summary, dry_run=dry_run)
@@ -0,0 +1,96 @@
+"""
+分片上传清理脚本
+中止被放弃的 S3 分片上传，释放已上传分片占用的存储
+
+使用方式：
+1. Flask CLI: flask cleanup-multipart
+2. 直接运行: python scripts/cleanup_multipart.py
+3. cron 定时: 0 5 * * * cd /path/to/backend && flask cleanup-multipart
+
+过期（超过 MULTIPART_SESSION_TTL_HOURS 没有签名新分片）的上传会话会被中止并标记为 aborted；
+存储桶中没有对应活跃会话、且发起时间早于 --older-than 的分片上传（例如服务中途崩溃遗留的）也会被中止。
+"""
+import sys
+import os
+
+# 添加项目根目录到 path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import click
+from datetime import timedelta
+from flask.cli import with_appcontext
+
+
+REASONS = {
+    'expired': '会话过期',
+    'orphaned': '无对应会话'
+}
+
+
+def run_cleanup(older_than_hours: float = None, dry_run: bool = False, verbose: bool = False,
+                echo=click.echo) -> dict:
+    """
+    中止被放弃的分片上传，并输出结果
+
+    Args:
+        older_than_hours: 无会话的分片上传超过该时长才中止，None 表示使用 MULTIPART_SESSION_TTL_HOURS
+        dry_run: 只列出要中止的上传
+        verbose: 显示每个被中止的上传
+        echo: 输出函数
+
+    Returns:
+        汇总结果
+    """
+    from services.multipart_upload_service import multipart_upload_service
+
+    def on_abort(s3_key, reason):
+        if verbose or dry_run:
+            echo(f'  - {s3_key} ({REASONS.get(reason, reason)})')
+
+    older_than = timedelta(hours=older_than_hours) if older_than_hours else None
+    return multipart_upload_service.cleanup(older_than=older_than, dry_run=dry_run, on_abort=on_abort)
+
+
+def print_summary(summary: dict, dry_run: bool = False, echo=click.echo):
+    """输出清理汇总"""
+    action = '将中止' if dry_run else '已中止'
+    echo(f'\n[Multipart] {action}: 过期会话 {summary["expired_sessions"]} 个, '
+         f'无会话上传 {summary["orphaned_uploads"]} 个, 失败 {summary["errors"]} 个')
+
+
+@click.command('cleanup-multipart')
+@click.option('--older-than', default=None, type=float,
+              help='无会话的分片上传超过多少小时才中止，默认取 MULTIPART_SESSION_TTL_HOURS')
+@click.option('--dry-run', is_flag=True, help='只列出要中止的上传，不实际执行')
+@click.option('--verbose', '-v', is_flag=True, help='显示每个被中止的上传')
+@with_appcontext
+def cleanup_multipart_command(older_than: float, dry_run: bool, verbose: bool):
+    """中止被放弃的分片上传"""
+    if dry_run:
+        click.echo('[Multipart] Dry run 模式，不会实际中止上传')
+
+    summary = run_cleanup(older_than_hours=older_than, dry_run=dry_run, verbose=verbose)
+    print_summary(summary, dry_run=dry_run)
+
+
+def register_commands(app):
+    """注册 CLI 命令到 Flask app"""
+    app.cli.add_command(cleanup_multipart_command)
+
+
+if __name__ == '__main__':
+    # 直接运行时，创建 Flask app context
+    from app import create_app
+    app = create_app()
+
+    with app.app_context():
+        dry_run = '--dry-run' in sys.argv
+        older_than_hours = None
+
+        for arg in sys.argv[1:]:
+            if arg.startswith('--older-than='):
+                older_than_hours = float(arg.split('=')[1])
+
+        summary = run_cleanup(older_than_hours=older_than_hours, dry_run=dry_run,
+                              verbose='--verbose' in sys.argv)
+        print_summary(summary, dry_run=dry_run)
@@ -12,7 +12,9 @@ from datetime import date
 from app import create_app
 from extensions import db
 from files.models import File
-from services.s3_service import s3_service
+from services.content_hash_service import content_hash_service
+from services.preheat_job_service import preheat_job_service
+from services.tag_service import tag_service
 
 def delete_files_by_date(target_date: date, dry_run: bool = True):
     """
@@ -47,8 +49,10 @@ def delete_files_by_date(target_date: date, dry_run: bool = True):
         for f in files:
             try:
                 # 删除 S3 文件
-                s3_service.delete_file(f.s3_key)
-                # 删除数据库记录
+                content_hash_service.delete_object(f.s3_key, f.id)
+                # 删除标签关联（同步标签使用计数）、预热任务和数据库记录
+                tag_service.detach_files([f.id])
+                preheat_job_service.delete_for_files([f.id])
                 db.session.delete(f)
                 deleted_count += 1
                 print(f"✓ 已删除: {f.filename}")
@@ -0,0 +1,83 @@
+"""
+批量操作后台任务 worker
+执行 jobs 表中等待的任务：进程内执行器队列已满时留下的任务、出错待重试的任务，
+以及 worker 退出或崩溃时中断的任务（从最后一次提交的位置继续）
+
+使用方式：
+1. Flask CLI: flask job-worker
+2. 直接运行: python scripts/job_worker.py
+3. cron 定时: */5 * * * * cd /path/to/backend && flask job-worker --max-duration 280
+"""
+import sys
+import os
+
+# 添加项目根目录到 path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import click
+from flask.cli import with_appcontext
+
+
+def run_worker(max_jobs: int = 0, max_duration: float = 0, verbose: bool = False,
+               echo=click.echo) -> dict:
+    """
+    领取并执行等待中的任务，并输出结果
+
+    Args:
+        max_jobs: 最多执行的任务数，0 表示不限
+        max_duration: 总时长上限（秒），在分块之间检查，0 表示不限
+        verbose: 显示每个任务的结果
+        echo: 输出函数
+
+    Returns:
+        汇总结果
+    """
+    from services.job_service import job_service
+
+    def on_result(job, status):
+        if verbose or status != 'succeeded':
+            echo(f'  - 任务 {job.id} ({job.type}): {status}')
+
+    return job_service.run_worker(max_jobs=max_jobs, max_duration=max_duration, on_result=on_result)
+
+
+def print_summary(summary: dict, echo=click.echo):
+    """输出执行汇总"""
+    echo(f'\n[Job] 完成 {summary["succeeded"]} 个, 失败 {summary["failed"]} 个, '
+         f'待继续 {summary["pending"]} 个, 耗时 {summary["elapsed"]:.1f}s')
+
+
+@click.command('job-worker')
+@click.option('--max-jobs', default=0, type=int, help='最多执行的任务数，0 表示不限')
+@click.option('--max-duration', default=0, type=float, help='总时长上限（秒），0 表示不限')
+@click.option('--verbose', '-v', is_flag=True, help='显示每个任务的结果')
+@with_appcontext
+def job_worker_command(max_jobs: int, max_duration: float, verbose: bool):
+    """执行等待中的批量操作后台任务"""
+    summary = run_worker(max_jobs=max_jobs, max_duration=max_duration, verbose=verbose)
+    print_summary(summary)
+
+
+def register_commands(app):
+    """注册 CLI 命令到 Flask app"""
+    app.cli.add_command(job_worker_command)
+
+
+if __name__ == '__main__':
+    # 直接运行时，创建 Flask app context
+    from app import create_app
+    app = create_app()
+
+    with app.app_context():
+        max_jobs = 0
+        max_duration = 0
+
+        for arg in sys.argv[1:]:
+            if arg.startswith('--max-jobs='):
+                max_jobs = int(arg.split('=')[1])
+            elif arg.startswith('--max-duration='):
+                max_duration = float(arg.split('=')[1])
+
+        summary = run_worker(max_jobs=max_jobs, max_duration=max_duration,
+                             verbose='--verbose' in sys.argv)
+        print_summary(summary)
@@ -0,0 +1,144 @@
+"""
+视频起播并发压测脚本
+模拟多个用户同时打开视频，检查 HLS 清晰度/清单接口是否会在 worker 上排队
+
+每个"起播"依次请求：
+1. GET /api/files/hls-qualities/<file_id>
+2. GET /api/files/hls-proxy/<file_id>/medium/auto_medium.m3u8
+
+使用方式：
+    python scripts/load_test_hls.py --base-url http://localhost:5001 \\
+        --token <jwt> --file-id 12 --file-id 34 --concurrency 16
+
+    # 不依赖视频/缤纷云，压 SSO 登录（将 SSO_AUTH_API_URL 指向一个慢速 mock）
+    python scripts/load_test_hls.py --scenario sso-login --concurrency 16
+
+结果解读：
+    排队放大 = 最慢请求耗时 / 最快请求耗时
+    请求在 worker 上串行排队时，该值约为 concurrency / workers；
+    并发处理时应接近 1（所有起播耗时相近）。
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+import click
+import httpx
+
+
+async def _video_start(client: httpx.AsyncClient, file_id: int) -> dict:
+    """模拟一次视频起播：清晰度列表 + 主播放列表"""
+    started = time.perf_counter()
+    statuses = []
+
+    resp = await client.get(f'/api/files/hls-qualities/{file_id}')
+    statuses.append(resp.status_code)
+
+    resp = await client.get(f'/api/files/hls-proxy/{file_id}/medium/auto_medium.m3u8')
+    statuses.append(resp.status_code)
+
+    return {
+        'latency': time.perf_counter() - started,
+        'ok': all(s == 200 for s in statuses),
+        'statuses': statuses
+    }
+
+
+async def _sso_login(client: httpx.AsyncClient, _file_id) -> dict:
+    """模拟一次 SSO 登录校验（token 无效也会完整走一次 SSO 往返）"""
+    started = time.perf_counter()
+    resp = await client.post('/api/auth/sso/login', json={'token': 'load-test'})
+    return {
+        'latency': time.perf_counter() - started,
+        # 401 表示 SSO 已返回结果；503 表示 SSO 不可达
+        'ok': resp.status_code in (200, 401),
+        'statuses': [resp.status_code]
+    }
+
+
+SCENARIOS = {
+    'video-start': _video_start,
+    'sso-login': _sso_login,
+}
+
+
+async def run_load_test(base_url: str, token: str, file_ids: list, scenario: str,
+                        concurrency: int, rounds: int, timeout: float) -> dict:
+    """
+    并发执行 concurrency 个起播，重复 rounds 轮
+
+    Returns:
+        汇总结果
+    """
+    action = SCENARIOS[scenario]
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    results = []
+    wall_started = time.perf_counter()
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits,
+                                 timeout=timeout) as client:
+        for _ in range(rounds):
+            tasks = [
+                action(client, file_ids[i % len(file_ids)] if file_ids else None)
+                for i in range(concurrency)
+            ]
+            for outcome in await asyncio.gather(*tasks, return_exceptions=True):
+                if isinstance(outcome, Exception):
+                    results.append({'latency': 0.0, 'ok': False, 'statuses': [type(outcome).__name__]})
+                else:
+                    results.append(outcome)
+
+    wall_time = time.perf_counter() - wall_started
+    latencies = sorted(r['latency'] for r in results if r['ok'])
+
+    summary = {
+        'requests': len(results),
+        'ok': len(latencies),
+        'failed': len(results) - len(latencies),
+        'wall_time': wall_time,
+        'p50': statistics.median(latencies) if latencies else 0.0,
+        'p95': latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0,
+        'min': latencies[0] if latencies else 0.0,
+        'max': latencies[-1] if latencies else 0.0,
+        'queueing_factor': latencies[-1] / latencies[0] if latencies and latencies[0] else 0.0,
+        'failures': [r['statuses'] for r in results if not r['ok']][:5]
+    }
+    return summary
+
+
+@click.command()
+@click.option('--base-url', default='http://localhost:5001', help='后端地址')
+@click.option('--token', default='', help='JWT access token（video-start 场景必填）')
+@click.option('--file-id', 'file_ids', multiple=True, type=int, help='视频文件 ID，可重复指定')
+@click.option('--scenario', type=click.Choice(sorted(SCENARIOS)), default='video-start', help='压测场景')
+@click.option('--concurrency', default=16, help='同时起播的数量，默认16')
+@click.option('--rounds', default=3, help='重复轮数，默认3')
+@click.option('--timeout', default=60.0, help='单个请求超时秒数，默认60')
+def main(base_url, token, file_ids, scenario, concurrency, rounds, timeout):
+    """并发起播压测"""
+    if scenario == 'video-start' and (not token or not file_ids):
+        raise click.UsageError('video-start 场景需要 --token 和至少一个 --file-id')
+
+    click.echo(f'[LoadTest] {scenario}: {concurrency} 并发 x {rounds} 轮 -> {base_url}')
+    summary = asyncio.run(run_load_test(
+        base_url, token, list(file_ids), scenario, concurrency, rounds, timeout
+    ))
+
+    click.echo(f'  请求: 成功 {summary["ok"]}, 失败 {summary["failed"]}')
+    click.echo(f'  墙钟: {summary["wall_time"]:.2f}s')
+    click.echo(
+        f'  延迟: min {summary["min"]:.2f}s, p50 {summary["p50"]:.2f}s, '
+        f'p95 {summary["p95"]:.2f}s, max {summary["max"]:.2f}s'
+    )
+    click.echo(f'  排队放大: {summary["queueing_factor"]:.1f}x (无排队时接近 1)')
+    if summary['failures']:
+        click.echo(f'  失败示例: {summary["failures"]}')
+
+    sys.exit(0 if summary['failed'] == 0 else 1)
+
+
+if __name__ == '__main__':
+    main()
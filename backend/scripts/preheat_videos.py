@@ -5,7 +5,13 @@
 使用方式：
 1. Flask CLI: flask preheat-videos
 2. 直接运行: python scripts/preheat_videos.py
-3. cron 定时: 0 3 * * * cd /path/to/backend && flask preheat-videos
+3. cron 定时: 0 3 * * * cd /path/to/backend && flask preheat-videos --concurrency 4 --rate 8
+4. 只处理队列（重试/续跑）: */10 * * * * cd /path/to/backend && flask preheat-worker --max-duration 9
+
+preheat-videos 把选中的视频写入 preheat_jobs 队列，然后消费队列；
+中断的视频会从上次的分片继续，失败的视频按指数退避重试。
+分片并发由 --concurrency 控制，所有分片请求共享 --rate 令牌桶限速；
+--video-timeout / --max-duration 限制单个视频和整体运行时间。
 
 建议每天凌晨执行一次
 """
@@ -17,9 +23,7 @@ import time
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import click
-import requests
 from datetime import datetime, timedelta
-from flask import current_app
 from flask.cli import with_appcontext
 
 try:
@@ -31,187 +35,184 @@ except ImportError:
         return iterable
 
 
-def preheat_video(s3_key: str, s3_service, verbose: bool = False) -> dict:
+def run_worker(delay: float, concurrency: int, rate: float, video_timeout: float,
+               max_duration: float, max_jobs: int, verbose: bool, echo=click.echo) -> dict:
     """
-    预热单个视频的 1080p 转码（全量预热所有 .ts 分片）
-    返回预热结果
+    消费 preheat_jobs 队列中到期的任务，并输出进度
+
+    Args:
+        delay: 视频之间的间隔秒数
+        concurrency: 单个视频内同时预热的分片数
+        rate: 全局分片请求速率上限（个/秒），0 表示不限速
+        video_timeout: 单个视频最长耗时（秒），0 表示不限
+        max_duration: 整体最长耗时（秒），0 表示不限
+        max_jobs: 最多处理的任务数，0 表示不限
+        verbose: 显示详细信息
+        echo: 输出函数
+
+    Returns:
+        汇总结果
     """
-    result = {
-        's3_key': s3_key,
-        'success': False,
-        'message': '',
-        'segments_total': 0,
-        'segments_ok': 0
-    }
-    
-    try:
-        # 1. 请求主播放列表
-        hls_key = f"{s3_key}!style:medium/auto_medium.m3u8"
-        signed_url = s3_service.generate_signed_url(key=hls_key, expiration=300)
-        
-        resp = requests.get(signed_url, timeout=30)
-        if resp.status_code != 200:
-            result['message'] = f'Master playlist failed: {resp.status_code}'
-            return result
-        
-        # 2. 请求 1080p 播放列表，获取分片列表
-        quality_key = f"{s3_key}!style:medium/1080p_medium.m3u8"
-        quality_url = s3_service.generate_signed_url(key=quality_key, expiration=600)
-        quality_resp = requests.get(quality_url, timeout=120)
-        
-        if quality_resp.status_code != 200:
-            result['message'] = f'1080p playlist failed: {quality_resp.status_code}'
-            return result
-        
-        # 3. 解析 m3u8 获取所有 .ts 分片
-        m3u8_content = quality_resp.text
-        segments = []
-        for line in m3u8_content.split('\n'):
-            line = line.strip()
-            if line and not line.startswith('#'):
-                # 这是一个分片引用
-                if line.endswith('.ts') or '.ts' in line:
-                    segments.append(line)
-        
-        result['segments_total'] = len(segments)
-        
-        if not segments:
-            result['success'] = True
-            result['message'] = 'No segments found (possibly already cached)'
-            return result
-        
-        if verbose:
-            print(f'    Found {len(segments)} segments to preheat')
-        
-        # 4. 逐个预热所有 .ts 分片
-        segments_ok = 0
-        for i, segment in enumerate(segments):
-            try:
-                # 构建分片的完整 key
-                # 分片路径是相对于 1080p_medium.m3u8 的，需要加上目录前缀
-                segment_key = f"{s3_key}!style:medium/{segment}"
-                segment_url = s3_service.generate_signed_url(key=segment_key, expiration=600)
-                
-                # 请求分片（触发转码）- 只需要 HEAD 请求或小范围请求即可
-                # 使用 Range 请求只获取前 1 字节，减少带宽消耗
-                seg_resp = requests.get(
-                    segment_url, 
-                    timeout=180,  # 单个分片转码可能需要较长时间
-                    headers={'Range': 'bytes=0-0'}
-                )
-                
-                if seg_resp.status_code in (200, 206):
-                    segments_ok += 1
-                elif verbose:
-                    print(f'    Segment {i+1}/{len(segments)} failed: {seg_resp.status_code}')
-                    
-            except requests.Timeout:
-                if verbose:
-                    print(f'    Segment {i+1}/{len(segments)} timeout')
-            except Exception as e:
-                if verbose:
-                    print(f'    Segment {i+1}/{len(segments)} error: {str(e)}')
-        
-        result['segments_ok'] = segments_ok
-        
-        if segments_ok == len(segments):
-            result['success'] = True
-            result['message'] = f'All {segments_ok} segments preheated'
-        elif segments_ok > 0:
-            result['success'] = True  # 部分成功也算成功
-            result['message'] = f'{segments_ok}/{len(segments)} segments preheated'
+    from services.preheat_job_service import preheat_job_service
+
+    due = preheat_job_service.queue_stats()['due']
+    echo(f'[Preheat] 队列中 {due} 个任务待处理')
+
+    # 使用 tqdm 显示进度
+    progress = tqdm(total=max_jobs or due, desc='预热进度', unit='个') if HAS_TQDM else None
+
+    def on_result(job, result):
+        if progress is not None:
+            progress.update(1)
+
+        if result['interrupted']:
+            msg = f'  … 中断: {job.s3_key} - {result["message"]}'
+        elif result['success']:
+            if not verbose:
+                return
+            msg = f'  ✓ 成功: {job.s3_key} - {result["message"]} ({result["elapsed"]:.1f}s)'
         else:
-            result['message'] = f'All {len(segments)} segments failed'
-            
-    except requests.Timeout:
-        result['message'] = 'Timeout'
-    except Exception as e:
-        result['message'] = str(e)
-    
-    return result
+            msg = f'  ✗ 失败: {job.s3_key} - {result["message"]} (第 {job.attempts} 次, {result["status"]})'
+
+        if HAS_TQDM:
+            tqdm.write(msg)
+        else:
+            echo(msg)
+
+    summary = preheat_job_service.run_worker(
+        max_jobs=max_jobs,
+        max_duration=max_duration,
+        video_timeout=video_timeout,
+        concurrency=concurrency,
+        rate=rate,
+        delay=delay,
+        verbose=verbose,
+        on_result=on_result
+    )
+
+    if progress is not None:
+        progress.close()
+
+    summary['remaining'] = preheat_job_service.queue_stats()['due']
+    return summary
+
+
+def print_summary(summary: dict, echo=click.echo):
+    """输出预热汇总"""
+    elapsed = summary['elapsed']
+    rate = summary['segments_ok'] / elapsed if elapsed > 0 else 0.0
+
+    echo(f'\n[Preheat] 完成!')
+    echo(f'  视频: 成功 {summary["success"]}, 失败 {summary["failed"]}, 中断 {summary["interrupted"]}')
+    echo(f'  分片: 预热 {summary["segments_ok"]}/{summary["segments_total"]}')
+    echo(f'  耗时: {elapsed:.1f} 秒, {rate:.2f} 分片/秒')
+    echo(f'  队列: 剩余 {summary["remaining"]} 个到期任务')
+
+
+def select_videos(days: int, rewarm_after_hours: float = None, limit: int = 0,
+                  min_score: float = None, order: str = 'popularity'):
+    """查询转码缓存即将过期、且在 days 天内（活动日期或上传时间）或近期热门的视频"""
+    from services.preheat_job_service import preheat_job_service
+
+    rewarm_after = timedelta(hours=rewarm_after_hours) if rewarm_after_hours is not None else None
+    return preheat_job_service.select_videos(
+        days, rewarm_after=rewarm_after, limit=limit, min_score=min_score, order=order
+    )
+
+
+def worker_options(fn):
+    """preheat-videos 与 preheat-worker 共用的执行参数"""
+    options = [
+        click.option('--delay', default=2.0, help='每个视频之间的间隔秒数，默认2秒'),
+        click.option('--concurrency', default=1, type=click.IntRange(1, 32),
+                     help='单个视频内并发预热的分片数，默认1（串行）'),
+        click.option('--rate', default=5.0, help='全局分片请求速率上限（个/秒），0 为不限速，默认5'),
+        click.option('--video-timeout', default=600.0, help='单个视频最长预热秒数，0 为不限，默认600'),
+        click.option('--max-duration', default=0.0, help='整体最长运行分钟数，0 为不限'),
+        click.option('--max-jobs', default=0, help='最多处理的任务数，0 为不限'),
+        click.option('--verbose', '-v', is_flag=True, help='显示详细信息'),
+    ]
+    for option in reversed(options):
+        fn = option(fn)
+    return fn
 
 
 @click.command('preheat-videos')
-@click.option('--days', default=30, help='预热多少天内的视频，默认30天')
-@click.option('--delay', default=2.0, help='每个视频之间的间隔秒数，默认2秒')
+@click.option('--days', default=30, help='预热多少天内（活动日期或上传时间）的视频，默认30天')
+@click.option('--rewarm-after', default=None, type=float,
+              help='距上次预热超过多少小时才重新预热，默认取 PREHEAT_REWARM_AFTER_HOURS')
+@click.option('--limit', default=0, help='本次最多加入队列的视频数（配合 --order 即为 Top-N），0 为不限')
+@click.option('--min-score', default=None, type=float,
+              help='近期热度（衰减后的访问分）不低于该值的视频不受日期限制，0 为关闭，默认取 PREHEAT_POPULAR_MIN_SCORE')
+@click.option('--order', type=click.Choice(['popularity', 'expiry']), default='popularity',
+              help='popularity: 按近期热度排序；expiry: 按上次预热时间排序')
 @click.option('--dry-run', is_flag=True, help='只显示要预热的视频，不实际执行')
-@click.option('--verbose', '-v', is_flag=True, help='显示详细信息')
+@click.option('--enqueue-only', is_flag=True, help='只写入预热队列，由 preheat-worker 或上传进程消费')
+@worker_options
 @with_appcontext
-def preheat_videos_command(days: int, delay: float, dry_run: bool, verbose: bool):
+def preheat_videos_command(days: int, rewarm_after: float, limit: int, min_score: float, order: str,
+                           dry_run: bool, enqueue_only: bool, delay: float, concurrency: int, rate: float,
+                           video_timeout: float, max_duration: float, max_jobs: int, verbose: bool):
     """预热近期视频的 HLS 转码缓存"""
-    from extensions import db
-    from files.models import File
-    from services.s3_service import s3_service
+    from services.preheat_job_service import preheat_job_service
     
     click.echo(f'[Preheat] 开始预热 {days} 天内的视频...')
-    click.echo(f'[Preheat] 请求间隔: {delay} 秒')
-    
-    # 查询需要预热的视频
-    cutoff_date = datetime.utcnow().date() - timedelta(days=days)
+    click.echo(f'[Preheat] 请求间隔: {delay} 秒, 分片并发: {concurrency}, 限速: {rate or "不限"} 分片/秒')
     
-    videos = File.query.filter(
-        File.content_type.like('video/%'),
-        File.activity_date >= cutoff_date
-    ).order_by(File.activity_date.desc()).all()
+    # 查询转码缓存即将过期的视频
+    videos = select_videos(days, rewarm_after_hours=rewarm_after, limit=limit, min_score=min_score, order=order)
     
     click.echo(f'[Preheat] 找到 {len(videos)} 个视频需要预热')
     
-    if len(videos) > 0:
-        estimated_time = len(videos) * delay
-        click.echo(f'[Preheat] 预计耗时: {estimated_time/60:.1f} 分钟')
-    
     if dry_run:
         click.echo('[Preheat] Dry run 模式，不实际执行')
         for video in videos:
-            click.echo(f'  - {video.filename} ({video.activity_date})')
+            job = video.preheat_job
+            last = job.last_preheated_at.strftime('%Y-%m-%d %H:%M') if job and job.last_preheated_at else '从未'
+            views = video.access_stat.access_count if video.access_stat else 0
+            click.echo(f'  - {video.filename} ({video.activity_date}, 上次预热: {last}, 访问: {views})')
         return
     
-    # 执行预热
-    success_count = 0
-    fail_count = 0
-    total_segments = 0
-    total_segments_ok = 0
+    queued = preheat_job_service.enqueue_many((video.id, video.s3_key) for video in videos)
+    click.echo(f'[Preheat] 已加入队列 {queued} 个（正在预热的视频不重复加入）')
     
-    # 使用 tqdm 显示进度
-    iterator = tqdm(videos, desc='预热进度', unit='个') if HAS_TQDM else videos
-    
-    for i, video in enumerate(iterator):
-        if verbose and not HAS_TQDM:
-            click.echo(f'[{i+1}/{len(videos)}] 预热: {video.filename}')
-        
-        result = preheat_video(video.s3_key, s3_service, verbose=verbose)
-        
-        total_segments += result.get('segments_total', 0)
-        total_segments_ok += result.get('segments_ok', 0)
-        
-        if result['success']:
-            success_count += 1
-            if verbose:
-                msg = f'  ✓ 成功: {video.filename} - {result["message"]}'
-                if HAS_TQDM:
-                    tqdm.write(msg)
-                else:
-                    click.echo(msg)
-        else:
-            fail_count += 1
-            msg = f'  ✗ 失败: {video.filename} - {result["message"]}'
-            if HAS_TQDM:
-                tqdm.write(msg)
-            else:
-                click.echo(msg)
-        
-        # 温和地等待，避免请求过快（视频之间的间隔）
-        if i < len(videos) - 1:  # 最后一个不用等
-            time.sleep(delay)
+    if enqueue_only:
+        return
     
-    click.echo(f'\n[Preheat] 完成!')
-    click.echo(f'  视频: 成功 {success_count}, 失败 {fail_count}')
-    click.echo(f'  分片: 预热 {total_segments_ok}/{total_segments}')
+    summary = run_worker(
+        delay=delay,
+        concurrency=concurrency,
+        rate=rate,
+        video_timeout=video_timeout,
+        max_duration=max_duration * 60,
+        max_jobs=max_jobs,
+        verbose=verbose
+    )
+    print_summary(summary)
+
+
+@click.command('preheat-worker')
+@worker_options
+@with_appcontext
+def preheat_worker_command(delay: float, concurrency: int, rate: float, video_timeout: float,
+                           max_duration: float, max_jobs: int, verbose: bool):
+    """消费预热队列：续跑中断的视频、重试到期的失败任务"""
+    summary = run_worker(
+        delay=delay,
+        concurrency=concurrency,
+        rate=rate,
+        video_timeout=video_timeout,
+        max_duration=max_duration * 60,
+        max_jobs=max_jobs,
+        verbose=verbose
+    )
+    print_summary(summary)
 
 
 def register_commands(app):
     """注册 CLI 命令到 Flask app"""
     app.cli.add_command(preheat_videos_command)
+    app.cli.add_command(preheat_worker_command)
 
 
 if __name__ == '__main__':
@@ -220,30 +221,39 @@ if __name__ == '__main__':
     app = create_app()
     
     with app.app_context():
-        from extensions import db
-        from files.models import File
-        from services.s3_service import s3_service
+        from services.preheat_job_service import preheat_job_service
         
         # 解析参数
         days = 30
+        rewarm_after = None
         delay = 2.0
+        concurrency = 1
+        rate = 5.0
+        video_timeout = 600.0
+        max_duration = 0.0
         dry_run = '--dry-run' in sys.argv
         verbose = '-v' in sys.argv or '--verbose' in sys.argv
         
         for arg in sys.argv[1:]:
             if arg.startswith('--days='):
                 days = int(arg.split('=')[1])
+            elif arg.startswith('--rewarm-after='):
+                rewarm_after = float(arg.split('=')[1])
             elif arg.startswith('--delay='):
                 delay = float(arg.split('=')[1])
+            elif arg.startswith('--concurrency='):
+                concurrency = max(int(arg.split('=')[1]), 1)
+            elif arg.startswith('--rate='):
+                rate = float(arg.split('=')[1])
+            elif arg.startswith('--video-timeout='):
+                video_timeout = float(arg.split('=')[1])
+            elif arg.startswith('--max-duration='):
+                max_duration = float(arg.split('=')[1])
         
         print(f'[Preheat] 开始预热 {days} 天内的视频（全量 1080p 分片）...')
-        print(f'[Preheat] 请求间隔: {delay} 秒')
+        print(f'[Preheat] 请求间隔: {delay} 秒, 分片并发: {concurrency}, 限速: {rate or "不限"} 分片/秒')
         
-        cutoff_date = datetime.utcnow().date() - timedelta(days=days)
-        videos = File.query.filter(
-            File.content_type.like('video/%'),
-            File.activity_date >= cutoff_date
-        ).order_by(File.activity_date.desc()).all()
+        videos = select_videos(days, rewarm_after_hours=rewarm_after)
         
         print(f'[Preheat] 找到 {len(videos)} 个视频需要预热')
         
@@ -252,41 +262,15 @@ if __name__ == '__main__':
             for video in videos:
                 print(f'  - {video.filename} ({video.activity_date})')
         else:
-            success_count = 0
-            fail_count = 0
-            total_segments = 0
-            total_segments_ok = 0
-            
-            iterator = tqdm(videos, desc='预热进度', unit='个') if HAS_TQDM else videos
-            
-            for i, video in enumerate(iterator):
-                if verbose and not HAS_TQDM:
-                    print(f'[{i+1}/{len(videos)}] 预热: {video.filename}')
-                
-                result = preheat_video(video.s3_key, s3_service, verbose=verbose)
-                
-                total_segments += result.get('segments_total', 0)
-                total_segments_ok += result.get('segments_ok', 0)
-                
-                if result['success']:
-                    success_count += 1
-                    if verbose:
-                        msg = f'  ✓ 成功: {video.filename} - {result["message"]}'
-                        if HAS_TQDM:
-                            tqdm.write(msg)
-                        else:
-                            print(msg)
-                else:
-                    fail_count += 1
-                    msg = f'  ✗ 失败: {video.filename} - {result["message"]}'
-                    if HAS_TQDM:
-                        tqdm.write(msg)
-                    else:
-                        print(msg)
-                
-                if i < len(videos) - 1:
-                    time.sleep(delay)
-            
-            print(f'\n[Preheat] 完成!')
-            print(f'  视频: 成功 {success_count}, 失败 {fail_count}')
-            print(f'  分片: 预热 {total_segments_ok}/{total_segments}')
+            preheat_job_service.enqueue_many((video.id, video.s3_key) for video in videos)
+            summary = run_worker(
+                delay=delay,
+                concurrency=concurrency,
+                rate=rate,
+                video_timeout=video_timeout,
+                max_duration=max_duration * 60,
+                max_jobs=0,
+                verbose=verbose,
+                echo=print
+            )
+            print_summary(summary, echo=print)
@@ -0,0 +1,70 @@
+"""
+标签使用计数校验
+对比 tags.usage_count 与 file_tags 中的实际关联数，可选择修复不一致的计数
+
+使用方式：
+1. Flask CLI: flask verify-tag-counts [--repair]
+2. 直接运行: python scripts/verify_tag_counts.py [--repair]
+"""
+import sys
+import os
+
+# 添加项目根目录到 path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import click
+from flask.cli import with_appcontext
+
+
+def verify_counts(repair: bool = False, verbose: bool = False, echo=click.echo) -> dict:
+    """
+    校验（并修复）标签使用计数，并输出结果
+
+    Args:
+        repair: 将不一致的计数修正为实际值
+        verbose: 显示每个不一致的标签
+        echo: 输出函数
+
+    Returns:
+        汇总结果
+    """
+    from services.tag_service import tag_service
+
+    def on_mismatch(tag_id, name, stored, actual):
+        if verbose:
+            echo(f'  - 标签 {tag_id} ({name}): 记录 {stored}, 实际 {actual}')
+
+    summary = tag_service.verify_usage_counts(repair=repair, on_mismatch=on_mismatch)
+
+    echo(f'\n[Tags] 检查 {summary["checked"]} 个标签, 计数不一致 {summary["mismatched"]} 个, '
+         f'已修复 {summary["repaired"]} 个')
+    if summary['mismatched'] and not repair:
+        echo('使用 --repair 修复不一致的计数')
+    return summary
+
+
+@click.command('verify-tag-counts')
+@click.option('--repair', is_flag=True, help='将不一致的计数修正为实际值')
+@click.option('--verbose', '-v', is_flag=True, help='显示每个不一致的标签')
+@with_appcontext
+def verify_tag_counts_command(repair: bool, verbose: bool):
+    """校验标签使用计数 (tags.usage_count)"""
+    summary = verify_counts(repair=repair, verbose=verbose)
+    if summary['mismatched'] and not repair:
+        sys.exit(1)
+
+
+def register_commands(app):
+    """注册 CLI 命令到 Flask app"""
+    app.cli.add_command(verify_tag_counts_command)
+
+
+if __name__ == '__main__':
+    # 直接运行时，创建 Flask app context
+    from app import create_app
+    app = create_app()
+
+    with app.app_context():
+        summary = verify_counts(repair='--repair' in sys.argv, verbose='--verbose' in sys.argv)
+        if summary['mismatched'] and '--repair' not in sys.argv:
+            sys.exit(1)
@@ -0,0 +1,221 @@
+"""
+Access Counter for LockCloud
+Lightweight per-process file access counting: accesses are aggregated in
+memory and flushed periodically to file_access_stats with an exponentially
+decayed popularity score.
+"""
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from services.background_executor import BackgroundExecutor
+
+
+# Weight of a file whose URL was only signed as part of a grid/thumbnail batch
+THUMBNAIL_WEIGHT = 0.1
+
+# Single background thread per process that writes counters to the database
+flush_executor = BackgroundExecutor('access-flush', max_workers=1, max_queue=1)
+
+_EPOCH = datetime(2024, 1, 1)
+
+
+class AccessCounter:
+    """
+    In-memory access aggregation (per worker process)
+
+    ``record()`` only touches a dict under a lock; the database is written by
+    ``flush()`` at most once per ACCESS_FLUSH_INTERVAL seconds, on the flush
+    executor. Repeated accesses of the same weight by the same user to the
+    same file within ACCESS_DEDUPE_SECONDS (e.g. master + media playlist of
+    one playback) count once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[int, list] = {}
+        self._recent: Dict[Tuple[int, int, float], float] = {}
+        self._last_flush = time.monotonic()
+        self._flush_scheduled = False
+        self._app = None
+        self._counters = {'recorded': 0, 'deduplicated': 0, 'flushed_rows': 0, 'flush_errors': 0}
+
+    @staticmethod
+    def half_life_hours() -> float:
+        """Half-life of the popularity score in hours"""
+        return float(current_app.config.get('ACCESS_SCORE_HALF_LIFE_HOURS', 72))
+
+    @staticmethod
+    def popularity_threshold(min_score: float, now: Optional[datetime] = None) -> float:
+        """
+        Lowest ``FileAccessStat.popularity`` whose decayed score is at least min_score now
+
+        Args:
+            min_score: Minimum decayed score
+            now: Reference time (defaults to utcnow)
+
+        Returns:
+            Threshold to compare against the popularity column
+        """
+        now = now or datetime.utcnow()
+        hours = (now - _EPOCH).total_seconds() / 3600
+        return math.log2(min_score) + hours / AccessCounter.half_life_hours()
+
+    def record(self, file_id: int, user_id: Optional[int] = None, weight: float = 1.0) -> None:
+        """
+        Count one access to a file
+
+        Must be called inside an application context.
+
+        Args:
+            file_id: Accessed file
+            user_id: Accessing user, used to dedupe bursts of requests
+            weight: Contribution to the popularity score
+        """
+        now = time.monotonic()
+        dedupe_seconds = float(current_app.config.get('ACCESS_DEDUPE_SECONDS', 300))
+        flush_interval = float(current_app.config.get('ACCESS_FLUSH_INTERVAL', 60))
+
+        with self._lock:
+            self._app = current_app._get_current_object()
+
+            if user_id is not None:
+                key = (user_id, file_id, weight)
+                seen = self._recent.get(key)
+                if seen is not None and now - seen < dedupe_seconds:
+                    self._counters['deduplicated'] += 1
+                    return
+                self._recent[key] = now
+
+            entry = self._pending.setdefault(file_id, [0, 0.0, None])
+            entry[0] += 1
+            entry[1] += weight
+            entry[2] = datetime.utcnow()
+            self._counters['recorded'] += 1
+
+            # Submit the flush once; it clears the flag when it starts
+            due = not self._flush_scheduled and now - self._last_flush >= flush_interval
+            if due:
+                self._flush_scheduled = True
+
+        if due and not flush_executor.submit('flush', self.flush):
+            with self._lock:
+                self._flush_scheduled = False
+
+    def flush(self) -> int:
+        """
+        Write aggregated counters to file_access_stats
+
+        Runs inside an application context (flush executor, CLI or worker exit).
+
+        Returns:
+            Number of files updated
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+            self._flush_scheduled = False
+
+            # 清理过期的去重记录
+            dedupe_seconds = float(current_app.config.get('ACCESS_DEDUPE_SECONDS', 300))
+            cutoff = self._last_flush - dedupe_seconds
+            self._recent = {k: v for k, v in self._recent.items() if v >= cutoff}
+
+        if not pending:
+            return 0
+
+        try:
+            try:
+                self._write(pending)
+            except IntegrityError:
+                # 另一个进程同时插入了同一文件的记录，重试一次即为更新
+                db.session.rollback()
+                self._write(pending)
+        except Exception as e:
+            db.session.rollback()
+            with self._lock:
+                self._counters['flush_errors'] += 1
+                # 放回内存，下次 flush 时重试
+                for file_id, (count, weight, last_accessed_at) in pending.items():
+                    entry = self._pending.setdefault(file_id, [0, 0.0, None])
+                    entry[0] += count
+                    entry[1] += weight
+                    entry[2] = max(filter(None, (entry[2], last_accessed_at)))
+            current_app.logger.error(f'[Access] Failed to flush {len(pending)} access counters: {str(e)}')
+            return 0
+
+        with self._lock:
+            self._counters['flushed_rows'] += len(pending)
+        return len(pending)
+
+    def _write(self, pending: Dict[int, list]) -> None:
+        """Apply pending counters in one transaction (rows locked where supported)"""
+        from files.models import File
+        from logs.models import FileAccessStat
+
+        now = datetime.utcnow()
+        half_life = self.half_life_hours()
+        hours = (now - _EPOCH).total_seconds() / 3600
+
+        stats = {
+            stat.file_id: stat
+            for stat in FileAccessStat.query.filter(
+                FileAccessStat.file_id.in_(list(pending.keys()))
+            ).with_for_update().all()
+        }
+        missing = set(pending) - set(stats)
+        existing_files = {
+            row.id for row in db.session.query(File.id).filter(File.id.in_(list(missing)))
+        } if missing else set()
+
+        for file_id, (count, weight, last_accessed_at) in pending.items():
+            stat = stats.get(file_id)
+            if stat is None:
+                if file_id not in existing_files:
+                    # 文件已删除
+                    continue
+                stat = FileAccessStat(file_id=file_id, access_count=0, score=0.0)
+                db.session.add(stat)
+                decayed = 0.0
+            else:
+                elapsed = (now - stat.score_updated_at).total_seconds() / 3600
+                decayed = stat.score * 0.5 ** (elapsed / half_life)
+
+            stat.access_count += count
+            stat.score = decayed + weight
+            stat.score_updated_at = now
+            stat.popularity = math.log2(stat.score) + hours / half_life if stat.score > 0 else None
+            stat.last_accessed_at = max(filter(None, (stat.last_accessed_at, last_accessed_at)))
+
+        db.session.commit()
+
+    def flush_on_exit(self) -> None:
+        """Flush remaining counters using the last app that recorded an access"""
+        if self._app is None:
+            return
+        with self._app.app_context():
+            self.flush()
+
+    def stats(self) -> Dict:
+        """
+        Counter metrics for this process
+
+        Returns:
+            Dictionary with pending files and record/flush counters
+        """
+        with self._lock:
+            return {
+                'pending_files': len(self._pending),
+                'dedupe_entries': len(self._recent),
+                **self._counters
+            }
+
+
+# Global access counter instance
+access_counter = AccessCounter()
@@ -0,0 +1,260 @@
+"""
+Background Executor for LockCloud
+Bounded per-process thread pools for fire-and-forget work started by requests
+(e.g. upload-time transcode preheat), with key-based dedupe, a queue cap,
+graceful drain on worker shutdown and queue metrics.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, List, Optional
+
+from flask import current_app, has_app_context
+
+
+# All executors created in this process, drained together on shutdown
+_executors: List['BackgroundExecutor'] = []
+
+
+class BackgroundExecutor:
+    """
+    Bounded thread pool bound to the Flask app
+
+    - At most ``max_workers`` tasks run at once, at most ``max_queue`` are
+      waiting; further submissions are rejected instead of piling up threads.
+    - Tasks are keyed (e.g. by s3_key); a key already queued or running is
+      not submitted again.
+    - Tasks run inside the submitting app's application context.
+    """
+
+    def __init__(self, name: str, max_workers: int = 2, max_queue: int = 100,
+                 config_prefix: Optional[str] = None):
+        """
+        Args:
+            name: Executor name (used for thread names, logs and metrics)
+            max_workers: Default number of worker threads
+            max_queue: Default maximum number of waiting tasks
+            config_prefix: If set, ``<prefix>_WORKERS`` / ``<prefix>_QUEUE_SIZE``
+                from app config override the defaults
+        """
+        self.name = name
+        self._default_workers = max_workers
+        self._default_queue = max_queue
+        self._config_prefix = config_prefix
+
+        self._pool = None
+        self._pid = None
+        self._app = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stopping = threading.Event()
+
+        self._max_workers = max_workers
+        self._max_queue = max_queue
+        self._queued: Dict[Hashable, float] = {}
+        self._running: Dict[Hashable, float] = {}
+        self._counters = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'deduplicated': 0
+        }
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+        self._run_max = 0.0
+
+        _executors.append(self)
+
+    def _configure(self):
+        """Read pool sizes from app config (if available)"""
+        if self._config_prefix and has_app_context():
+            self._max_workers = int(current_app.config.get(
+                f'{self._config_prefix}_WORKERS', self._default_workers
+            ))
+            self._max_queue = int(current_app.config.get(
+                f'{self._config_prefix}_QUEUE_SIZE', self._default_queue
+            ))
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        """Lazy initialization of the thread pool (per process)"""
+        pid = os.getpid()
+        if self._pool is None or self._pid != pid:
+            self._configure()
+            self._pool = ThreadPoolExecutor(
+                max_workers=self._max_workers,
+                thread_name_prefix=f'lockcloud-{self.name}'
+            )
+            self._pid = pid
+            self._queued.clear()
+            self._running.clear()
+            self._closed = False
+            self._stopping.clear()
+        return self._pool
+
+    def is_stopping(self) -> bool:
+        """Whether the drain deadline is near; long tasks should check this and return early"""
+        return self._stopping.is_set()
+
+    def submit(self, key: Hashable, fn: Callable, *args, **kwargs) -> bool:
+        """
+        Submit a task unless it is already pending or the queue is full
+
+        Must be called inside an application context.
+
+        Args:
+            key: Dedupe key for the task
+            fn: Callable to run in the background
+            *args, **kwargs: Arguments passed to fn
+
+        Returns:
+            True if the task was queued, False if it was deduplicated or rejected
+        """
+        app = current_app._get_current_object()
+
+        with self._lock:
+            pool = self._get_pool()
+            self._app = app
+
+            if self._closed:
+                self._counters['rejected'] += 1
+                app.logger.warning(f'[{self.name}] Executor is shutting down, rejected task: {key}')
+                return False
+
+            if key in self._queued or key in self._running:
+                self._counters['deduplicated'] += 1
+                app.logger.debug(f'[{self.name}] Task already pending, skipped: {key}')
+                return False
+
+            if len(self._queued) >= self._max_queue:
+                self._counters['rejected'] += 1
+                app.logger.warning(
+                    f'[{self.name}] Queue full ({self._max_queue}), rejected task: {key}'
+                )
+                return False
+
+            self._queued[key] = time.monotonic()
+            self._counters['submitted'] += 1
+
+        def run():
+            with self._lock:
+                enqueued_at = self._queued.pop(key, None)
+                if enqueued_at is None:
+                    # Dropped while draining
+                    return
+                started_at = time.monotonic()
+                self._running[key] = started_at
+                waited = started_at - enqueued_at
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+
+            failed = False
+            try:
+                with app.app_context():
+                    fn(*args, **kwargs)
+            except Exception as e:
+                failed = True
+                app.logger.error(f'[{self.name}] Task {key} failed: {str(e)}')
+            finally:
+                with self._lock:
+                    self._running.pop(key, None)
+                    elapsed = time.monotonic() - started_at
+                    self._run_total += elapsed
+                    self._run_max = max(self._run_max, elapsed)
+                    self._counters['failed' if failed else 'completed'] += 1
+
+        pool.submit(run)
+        return True
+
+    def shutdown(self, timeout: float = 25.0) -> None:
+        """
+        Drain the executor: stop accepting tasks and let queued/running ones finish
+
+        For the first 80% of ``timeout`` the queue keeps draining normally.
+        After that, queued tasks are dropped and ``is_stopping()`` turns true so
+        running tasks can return early within the remaining time.
+
+        Args:
+            timeout: Maximum seconds to spend draining
+        """
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                return
+            self._closed = True
+            pool = self._pool
+
+        started = time.monotonic()
+        if self._wait_idle(started + timeout * 0.8):
+            pool.shutdown(wait=False)
+            return
+
+        with self._lock:
+            self._stopping.set()
+            dropped = len(self._queued)
+            self._queued.clear()
+
+        if dropped and self._app is not None:
+            self._app.logger.warning(f'[{self.name}] Dropped {dropped} queued tasks on shutdown')
+
+        pool.shutdown(wait=False, cancel_futures=True)
+
+        if not self._wait_idle(started + timeout) and self._app is not None:
+            self._app.logger.warning(
+                f'[{self.name}] {len(self._running)} tasks still running after {timeout}s drain'
+            )
+
+    def _wait_idle(self, deadline: float) -> bool:
+        """Wait until nothing is queued or running; returns False on deadline"""
+        while True:
+            with self._lock:
+                if not self._queued and not self._running:
+                    return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.2)
+
+    def stats(self) -> Dict:
+        """
+        Queue depth and latency metrics for this process
+
+        Returns:
+            Dictionary of counters, queue depth and wait/run latencies (seconds)
+        """
+        with self._lock:
+            started = self._counters['completed'] + self._counters['failed'] + len(self._running)
+            finished = self._counters['completed'] + self._counters['failed']
+            now = time.monotonic()
+            oldest_queued = min(self._queued.values()) if self._queued else None
+
+            return {
+                'max_workers': self._max_workers,
+                'max_queue': self._max_queue,
+                'queue_depth': len(self._queued),
+                'running': len(self._running),
+                'oldest_queued_seconds': round(now - oldest_queued, 3) if oldest_queued else 0.0,
+                'avg_wait_seconds': round(self._wait_total / started, 3) if started else 0.0,
+                'max_wait_seconds': round(self._wait_max, 3),
+                'avg_run_seconds': round(self._run_total / finished, 3) if finished else 0.0,
+                'max_run_seconds': round(self._run_max, 3),
+                'closed': self._closed,
+                **self._counters
+            }
+
+
+def executor_stats() -> Dict[str, Dict]:
+    """Metrics of every executor in this process, keyed by name"""
+    return {executor.name: executor.stats() for executor in _executors}
+
+
+def shutdown_executors(timeout: float = 25.0) -> None:
+    """
+    Drain every executor in this process
+
+    Called from gunicorn's worker_exit hook, before the interpreter starts
+    joining pool threads. The timeout is shared across executors.
+    """
+    deadline = time.monotonic() + timeout
+    for executor in _executors:
+        executor.shutdown(timeout=max(deadline - time.monotonic(), 0.0))
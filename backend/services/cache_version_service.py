@@ -0,0 +1,137 @@
+"""
+Cache Version Service for LockCloud
+Version counters in ``cache_versions`` shared by all gunicorn workers: a
+writer bumps a data set's counter after its change is committed, and
+per-process caches compare the counter with the version they loaded to
+decide whether (and, with per-row version stamps, what) to reload.
+
+Each bump is its own short transaction, like a database sequence, so the
+shared counter row is never locked for the length of a caller's
+transaction. Rows are stamped with the new version in that same short
+transaction, so stamps become visible in version order.
+"""
+from datetime import datetime
+from typing import Callable, Optional
+
+from flask import current_app
+from sqlalchemy import event, select
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from files.cache_models import CacheVersion
+
+
+# Session.info key of the bumps waiting for the session's commit
+PENDING_KEY = 'cache_version_pending'
+
+
+class CacheVersionService:
+    """Service class for shared cache version counters"""
+
+    @staticmethod
+    def _increment(conn, name: str, now: datetime) -> Optional[int]:
+        """Increment an existing counter (None if the data set has no row yet)"""
+        table = CacheVersion.__table__
+        statement = table.update().where(table.c.name == name).values(
+            version=table.c.version + 1, updated_at=now
+        )
+
+        if conn.dialect.update_returning:
+            return conn.execute(statement.returning(table.c.version)).scalar()
+        if not conn.execute(statement).rowcount:
+            return None
+        return conn.execute(select(table.c.version).where(table.c.name == name)).scalar()
+
+    @staticmethod
+    def bump(name: str, stamp: Optional[Callable] = None) -> int:
+        """
+        Increment a counter in its own short transaction
+
+        Args:
+            name: Data set name (e.g. 'tags')
+            stamp: Optional callback(conn, version) run in the same
+                transaction, e.g. to stamp the changed rows with the version
+
+        Returns:
+            The new version
+        """
+        table = CacheVersion.__table__
+
+        for attempt in range(2):
+            try:
+                with db.engine.begin() as conn:
+                    now = datetime.utcnow()
+                    version = CacheVersionService._increment(conn, name, now)
+                    if version is None:
+                        # First bump of this data set; if another process inserts the row
+                        # first, the INSERT fails and the retry increments that row
+                        conn.execute(table.insert().values(name=name, version=1, updated_at=now))
+                        version = 1
+                    if stamp is not None:
+                        stamp(conn, version)
+                return version
+            except IntegrityError:
+                if attempt:
+                    raise
+
+    @staticmethod
+    def bump_after_commit(name: str, stamp: Optional[Callable] = None,
+                          on_bumped: Optional[Callable] = None) -> None:
+        """
+        Bump a counter once the current session transaction commits
+
+        Every request for the same data set in one transaction shares one
+        bump; nothing is bumped if the transaction rolls back.
+
+        Args:
+            name: Data set name (e.g. 'tags')
+            stamp: Optional callback(conn, version), see bump
+            on_bumped: Optional callback run after the bump
+        """
+        pending = db.session.info.setdefault(PENDING_KEY, {})
+        stamps, callbacks = pending.setdefault(name, ([], []))
+        if stamp is not None:
+            stamps.append(stamp)
+        if on_bumped is not None:
+            callbacks.append(on_bumped)
+
+    @staticmethod
+    def current(name: str) -> int:
+        """Committed version of a data set (0 if it was never bumped)"""
+        return db.session.execute(
+            select(CacheVersion.version).where(CacheVersion.name == name)
+        ).scalar() or 0
+
+
+@event.listens_for(db.session, 'after_commit')
+def _bump_pending(session) -> None:
+    """Run the bumps requested during the transaction that just committed"""
+    pending = session.info.pop(PENDING_KEY, None)
+    if not pending:
+        return
+
+    for name, (stamps, callbacks) in pending.items():
+        def stamp(conn, version, stamps=stamps):
+            for callback in stamps:
+                callback(conn, version)
+
+        try:
+            CacheVersionService.bump(name, stamp)
+        except Exception as e:
+            # The change itself is committed; caches pick it up with the next bump
+            current_app.logger.warning(f'Failed to bump cache version {name}: {str(e)}')
+            continue
+
+        for callback in callbacks:
+            callback()
+
+
+@event.listens_for(db.session, 'after_transaction_end')
+def _discard_pending(session, transaction) -> None:
+    """Drop bumps requested by a transaction that ended without a commit"""
+    if transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
+
+
+# Global cache version service instance
+cache_version_service = CacheVersionService()
@@ -0,0 +1,320 @@
+"""
+Content Hash Service for LockCloud
+SHA-256 content hashes for upload deduplication: an upload whose hash and
+size match an existing file can create a record that references the existing
+object instead of storing another copy, so several files may share one
+``s3_key``. Objects are only deleted from S3 once no file references them.
+
+Stored hashes are always computed from the object itself: a hash claimed by
+the client at upload time is only compared against stored hashes and never
+written. New and existing objects are hashed by ``flask
+backfill-content-hash``, which streams each object with parallel range reads.
+"""
+import hashlib
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import update
+
+from extensions import db
+from services.s3_service import s3_service
+
+
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+class ContentHashService:
+    """Service class for content hashes and shared objects"""
+
+    @staticmethod
+    def normalize(content_hash: Optional[str]) -> Optional[str]:
+        """
+        Validate a client-supplied SHA-256
+
+        Args:
+            content_hash: Hex digest (any case), or None/empty
+
+        Returns:
+            Lowercase hex digest, or None if not given
+
+        Raises:
+            ValueError: If the value is not a hex SHA-256
+        """
+        if content_hash in (None, ''):
+            return None
+        content_hash = str(content_hash).strip().lower()
+        if not SHA256_PATTERN.match(content_hash):
+            raise ValueError('content_hash 必须是 64 位十六进制 SHA-256')
+        return content_hash
+
+    @staticmethod
+    def find_duplicates(pairs: Iterable[Tuple[str, int]]) -> Dict[Tuple[str, int], object]:
+        """
+        Find existing files with the same content, with one query
+
+        Args:
+            pairs: (content_hash, size) pairs
+
+        Returns:
+            Dictionary {(content_hash, size): oldest matching File}
+        """
+        from files.models import File
+
+        pairs = {(content_hash, size) for content_hash, size in pairs if content_hash}
+        if not pairs:
+            return {}
+
+        files = File.query.filter(
+            File.content_hash.in_({content_hash for content_hash, _ in pairs})
+        ).order_by(File.id).all()
+
+        duplicates = {}
+        for file in files:
+            key = (file.content_hash, file.size)
+            if key in pairs and key not in duplicates:
+                duplicates[key] = file
+        return duplicates
+
+    @staticmethod
+    def find_duplicate(content_hash: Optional[str], size: int):
+        """Existing file with the same content, or None"""
+        return ContentHashService.find_duplicates([(content_hash, size)]).get((content_hash, size))
+
+    @staticmethod
+    def load_sources(requested: Iterable[Tuple[int, Optional[str], int]]) -> Dict[int, object]:
+        """
+        Load the files that new records want to reference, with one query
+
+        A source is only accepted when its (server-computed) hash and size
+        match what the client claims, so a record cannot be pointed at
+        unrelated content.
+
+        Args:
+            requested: (source_file_id, content_hash, size) triples
+
+        Returns:
+            Dictionary {source_file_id: File} of accepted sources
+        """
+        from files.models import File
+
+        requested = [(file_id, content_hash, size) for file_id, content_hash, size in requested if file_id]
+        if not requested:
+            return {}
+
+        files = {
+            file.id: file
+            for file in File.query.filter(File.id.in_({file_id for file_id, _, _ in requested})).all()
+        }
+        return {
+            file_id: files[file_id]
+            for file_id, content_hash, size in requested
+            if file_id in files
+            and content_hash
+            and files[file_id].content_hash == content_hash
+            and files[file_id].size == size
+        }
+
+    @staticmethod
+    def is_shared(s3_key: str, exclude_file_ids: Iterable[int]) -> bool:
+        """Whether any file other than ``exclude_file_ids`` references the object"""
+        from files.models import File
+
+        return db.session.query(
+            File.query.filter(
+                File.s3_key == s3_key,
+                File.id.notin_(list(exclude_file_ids))
+            ).exists()
+        ).scalar()
+
+    @staticmethod
+    def shared_keys(s3_keys: Iterable[str], exclude_file_ids: Iterable[int]) -> set:
+        """Which of ``s3_keys`` are referenced by files other than ``exclude_file_ids`` (one query)"""
+        from files.models import File
+
+        s3_keys = set(s3_keys)
+        if not s3_keys:
+            return set()
+        return {
+            row.s3_key for row in db.session.query(File.s3_key).filter(
+                File.s3_key.in_(s3_keys),
+                File.id.notin_(list(exclude_file_ids))
+            ).distinct()
+        }
+
+    @staticmethod
+    def delete_object(s3_key: str, file_id: int) -> bool:
+        """
+        Delete a file's object from S3 unless another file still references it
+
+        Args:
+            s3_key: Object key of the file being deleted or moved away
+            file_id: ID of that file
+
+        Returns:
+            True if the object was deleted, False if it is still shared
+
+        Raises:
+            ClientError: If deletion fails
+        """
+        if ContentHashService.is_shared(s3_key, [file_id]):
+            current_app.logger.info(f'Keeping shared object {s3_key} (still referenced by other files)')
+            return False
+        return s3_service.delete_file(s3_key)
+
+    @staticmethod
+    def hash_object(s3_key: str, size: int, chunk_size: int, range_pool: ThreadPoolExecutor,
+                    window: int = 4) -> str:
+        """
+        SHA-256 of an object, streamed with parallel range reads
+
+        Up to ``window`` ranges of the object are read ahead on ``range_pool``
+        and fed to the hash in order, so memory stays at window * chunk_size.
+
+        Args:
+            s3_key: S3 object key
+            size: Expected object size in bytes
+            chunk_size: Bytes per range request
+            range_pool: Thread pool for range reads (shared between files)
+            window: Ranges in flight for this object
+
+        Returns:
+            Hex SHA-256
+
+        Raises:
+            FileNotFoundError: If the object does not exist
+            ValueError: If the object size differs from ``size``
+        """
+        digest = hashlib.sha256()
+        if size == 0:
+            return digest.hexdigest()
+
+        app = current_app._get_current_object()
+
+        def read(start):
+            with app.app_context():
+                return s3_service.get_object_range(s3_key, start, min(start + chunk_size, size) - 1)
+
+        offsets = iter(range(0, size, chunk_size))
+        pending = deque()
+        for start in offsets:
+            pending.append(range_pool.submit(read, start))
+            if len(pending) >= window:
+                break
+
+        try:
+            while pending:
+                data, total = pending.popleft().result()
+                if total != size:
+                    raise ValueError(f'对象大小 {total} 与记录的 {size} 不一致')
+                digest.update(data)
+
+                start = next(offsets, None)
+                if start is not None:
+                    pending.append(range_pool.submit(read, start))
+        finally:
+            for future in pending:
+                future.cancel()
+
+        return digest.hexdigest()
+
+    @staticmethod
+    def missing_query():
+        """Query of files without a content hash"""
+        from files.models import File
+
+        return File.query.filter(File.content_hash.is_(None))
+
+    @staticmethod
+    def backfill(batch_size: int = 100, concurrency: int = 4, range_workers: int = 4,
+                 chunk_size: int = 8 * 1024 * 1024, limit: int = 0,
+                 on_batch: Optional[Callable[[int, int, int], None]] = None) -> Dict:
+        """
+        Compute missing content hashes in batches
+
+        Files are read with keyset pagination on id. ``concurrency`` objects
+        are hashed at a time, each streaming up to ``range_workers`` ranges
+        ahead; every batch is written back with one bulk UPDATE. Files that
+        share an object are hashed once.
+
+        Args:
+            batch_size: Files per batch
+            concurrency: Objects hashed in parallel
+            range_workers: Range reads in flight per object
+            chunk_size: Bytes per range request
+            limit: Maximum number of files to process (0 = no limit)
+            on_batch: Callback(processed, hashed, bytes_read) after each batch
+
+        Returns:
+            Summary with processed, hashed, failed, bytes and elapsed
+        """
+        from files.models import File
+
+        app = current_app._get_current_object()
+        started = time.monotonic()
+        summary = {'processed': 0, 'hashed': 0, 'failed': 0, 'bytes': 0}
+
+        def hash_one(row):
+            with app.app_context():
+                try:
+                    return row, ContentHashService.hash_object(
+                        row.s3_key, row.size, chunk_size, range_pool, window=range_workers
+                    ), None
+                except Exception as e:
+                    return row, None, str(e)
+
+        last_id = 0
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='content-hash') as file_pool, \
+                ThreadPoolExecutor(max_workers=concurrency * range_workers,
+                                   thread_name_prefix='content-hash-range') as range_pool:
+            while True:
+                size = batch_size
+                if limit:
+                    size = min(size, limit - summary['processed'])
+                    if size <= 0:
+                        break
+
+                rows: List = ContentHashService.missing_query().filter(
+                    File.id > last_id
+                ).order_by(File.id).with_entities(
+                    File.id, File.s3_key, File.size
+                ).limit(size).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+
+                objects = {}
+                for row in rows:
+                    objects.setdefault(row.s3_key, row)
+
+                hashes = {}
+                for row, content_hash, error in file_pool.map(hash_one, objects.values()):
+                    if content_hash:
+                        hashes[row.s3_key] = content_hash
+                        summary['bytes'] += row.size
+                    else:
+                        current_app.logger.warning(f'Failed to hash {row.s3_key}: {error}')
+
+                filled = [
+                    {'id': row.id, 'content_hash': hashes[row.s3_key]}
+                    for row in rows if row.s3_key in hashes
+                ]
+                if filled:
+                    db.session.execute(update(File), filled)
+                db.session.commit()
+
+                summary['processed'] += len(rows)
+                summary['hashed'] += len(filled)
+                summary['failed'] += len(rows) - len(filled)
+                if on_batch:
+                    on_batch(len(rows), len(filled), summary['bytes'])
+
+        summary['elapsed'] = time.monotonic() - started
+        return summary
+
+
+# Global content hash service instance
+content_hash_service = ContentHashService()
@@ -1,62 +1,193 @@
 """
 File Naming Service for LockCloud
 Handles automatic file naming based on activity date and sequential indexing
+
+Indices come from the per-date counter table ``file_name_sequences``: each
+reservation is one atomic UPDATE ... RETURNING (or INSERT ... ON CONFLICT
+for a date's first reservation), committed on its own connection like a
+database sequence, so concurrent uploads never get the same index and
+rolled-back uploads only leave gaps. A date's counter starts after the
+highest index already used in that date's filenames.
 """
 import os
-from datetime import date
-from typing import Optional
+import re
+from datetime import date, datetime
+from typing import Iterable, List, Optional
 from flask import current_app
+from sqlalchemy import func, select
+
+from extensions import db
+
+
+# YYYY-MM-DD_XXX filename (XXX is the zero-padded index), with optional extension
+SEQUENTIAL_NAME_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2})_(\d{1,9})(?:\.[^.]*)?$')
 
 
 class FileNamingService:
     """Service class for automatic file naming operations"""
     
     @staticmethod
-    def generate_filename(activity_date: date, file_extension: str) -> str:
+    def _upsert(table, dialect_name: str):
+        """INSERT construct with ON CONFLICT support for the database dialect"""
+        if dialect_name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect_name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            raise NotImplementedError(f'Sequential file naming is not supported on {dialect_name}')
+        return insert(table)
+    
+    @staticmethod
+    def parse_index(filename: str, activity_date: date) -> Optional[int]:
+        """Index of a YYYY-MM-DD_XXX filename for activity_date, or None for other names"""
+        match = SEQUENTIAL_NAME_PATTERN.match(filename or '')
+        if not match or match.group(1) != activity_date.isoformat():
+            return None
+        return int(match.group(2))
+    
+    @staticmethod
+    def highest_index(activity_date: date, filenames: Iterable[str], file_count: int) -> int:
         """
-        Generate a unique filename based on activity date and sequential index
+        Last index already used for a date
         
-        Format: YYYY-MM-DD_XXX.ext
-        Example: 2025-03-15_001.jpg
+        The larger of the file count (the old count-based scheme) and the
+        highest index parsed from the date's filenames, so deleted files or
+        renamed uploads cannot make the counter hand out a taken name.
         
         Args:
             activity_date: The date of the activity
-            file_extension: File extension including the dot (e.g., '.jpg', '.pdf')
+            filenames: Filenames of the date's files
+            file_count: Number of files with this activity date
         
         Returns:
-            Generated filename string
+            Index the counter should continue after
+        """
+        indices = (FileNamingService.parse_index(filename, activity_date) for filename in filenames)
+        return max([file_count, *(index for index in indices if index is not None)])
+    
+    @staticmethod
+    def reserve_indices(activity_date: date, count: int = 1) -> range:
+        """
+        Atomically reserve a block of sequential indices for an activity date
+        
+        One statement claims the whole block, so a batch upload of N files
+        costs the same as a single file.
+        
+        Args:
+            activity_date: The date of the activity
+            count: Number of indices to reserve
+        
+        Returns:
+            Reserved indices (e.g. range(4, 7) for 004..006)
         
         Raises:
-            ValueError: If activity_date is None or file_extension is invalid
+            ValueError: If activity_date is None or count < 1
         """
         if activity_date is None:
             raise ValueError('activity_date cannot be None')
-        
-        if not file_extension or not file_extension.startswith('.'):
-            raise ValueError('file_extension must start with a dot (e.g., ".jpg")')
+        if count < 1:
+            raise ValueError('count must be at least 1')
         
         # Import here to avoid circular dependency
         from files.models import File
+        from files.naming_models import FileNameSequence
+        
+        table = FileNameSequence.__table__
+        now = datetime.utcnow()
+        
+        # Own transaction: the counter row is locked only for this statement
+        with db.engine.begin() as conn:
+            last_index = conn.execute(
+                table.update()
+                .where(table.c.activity_date == activity_date)
+                .values(last_index=table.c.last_index + count, updated_at=now)
+                .returning(table.c.last_index)
+            ).scalar()
+            
+            if last_index is None:
+                # First reservation for this date: continue after the files already named
+                files = File.__table__
+                file_count = conn.execute(
+                    select(func.count()).select_from(files).where(files.c.activity_date == activity_date)
+                ).scalar()
+                filenames = conn.execute(
+                    select(files.c.filename).where(
+                        files.c.activity_date == activity_date,
+                        files.c.filename.like(f'{activity_date.isoformat()}\\_%', escape='\\')
+                    )
+                ).scalars()
+                existing = FileNamingService.highest_index(activity_date, filenames, file_count)
+                
+                insert = FileNamingService._upsert(table, conn.dialect.name)
+                last_index = conn.execute(
+                    insert.values(activity_date=activity_date, last_index=existing + count, updated_at=now)
+                    .on_conflict_do_update(
+                        index_elements=[table.c.activity_date],
+                        set_={'last_index': table.c.last_index + count, 'updated_at': now}
+                    )
+                    .returning(table.c.last_index)
+                ).scalar()
+        
+        return range(last_index - count + 1, last_index + 1)
+    
+    @staticmethod
+    def format_filename(activity_date: date, index: int, file_extension: str) -> str:
+        """Format YYYY-MM-DD_XXX.ext"""
+        return f"{activity_date.strftime('%Y-%m-%d')}_{str(index).zfill(3)}{file_extension}"
+    
+    @staticmethod
+    def generate_filenames(activity_date: date, file_extensions: List[str]) -> List[str]:
+        """
+        Generate unique sequential filenames for several files of one date
         
-        # Format date as YYYY-MM-DD
-        date_str = activity_date.strftime('%Y-%m-%d')
-        
-        # Query count of files with the same activity_date
-        count = File.query.filter(
-            File.activity_date == activity_date
-        ).count()
+        Args:
+            activity_date: The date of the activity
+            file_extensions: Extension of each file, including the dot
         
-        # Generate index starting from 001
-        index = str(count + 1).zfill(3)
+        Returns:
+            Generated filenames, in the order of file_extensions
         
-        # Construct filename
-        filename = f"{date_str}_{index}{file_extension}"
+        Raises:
+            ValueError: If activity_date is None or an extension is invalid
+        """
+        for file_extension in file_extensions:
+            if not file_extension or not file_extension.startswith('.'):
+                raise ValueError('file_extension must start with a dot (e.g., ".jpg")')
+        if not file_extensions:
+            return []
+        
+        indices = FileNamingService.reserve_indices(activity_date, len(file_extensions))
+        filenames = [
+            FileNamingService.format_filename(activity_date, index, file_extension)
+            for index, file_extension in zip(indices, file_extensions)
+        ]
         
         current_app.logger.info(
-            f'Generated filename: {filename} for activity_date: {date_str}'
+            f'Generated {len(filenames)} filenames for activity_date {activity_date.isoformat()}: '
+            f'{filenames[0]} .. {filenames[-1]}'
         )
         
-        return filename
+        return filenames
+    
+    @staticmethod
+    def generate_filename(activity_date: date, file_extension: str) -> str:
+        """
+        Generate a unique filename based on activity date and sequential index
+        
+        Format: YYYY-MM-DD_XXX.ext
+        Example: 2025-03-15_001.jpg
+        
+        Args:
+            activity_date: The date of the activity
+            file_extension: File extension including the dot (e.g., '.jpg', '.pdf')
+        
+        Returns:
+            Generated filename string
+        
+        Raises:
+            ValueError: If activity_date is None or file_extension is invalid
+        """
+        return FileNamingService.generate_filenames(activity_date, [file_extension])[0]
     
     @staticmethod
     def extract_extension(filename: str) -> str:
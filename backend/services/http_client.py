@@ -0,0 +1,202 @@
+"""
+HTTP Client for LockCloud
+Shared pooled HTTP client for all outbound calls (Bitiful transcode/thumbhash, SSO)
+"""
+import os
+import threading
+from typing import Dict, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask import current_app, has_app_context
+
+
+# Defaults used when no Flask app context is available (e.g. standalone scripts)
+DEFAULT_SETTINGS = {
+    'HTTP_POOL_CONNECTIONS': 10,
+    'HTTP_POOL_MAXSIZE': 20,
+    'HTTP_CONNECT_TIMEOUT': 5.0,
+    'HTTP_READ_TIMEOUT': 30.0,
+    'HTTP_MAX_RETRIES': 2,
+    'HTTP_RETRY_BACKOFF': 0.5,
+}
+
+TimeoutType = Union[float, Tuple[float, float], None]
+
+
+class _CountingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that remembers every host pool it hands out, so reuse can be reported"""
+
+    def __init__(self, *args, **kwargs):
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        conn = super().get_connection_with_tls_context(request, verify, proxies=proxies, cert=cert)
+        self._remember(conn)
+        return conn
+
+    def get_connection(self, url, proxies=None):
+        conn = super().get_connection(url, proxies=proxies)
+        self._remember(conn)
+        return conn
+
+    def _remember(self, conn):
+        key = f'{conn.scheme}://{conn.host}:{conn.port}'
+        with self._pools_lock:
+            self._pools[key] = conn
+
+    def pool_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Connection reuse statistics per host
+
+        Returns:
+            Dictionary {host: {'requests', 'connections', 'reused'}}
+        """
+        with self._pools_lock:
+            pools = dict(self._pools)
+
+        stats = {}
+        for key, pool in pools.items():
+            num_requests = getattr(pool, 'num_requests', 0)
+            num_connections = getattr(pool, 'num_connections', 0)
+            stats[key] = {
+                'requests': num_requests,
+                'connections': num_connections,
+                'reused': max(num_requests - num_connections, 0)
+            }
+        return stats
+
+
+class HttpClient:
+    """
+    Process-wide pooled HTTP client
+
+    One requests.Session per worker process (re-created after fork), with
+    keep-alive connection pools per host, default connect/read timeouts and
+    a retry/backoff policy for idempotent requests (connect errors and
+    502/503/504 are retried; read timeouts are not).
+    """
+
+    def __init__(self):
+        self._session = None
+        self._adapter = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _setting(name: str):
+        """Read a setting from Flask config, falling back to defaults outside app context"""
+        if has_app_context():
+            return current_app.config.get(name, DEFAULT_SETTINGS[name])
+        return DEFAULT_SETTINGS[name]
+
+    @property
+    def session(self) -> requests.Session:
+        """Lazy initialization of the pooled session (per process)"""
+        pid = os.getpid()
+        if self._session is None or self._pid != pid:
+            with self._lock:
+                if self._session is None or self._pid != pid:
+                    self._session, self._adapter = self._create_session()
+                    self._pid = pid
+        return self._session
+
+    def _create_session(self):
+        """Create a session with pooled, retrying adapters mounted for http and https"""
+        retry = Retry(
+            total=int(self._setting('HTTP_MAX_RETRIES')),
+            connect=int(self._setting('HTTP_MAX_RETRIES')),
+            # A read timeout already waited the full read timeout; retrying it
+            # would multiply the wait (e.g. a slow transcode warm-up GET)
+            read=False,
+            status=int(self._setting('HTTP_MAX_RETRIES')),
+            backoff_factor=float(self._setting('HTTP_RETRY_BACKOFF')),
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+            raise_on_status=False,
+            respect_retry_after_header=True
+        )
+
+        adapter = _CountingHTTPAdapter(
+            pool_connections=int(self._setting('HTTP_POOL_CONNECTIONS')),
+            pool_maxsize=int(self._setting('HTTP_POOL_MAXSIZE')),
+            max_retries=retry,
+            pool_block=False
+        )
+
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'User-Agent': 'LockCloud-Backend'})
+
+        return session, adapter
+
+    def default_timeout(self) -> Tuple[float, float]:
+        """Default (connect, read) timeout tuple"""
+        return (
+            float(self._setting('HTTP_CONNECT_TIMEOUT')),
+            float(self._setting('HTTP_READ_TIMEOUT'))
+        )
+
+    def _resolve_timeout(self, timeout: TimeoutType) -> Tuple[float, float]:
+        """
+        Normalize a timeout argument
+
+        A bare number is treated as the read timeout; the connect timeout
+        always stays short so a dead host fails fast.
+        """
+        connect_timeout, read_timeout = self.default_timeout()
+        if timeout is None:
+            return (connect_timeout, read_timeout)
+        if isinstance(timeout, (tuple, list)):
+            return (float(timeout[0]), float(timeout[1]))
+        return (min(connect_timeout, float(timeout)), float(timeout))
+
+    def request(self, method: str, url: str, timeout: TimeoutType = None, **kwargs) -> requests.Response:
+        """
+        Send a request through the pooled session
+
+        Args:
+            method: HTTP method
+            url: Target URL
+            timeout: Read timeout in seconds or (connect, read) tuple; defaults from config
+            **kwargs: Passed through to requests.Session.request
+
+        Returns:
+            requests.Response
+        """
+        return self.session.request(method, url, timeout=self._resolve_timeout(timeout), **kwargs)
+
+    def get(self, url: str, timeout: TimeoutType = None, **kwargs) -> requests.Response:
+        """Send a GET request through the pooled session"""
+        return self.request('GET', url, timeout=timeout, **kwargs)
+
+    def post(self, url: str, timeout: TimeoutType = None, **kwargs) -> requests.Response:
+        """Send a POST request through the pooled session"""
+        return self.request('POST', url, timeout=timeout, **kwargs)
+
+    def stats(self) -> Dict:
+        """
+        Pool reuse metrics for this worker process
+
+        Returns:
+            Dictionary with per-host and total request/connection/reuse counts
+        """
+        hosts = self._adapter.pool_stats() if self._adapter is not None and self._pid == os.getpid() else {}
+        total_requests = sum(h['requests'] for h in hosts.values())
+        total_connections = sum(h['connections'] for h in hosts.values())
+
+        return {
+            'pid': os.getpid(),
+            'hosts': hosts,
+            'total_requests': total_requests,
+            'total_connections': total_connections,
+            'reuse_ratio': round(1 - total_connections / total_requests, 4) if total_requests else 0.0
+        }
+
+
+# Global HTTP client instance
+http_client = HttpClient()
@@ -0,0 +1,353 @@
+"""
+Job Service for LockCloud
+Background jobs for batch operations too large to finish within a request:
+the request stores a job and returns at once, the job runs on a per-process
+executor (or ``flask job-worker``) in chunks, and clients poll
+``GET /api/jobs/<id>`` for progress and page through per-item results.
+
+Each chunk's item results and progress are committed in the same transaction
+as the chunk's changes, so a job interrupted by a crash or shutdown resumes
+at the first unfinished chunk without repeating work.
+"""
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import and_, insert, or_, update
+
+from extensions import db
+from files.job_models import Job, JobItem
+from services.background_executor import BackgroundExecutor
+
+
+# Per-process bounded executor for jobs started by requests
+job_executor = BackgroundExecutor(
+    'jobs',
+    max_workers=2,
+    max_queue=100,
+    config_prefix='JOB_EXECUTOR'
+)
+
+# Job type -> handler(user_id, file_ids, params, on_results) -> result dict
+_handlers: Dict[str, Callable] = {}
+
+
+class JobLockLost(RuntimeError):
+    """Another worker reclaimed the job; the current chunk must not be committed"""
+
+
+class JobService:
+    """Service class for background batch jobs"""
+
+    @staticmethod
+    def register(job_type: str, handler: Callable) -> None:
+        """
+        Register the handler that processes one chunk of a job type
+
+        The handler is called as ``handler(user_id, file_ids, params, on_results)``
+        and returns ``{'succeeded': [...], 'failed': [{'file_id', 'error'}], ...}``;
+        other integer values are summed into the job's totals. It must call
+        ``on_results(result)`` right before committing its changes.
+        """
+        _handlers[job_type] = handler
+
+    @staticmethod
+    def worker_id() -> str:
+        """Identifier of the current worker thread (host:pid:thread)"""
+        return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+    @staticmethod
+    def async_threshold() -> int:
+        """Batches with more items than this run as jobs"""
+        return int(current_app.config.get('JOB_ASYNC_THRESHOLD', 200))
+
+    @staticmethod
+    def _claimable(now: datetime):
+        """SQL condition for jobs that are pending, or running with an expired lease"""
+        lease = int(current_app.config.get('JOB_LEASE_SECONDS', 300))
+        return or_(
+            Job.status == Job.STATUS_PENDING,
+            and_(
+                Job.status == Job.STATUS_RUNNING,
+                Job.heartbeat_at < now - timedelta(seconds=lease)
+            )
+        )
+
+    @staticmethod
+    def create(job_type: str, user_id: int, file_ids: List[int], params: Optional[Dict] = None) -> Job:
+        """
+        Store a job and start it in the background
+
+        If the in-process executor is full the job stays pending in the
+        database and is picked up by ``flask job-worker``.
+
+        Args:
+            job_type: Registered job type
+            user_id: Requesting user
+            file_ids: Items to process, in request order
+            params: Handler parameters (JSON-serializable)
+
+        Returns:
+            The new Job
+        """
+        if job_type not in _handlers:
+            raise ValueError(f'Unknown job type: {job_type}')
+
+        job = Job(
+            type=job_type,
+            user_id=user_id,
+            params={**(params or {}), 'file_ids': list(file_ids)},
+            status=Job.STATUS_PENDING,
+            total=len(file_ids),
+            result={}
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        job_executor.submit(job.id, JobService._run_in_process, job.id)
+        return job
+
+    @staticmethod
+    def claim(job_id: Optional[int] = None, worker_id: Optional[str] = None) -> Optional[Job]:
+        """
+        Atomically claim the oldest pending job (or a given one)
+
+        Args:
+            job_id: Claim this job only
+            worker_id: Lock owner recorded on the job
+
+        Returns:
+            Claimed Job, or None if nothing is claimable
+        """
+        worker_id = worker_id or JobService.worker_id()
+        now = datetime.utcnow()
+        claimable = JobService._claimable(now)
+
+        query = db.session.query(Job.id).filter(claimable)
+        if job_id is not None:
+            query = query.filter(Job.id == job_id)
+        candidates = [row.id for row in query.order_by(Job.created_at, Job.id).limit(5)]
+
+        for candidate_id in candidates:
+            claimed = db.session.execute(
+                update(Job)
+                .where(Job.id == candidate_id, claimable)
+                .values(
+                    status=Job.STATUS_RUNNING,
+                    locked_by=worker_id,
+                    heartbeat_at=now,
+                    attempts=Job.attempts + 1,
+                    started_at=db.func.coalesce(Job.started_at, now),
+                    updated_at=now
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+
+            if claimed == 1:
+                job = db.session.get(Job, candidate_id)
+                db.session.refresh(job)
+                return job
+
+        return None
+
+    @staticmethod
+    def _update_owned(job_id: int, worker_id: str, commit: bool = True, **values) -> bool:
+        """Update a job only while this worker still holds its lock"""
+        values.setdefault('updated_at', datetime.utcnow())
+        updated = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.locked_by == worker_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if commit:
+            db.session.commit()
+        return updated == 1
+
+    @staticmethod
+    def _record_chunk(job_id: int, worker_id: str, offset: int, chunk: List[int],
+                      result: Dict, totals: Dict) -> None:
+        """
+        Add a chunk's item results and progress to the session (the handler commits)
+
+        Raises:
+            JobLockLost: If another worker took over the job
+        """
+        seq = {item_id: offset + index for index, item_id in reversed(list(enumerate(chunk)))}
+        rows = [
+            {'job_id': job_id, 'seq': seq[item_id], 'item_id': item_id,
+             'status': JobItem.STATUS_SUCCEEDED, 'error': None}
+            for item_id in result['succeeded']
+        ] + [
+            {'job_id': job_id, 'seq': seq[item['file_id']], 'item_id': item['file_id'],
+             'status': JobItem.STATUS_FAILED, 'error': item['error']}
+            for item in result['failed']
+        ]
+        if rows:
+            db.session.execute(insert(JobItem), rows)
+
+        for key, value in result.items():
+            if key in ('succeeded', 'failed'):
+                continue
+            if isinstance(value, int) and not isinstance(value, bool):
+                totals[key] = totals.get(key, 0) + value
+            else:
+                totals[key] = value
+
+        owned = JobService._update_owned(
+            job_id, worker_id, commit=False,
+            processed=offset + len(chunk),
+            succeeded_count=Job.succeeded_count + len(result['succeeded']),
+            failed_count=Job.failed_count + len(result['failed']),
+            result=dict(totals),
+            heartbeat_at=datetime.utcnow()
+        )
+        if not owned:
+            raise JobLockLost(f'Lost lock on job {job_id}')
+
+    @staticmethod
+    def run_job(job: Job, stop: Optional[Callable[[], bool]] = None) -> str:
+        """
+        Run a claimed job chunk by chunk, starting at its saved position
+
+        Args:
+            job: Job returned by claim()
+            stop: Called between chunks; returning True releases the job
+                (kept pending, resumed by the next worker)
+
+        Returns:
+            Final job status ('running' if the lock was lost)
+        """
+        job_id = job.id
+        worker_id = job.locked_by
+        user_id = job.user_id
+        attempts = job.attempts
+        params = dict(job.params or {})
+        file_ids = params.pop('file_ids', [])
+        offset = job.processed
+        totals = dict(job.result or {})
+        handler = _handlers.get(job.type)
+        chunk_size = max(int(current_app.config.get('JOB_CHUNK_SIZE', 100)), 1)
+        max_attempts = int(current_app.config.get('JOB_MAX_ATTEMPTS', 3))
+
+        if handler is None:
+            JobService._update_owned(
+                job_id, worker_id, status=Job.STATUS_FAILED, last_error=f'未知任务类型: {job.type}',
+                locked_by=None, heartbeat_at=None, finished_at=datetime.utcnow()
+            )
+            return Job.STATUS_FAILED
+
+        while offset < len(file_ids):
+            if stop is not None and stop():
+                # 停机中断不算失败：保留进度，由下一个 worker 继续
+                JobService._update_owned(
+                    job_id, worker_id, status=Job.STATUS_PENDING,
+                    attempts=max(attempts - 1, 0), locked_by=None, heartbeat_at=None
+                )
+                current_app.logger.info(f'[Job] Job {job_id} released at {offset}/{len(file_ids)}')
+                return Job.STATUS_PENDING
+
+            chunk = file_ids[offset:offset + chunk_size]
+            recorded = []
+
+            def on_results(result, chunk=chunk, offset=offset):
+                JobService._record_chunk(job_id, worker_id, offset, chunk, result, totals)
+                recorded.append(True)
+
+            try:
+                result = handler(user_id, chunk, params, on_results)
+                if not recorded:
+                    on_results(result)
+                    db.session.commit()
+            except JobLockLost:
+                db.session.rollback()
+                current_app.logger.warning(f'[Job] Lost lock on job {job_id}, chunk at {offset} discarded')
+                return Job.STATUS_RUNNING
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f'[Job] Job {job_id} failed at {offset}/{len(file_ids)}: {str(e)}')
+                values = {'last_error': str(e), 'locked_by': None, 'heartbeat_at': None}
+                if attempts >= max_attempts:
+                    values.update(status=Job.STATUS_FAILED, finished_at=datetime.utcnow())
+                else:
+                    values['status'] = Job.STATUS_PENDING
+                JobService._update_owned(job_id, worker_id, **values)
+                return values['status']
+
+            offset += len(chunk)
+
+        JobService._update_owned(
+            job_id, worker_id, status=Job.STATUS_SUCCEEDED, processed=len(file_ids),
+            last_error=None, locked_by=None, heartbeat_at=None, finished_at=datetime.utcnow()
+        )
+        return Job.STATUS_SUCCEEDED
+
+    @staticmethod
+    def run_worker(max_jobs: int = 0, max_duration: float = 0,
+                   on_result: Optional[Callable[[Job, str], None]] = None) -> Dict:
+        """
+        Claim and run jobs until none is left or a limit is reached
+
+        Args:
+            max_jobs: Stop after this many jobs (0 = unlimited)
+            max_duration: Time limit in seconds, checked between chunks (0 = unlimited)
+            on_result: Called with (job, status) after each job
+
+        Returns:
+            Summary with counts by final status and elapsed seconds
+        """
+        started = time.monotonic()
+        deadline = started + max_duration if max_duration > 0 else None
+        worker_id = JobService.worker_id()
+        summary = {Job.STATUS_SUCCEEDED: 0, Job.STATUS_FAILED: 0, Job.STATUS_PENDING: 0, Job.STATUS_RUNNING: 0}
+
+        def stop():
+            return deadline is not None and time.monotonic() >= deadline
+
+        while not max_jobs or sum(summary.values()) < max_jobs:
+            if stop():
+                break
+
+            job = JobService.claim(worker_id=worker_id)
+            if job is None:
+                break
+
+            status = JobService.run_job(job, stop=stop)
+            summary[status] += 1
+            if on_result is not None:
+                on_result(job, status)
+
+        summary['elapsed'] = time.monotonic() - started
+        return summary
+
+    @staticmethod
+    def _run_in_process(job_id: int) -> None:
+        """Executor task: claim and run one freshly created job"""
+        job = JobService.claim(job_id=job_id)
+        if job is None:
+            return
+
+        status = JobService.run_job(job, stop=job_executor.is_stopping)
+        current_app.logger.info(f'[Job] Job {job_id} ({job.type}) finished with status {status}')
+
+    @staticmethod
+    def get_for_user(job_id: int, user_id: int, is_admin: bool = False) -> Optional[Job]:
+        """
+        Load a job visible to the user (its creator, or any job for admins)
+
+        Returns:
+            Job, or None if it does not exist or belongs to someone else
+        """
+        job = db.session.get(Job, job_id)
+        if job is None or (job.user_id != user_id and not is_admin):
+            return None
+        return job
+
+
+# Global job service instance
+job_service = JobService()
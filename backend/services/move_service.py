@@ -0,0 +1,236 @@
+"""
+Move Service for LockCloud
+Moves S3 objects when a file's directory or name changes: copies run
+concurrently on a bounded thread pool, the DB is switched to the new keys in
+one commit together with a move journal, and the old keys are deleted in
+bulk afterwards. Cleanup that did not finish (crash, S3 error) is retried
+by ``flask cleanup-moves``.
+
+A source key is only deleted once no file references it, so the DB never
+points at a deleted object. Copies made for an update that is rolled back
+are not journaled; callers delete them with ``discard`` (or
+``discard_on_error``).
+"""
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+
+from extensions import db
+from files.move_models import FileMove
+from services.s3_service import s3_service
+
+
+class MoveService:
+    """Service class for moving file objects in S3"""
+
+    @staticmethod
+    def copy_objects(pairs: Iterable[Tuple[str, str]]) -> Dict[str, str]:
+        """
+        Copy objects to their new keys in parallel
+
+        Args:
+            pairs: (source_key, target_key) pairs
+
+        Returns:
+            Dictionary {target_key: error message} for failed copies
+        """
+        pairs = list(dict.fromkeys(pairs))
+        if not pairs:
+            return {}
+
+        app = current_app._get_current_object()
+
+        def copy(pair):
+            source_key, target_key = pair
+            with app.app_context():
+                try:
+                    s3_service.copy_file(source_key, target_key)
+                    return target_key, None
+                except Exception as e:
+                    return target_key, str(e)
+
+        workers = min(int(current_app.config.get('MOVE_COPY_WORKERS', 8)), len(pairs))
+        if workers <= 1:
+            results = map(copy, pairs)
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='file-move') as pool:
+                results = list(pool.map(copy, pairs))
+
+        errors = {target_key: error for target_key, error in results if error}
+        current_app.logger.info(f'[Move] Copied {len(pairs) - len(errors)} objects, {len(errors)} failed')
+        return errors
+
+    @staticmethod
+    def record(moves: Iterable[Tuple[int, str, str]]) -> str:
+        """
+        Journal moves whose copies exist (the caller commits)
+
+        Must be committed in the same transaction that points the files at
+        their new keys.
+
+        Args:
+            moves: (file_id, source_key, target_key) triples
+
+        Returns:
+            Batch ID for finish()
+        """
+        batch_id = str(uuid.uuid4())
+        db.session.add_all([
+            FileMove(batch_id=batch_id, file_id=file_id, source_key=source_key, target_key=target_key)
+            for file_id, source_key, target_key in moves
+        ])
+        return batch_id
+
+    @staticmethod
+    def _referenced(keys: Iterable[str]) -> set:
+        """Which of ``keys`` some file currently points at (one query)"""
+        from files.models import File
+
+        keys = set(keys)
+        if not keys:
+            return set()
+        return {
+            row.s3_key for row in db.session.query(File.s3_key).filter(File.s3_key.in_(keys)).distinct()
+        }
+
+    @staticmethod
+    def discard(target_keys: Iterable[str]) -> None:
+        """
+        Delete copies the DB was not switched to (e.g. the update failed afterwards)
+
+        Call after the rollback: keys that a committed file points at are kept.
+        Never raises.
+        """
+        target_keys = set(target_keys)
+        if not target_keys:
+            return
+        try:
+            unused = target_keys - MoveService._referenced(target_keys)
+            errors = s3_service.delete_files(list(unused)) if unused else {}
+        except Exception as e:
+            unused = target_keys
+            errors = {key: str(e) for key in target_keys}
+        for key, error in errors.items():
+            current_app.logger.warning(f'[Move] Failed to discard copy {key}: {error}')
+        if unused:
+            current_app.logger.info(f'[Move] Discarded {len(unused) - len(errors)} copies of a failed update')
+
+    @staticmethod
+    @contextmanager
+    def discard_on_error(target_keys: Iterable[str]):
+        """
+        Roll back and discard the copies if the block raises (the exception propagates)
+
+        Wrap everything from the copy to the commit that points the files at
+        their new keys.
+        """
+        try:
+            yield
+        except Exception:
+            db.session.rollback()
+            MoveService.discard(target_keys)
+            raise
+
+    @staticmethod
+    def _cleanup(rows: List[FileMove], dry_run: bool = False,
+                 on_move: Optional[Callable[[FileMove, str], None]] = None) -> Dict:
+        """Delete the unreferenced source keys of journal rows and mark them done"""
+        summary = {'deleted': 0, 'kept': 0, 'errors': 0}
+        if not rows:
+            return summary
+
+        sources = {row.source_key for row in rows}
+        referenced = MoveService._referenced(sources)
+        deletable = sources - referenced
+
+        errors = {}
+        if deletable and not dry_run:
+            try:
+                errors = s3_service.delete_files(list(deletable))
+            except Exception as e:
+                errors = {key: str(e) for key in deletable}
+
+        now = datetime.utcnow()
+        for row in rows:
+            if row.source_key in errors:
+                result = 'error'
+                row.error = errors[row.source_key]
+                summary['errors'] += 1
+            else:
+                result = 'kept' if row.source_key in referenced else 'deleted'
+                summary[result] += 1
+                if not dry_run:
+                    row.status = FileMove.STATUS_DONE
+                    row.error = None
+                    row.completed_at = now
+            if on_move:
+                on_move(row, result)
+
+        if not dry_run:
+            db.session.commit()
+        return summary
+
+    @staticmethod
+    def finish(batch_id: str) -> Dict:
+        """
+        Delete the old keys of a committed batch in bulk
+
+        Old keys still referenced by other files (shared content) are kept.
+        Rows whose deletion failed stay pending for ``flask cleanup-moves``.
+        Never raises: the move itself is already committed.
+
+        Returns:
+            Summary with deleted, kept and errors
+        """
+        try:
+            rows = FileMove.query.filter_by(batch_id=batch_id, status=FileMove.STATUS_PENDING).all()
+            summary = MoveService._cleanup(rows)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f'[Move] Cleanup of batch {batch_id} failed, left for cleanup-moves: {str(e)}')
+            return {'deleted': 0, 'kept': 0, 'errors': 0}
+        if summary['errors']:
+            current_app.logger.warning(
+                f'[Move] {summary["errors"]} old keys of batch {batch_id} not deleted, left for cleanup-moves'
+            )
+        return summary
+
+    @staticmethod
+    def cleanup(older_than: Optional[timedelta] = None, dry_run: bool = False, batch_size: int = 1000,
+                on_move: Optional[Callable[[FileMove, str], None]] = None) -> Dict:
+        """
+        Finish pending moves left by interrupted requests
+
+        Args:
+            older_than: Only rows older than this (default: all pending rows)
+            dry_run: Only report what would be deleted
+            batch_size: Rows per bulk delete
+            on_move: Callback(row, result) for each row ('deleted', 'kept', 'error')
+
+        Returns:
+            Summary with deleted, kept and errors
+        """
+        summary = {'deleted': 0, 'kept': 0, 'errors': 0}
+        query = FileMove.query.filter(FileMove.status == FileMove.STATUS_PENDING)
+        if older_than:
+            query = query.filter(FileMove.created_at < datetime.utcnow() - older_than)
+
+        last_id = 0
+        while True:
+            rows = query.filter(FileMove.id > last_id).order_by(FileMove.id).limit(batch_size).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            for key, count in MoveService._cleanup(rows, dry_run=dry_run, on_move=on_move).items():
+                summary[key] += count
+
+        return summary
+
+
+# Global move service instance
+move_service = MoveService()
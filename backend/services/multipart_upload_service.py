@@ -0,0 +1,242 @@
+"""
+Multipart Upload Service for LockCloud
+Resumable S3 multipart uploads for large files: a session record tracks the
+S3 UploadId so clients can re-sign parts and resume after a network failure,
+and abandoned uploads are aborted by ``flask cleanup-multipart``.
+"""
+import math
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flask import current_app
+
+from extensions import db
+from files.upload_models import UploadSession
+from services.s3_service import s3_service
+
+
+# S3 limits: every part except the last must be at least 5 MiB, at most 10000 parts
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10000
+
+
+class MultipartUploadService:
+    """Service class for resumable multipart uploads"""
+
+    @staticmethod
+    def plan_parts(size: int) -> Tuple[int, int]:
+        """
+        Choose the part size and part count for a file
+
+        Uses MULTIPART_PART_SIZE, raised when needed to stay within S3's
+        part-size minimum and 10000-part limit.
+
+        Args:
+            size: File size in bytes
+
+        Returns:
+            (part_size, part_count)
+        """
+        configured = int(current_app.config.get('MULTIPART_PART_SIZE', 16 * 1024 * 1024))
+        part_size = max(configured, MIN_PART_SIZE, math.ceil(size / MAX_PARTS))
+        part_count = max(1, math.ceil(size / part_size))
+        return part_size, part_count
+
+    @staticmethod
+    def _session_ttl() -> timedelta:
+        return timedelta(hours=float(current_app.config.get('MULTIPART_SESSION_TTL_HOURS', 24)))
+
+    @staticmethod
+    def create_session(s3_key: str, uploader_id: int, original_filename: str,
+                       content_type: str, size: int) -> UploadSession:
+        """
+        Start an S3 multipart upload and record it
+
+        Args:
+            s3_key: Destination S3 key
+            uploader_id: Uploading user
+            original_filename: User's original filename
+            content_type: MIME type
+            size: File size in bytes
+
+        Returns:
+            The new active UploadSession
+        """
+        part_size, part_count = MultipartUploadService.plan_parts(size)
+        upload_id = s3_service.create_multipart_upload(s3_key, content_type)
+
+        session = UploadSession(
+            upload_id=upload_id,
+            s3_key=s3_key,
+            uploader_id=uploader_id,
+            original_filename=original_filename,
+            content_type=content_type,
+            size=size,
+            part_size=part_size,
+            part_count=part_count,
+            status=UploadSession.STATUS_ACTIVE,
+            expires_at=datetime.utcnow() + MultipartUploadService._session_ttl()
+        )
+        db.session.add(session)
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            s3_service.abort_multipart_upload(s3_key, upload_id)
+            raise
+        return session
+
+    @staticmethod
+    def get_session(session_id: int, uploader_id: int) -> Optional[UploadSession]:
+        """
+        Load an upload session owned by the user
+
+        Returns:
+            UploadSession, or None if it does not exist or belongs to someone else
+        """
+        session = db.session.get(UploadSession, session_id)
+        if session is None or session.uploader_id != uploader_id:
+            return None
+        return session
+
+    @staticmethod
+    def sign_parts(session: UploadSession, part_numbers: List[int]) -> Dict[int, str]:
+        """
+        Presign part upload URLs and extend the session's expiry
+
+        Args:
+            session: Active upload session
+            part_numbers: Part numbers to sign (1..part_count)
+
+        Returns:
+            Dictionary {part_number: presigned_url}
+
+        Raises:
+            ValueError: If a part number is out of range
+        """
+        invalid = [n for n in part_numbers if not isinstance(n, int) or n < 1 or n > session.part_count]
+        if invalid:
+            raise ValueError(f'分片编号无效: {invalid[:5]}')
+
+        expiration = int(current_app.config.get('MULTIPART_URL_EXPIRATION', 3600))
+        urls = s3_service.generate_presigned_part_urls(
+            session.s3_key, session.upload_id, sorted(set(part_numbers)), expiration=expiration
+        )
+
+        # 仍在上传的会话不会被清理
+        session.expires_at = datetime.utcnow() + MultipartUploadService._session_ttl()
+        db.session.commit()
+        return urls
+
+    @staticmethod
+    def uploaded_parts(session: UploadSession) -> List[Dict]:
+        """Parts already stored by S3 for the session (used to resume)"""
+        return s3_service.list_uploaded_parts(session.s3_key, session.upload_id)
+
+    @staticmethod
+    def complete(session: UploadSession, parts: Optional[List[Dict]] = None) -> None:
+        """
+        Assemble the uploaded parts into the final object
+
+        Args:
+            session: Active upload session
+            parts: {'part_number', 'etag'} reported by the client; when omitted
+                the parts are listed from S3
+
+        Raises:
+            ValueError: If parts are missing
+        """
+        if not parts:
+            parts = MultipartUploadService.uploaded_parts(session)
+
+        numbers = {part['part_number'] for part in parts}
+        missing = [n for n in range(1, session.part_count + 1) if n not in numbers]
+        if missing:
+            raise ValueError(f'缺少 {len(missing)} 个分片: {missing[:10]}')
+
+        s3_service.complete_multipart_upload(session.s3_key, session.upload_id, parts)
+
+        session.status = UploadSession.STATUS_COMPLETED
+        session.completed_at = datetime.utcnow()
+        db.session.commit()
+
+    @staticmethod
+    def abort(session: UploadSession) -> None:
+        """Abort the S3 upload and mark the session aborted"""
+        s3_service.abort_multipart_upload(session.s3_key, session.upload_id)
+        session.status = UploadSession.STATUS_ABORTED
+        db.session.commit()
+
+    @staticmethod
+    def cleanup(older_than: Optional[timedelta] = None, dry_run: bool = False,
+                on_abort: Optional[Callable[[str, str], None]] = None) -> Dict:
+        """
+        Abort abandoned multipart uploads
+
+        Expired active sessions are aborted and marked aborted. S3 uploads
+        older than ``older_than`` that no active session refers to (e.g.
+        created before a crash) are aborted as well.
+
+        Args:
+            older_than: Age after which untracked S3 uploads are aborted
+                (defaults to MULTIPART_SESSION_TTL_HOURS)
+            dry_run: Only report what would be aborted
+            on_abort: Callback(s3_key, reason) for each aborted upload
+
+        Returns:
+            Summary with expired_sessions, orphaned_uploads and errors
+        """
+        now = datetime.utcnow()
+        older_than = older_than or MultipartUploadService._session_ttl()
+        summary = {'expired_sessions': 0, 'orphaned_uploads': 0, 'errors': 0}
+
+        expired = UploadSession.query.filter(
+            UploadSession.status == UploadSession.STATUS_ACTIVE,
+            UploadSession.expires_at < now
+        ).all()
+        for session in expired:
+            if on_abort:
+                on_abort(session.s3_key, 'expired')
+            if dry_run:
+                summary['expired_sessions'] += 1
+                continue
+            try:
+                MultipartUploadService.abort(session)
+                summary['expired_sessions'] += 1
+            except Exception as e:
+                db.session.rollback()
+                summary['errors'] += 1
+                current_app.logger.error(f'[Multipart] Failed to abort {session.s3_key}: {str(e)}')
+
+        active_ids = {
+            row.upload_id for row in db.session.query(UploadSession.upload_id).filter(
+                UploadSession.status == UploadSession.STATUS_ACTIVE
+            )
+        }
+        cutoff = now - older_than
+        for upload in s3_service.list_multipart_uploads():
+            if upload['upload_id'] in active_ids:
+                continue
+            initiated = upload['initiated']
+            if initiated.tzinfo is not None:
+                initiated = initiated.replace(tzinfo=None) - (initiated.utcoffset() or timedelta())
+            if initiated >= cutoff:
+                continue
+
+            if on_abort:
+                on_abort(upload['key'], 'orphaned')
+            if dry_run:
+                summary['orphaned_uploads'] += 1
+                continue
+            try:
+                s3_service.abort_multipart_upload(upload['key'], upload['upload_id'])
+                summary['orphaned_uploads'] += 1
+            except Exception as e:
+                summary['errors'] += 1
+                current_app.logger.error(f'[Multipart] Failed to abort {upload["key"]}: {str(e)}')
+
+        return summary
+
+
+# Global multipart upload service instance
+multipart_upload_service = MultipartUploadService()
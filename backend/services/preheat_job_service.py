@@ -0,0 +1,541 @@
+"""
+Preheat Job Service for LockCloud
+Persistent preheat queue: enqueue videos, claim jobs atomically, run them with
+checkpoints so an interrupted video resumes where it stopped, and retry
+failures with exponential backoff.
+"""
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Optional
+
+from flask import current_app
+from sqlalchemy import and_, delete, func, or_, update
+
+from extensions import db
+from files.models import File
+from files.preheat_models import PreheatJob
+from services.rate_limiter import TokenBucket
+from services.video_preheat_service import preheat_executor, video_preheat_service
+
+
+# Seconds between progress checkpoints written while a video is being warmed
+CHECKPOINT_INTERVAL = 5.0
+
+
+class PreheatJobService:
+    """Service class for the persistent preheat job queue"""
+
+    @staticmethod
+    def worker_id() -> str:
+        """Identifier of the current worker thread (host:pid:thread)"""
+        return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+    @staticmethod
+    def _retry_delay(attempts: int) -> timedelta:
+        """Exponential backoff after the given number of failed attempts"""
+        base = float(current_app.config.get('PREHEAT_JOB_RETRY_BASE', 300))
+        cap = float(current_app.config.get('PREHEAT_JOB_RETRY_MAX', 21600))
+        return timedelta(seconds=min(base * (2 ** max(attempts - 1, 0)), cap))
+
+    @staticmethod
+    def _claimable(now: datetime):
+        """SQL condition for jobs that are due, or running with an expired lease"""
+        lease = int(current_app.config.get('PREHEAT_JOB_LEASE_SECONDS', 900))
+        return or_(
+            and_(PreheatJob.status == PreheatJob.STATUS_PENDING, PreheatJob.next_run_at <= now),
+            and_(
+                PreheatJob.status == PreheatJob.STATUS_RUNNING,
+                PreheatJob.heartbeat_at < now - timedelta(seconds=lease)
+            )
+        )
+
+    @staticmethod
+    def enqueue(file_id: int, s3_key: str) -> PreheatJob:
+        """
+        Queue a video for preheat (or re-queue its existing job)
+
+        A job that is already pending or running is left untouched.
+
+        Args:
+            file_id: File ID of the video
+            s3_key: S3 object key of the video
+
+        Returns:
+            PreheatJob instance
+        """
+        PreheatJobService.enqueue_many([(file_id, s3_key)])
+        return PreheatJob.query.filter_by(file_id=file_id).first()
+
+    @staticmethod
+    def enqueue_many(videos: Iterable) -> int:
+        """
+        Queue several videos for preheat in one transaction
+
+        Args:
+            videos: Iterable of (file_id, s3_key) pairs
+
+        Returns:
+            Number of jobs created or re-queued
+        """
+        videos = dict(videos)
+        if not videos:
+            return 0
+
+        now = datetime.utcnow()
+        existing = {
+            job.file_id: job
+            for job in PreheatJob.query.filter(PreheatJob.file_id.in_(list(videos.keys()))).all()
+        }
+
+        queued = 0
+        for file_id, s3_key in videos.items():
+            job = existing.get(file_id)
+            if job is None:
+                db.session.add(PreheatJob(
+                    file_id=file_id,
+                    s3_key=s3_key,
+                    status=PreheatJob.STATUS_PENDING,
+                    next_run_at=now
+                ))
+            elif job.status in (PreheatJob.STATUS_PENDING, PreheatJob.STATUS_RUNNING):
+                # 已在队列中：保留进度与退避时间
+                continue
+            else:
+                job.s3_key = s3_key
+                job.status = PreheatJob.STATUS_PENDING
+                job.attempts = 0
+                job.last_error = None
+                job.segments_done = 0
+                job.next_run_at = now
+                job.finished_at = None
+            queued += 1
+
+        db.session.commit()
+        return queued
+
+    @staticmethod
+    def delete_for_files(file_ids: Iterable[int]) -> int:
+        """
+        Delete the jobs of files that are about to be deleted
+        (the caller deletes the files and commits)
+
+        Deleted explicitly because the bulk file deletes bypass the ORM and
+        SQLite does not enforce the ON DELETE CASCADE of ``file_id``.
+
+        Returns:
+            Number of jobs deleted
+        """
+        file_ids = set(file_ids)
+        if not file_ids:
+            return 0
+        return db.session.execute(
+            delete(PreheatJob).where(PreheatJob.file_id.in_(file_ids))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    @staticmethod
+    def select_videos(days: int, rewarm_after: Optional[timedelta] = None, limit: int = 0,
+                      min_score: Optional[float] = None, order: str = 'popularity') -> list:
+        """
+        Videos worth warming whose warm state is about to expire
+
+        A video is a candidate if its activity date or its upload time is
+        within ``days`` days (old footage uploaded recently is still watched),
+        or if its decayed access score is at least ``min_score``.
+        Videos warmed within ``rewarm_after`` and videos already queued are
+        skipped, so nightly work scales with what is about to be evicted
+        rather than with the size of the window.
+
+        Args:
+            days: Window size in days
+            rewarm_after: Re-warm videos last warmed longer ago than this;
+                defaults to PREHEAT_REWARM_AFTER_HOURS
+            limit: Maximum number of videos (0 = unlimited)
+            min_score: Popular videos at or above this decayed score are selected
+                regardless of date; defaults to PREHEAT_POPULAR_MIN_SCORE (0 = disabled)
+            order: 'popularity' (most watched first) or 'expiry' (least recently warmed first)
+
+        Returns:
+            List of File
+        """
+        from logs.models import FileAccessStat
+        from services.access_counter import access_counter
+
+        if rewarm_after is None:
+            rewarm_after = timedelta(hours=float(current_app.config.get('PREHEAT_REWARM_AFTER_HOURS', 72)))
+        if min_score is None:
+            min_score = float(current_app.config.get('PREHEAT_POPULAR_MIN_SCORE', 3))
+
+        now = datetime.utcnow()
+        stale_before = now - rewarm_after
+
+        candidates = [
+            File.activity_date >= (now - timedelta(days=days)).date(),
+            File.uploaded_at >= now - timedelta(days=days)
+        ]
+        if min_score > 0:
+            candidates.append(FileAccessStat.popularity >= access_counter.popularity_threshold(min_score, now))
+
+        query = File.query.outerjoin(
+            PreheatJob, PreheatJob.file_id == File.id
+        ).outerjoin(
+            FileAccessStat, FileAccessStat.file_id == File.id
+        ).filter(
+            File.content_type.like('video/%'),
+            or_(*candidates),
+            or_(
+                PreheatJob.id.is_(None),
+                and_(
+                    PreheatJob.status.notin_([PreheatJob.STATUS_PENDING, PreheatJob.STATUS_RUNNING]),
+                    or_(
+                        PreheatJob.last_preheated_at.is_(None),
+                        PreheatJob.last_preheated_at < stale_before
+                    )
+                )
+            )
+        )
+
+        by_expiry = [PreheatJob.last_preheated_at.asc().nullsfirst(), File.activity_date.desc()]
+        if order == 'popularity':
+            query = query.order_by(FileAccessStat.popularity.desc().nullslast(), *by_expiry)
+        else:
+            query = query.order_by(*by_expiry)
+
+        if limit:
+            query = query.limit(limit)
+
+        return query.all()
+
+    @staticmethod
+    def claim(job_id: Optional[int] = None, worker_id: Optional[str] = None) -> Optional[PreheatJob]:
+        """
+        Atomically claim the next due job
+
+        The claim is a conditional UPDATE, so concurrent workers (threads,
+        processes or hosts) never run the same job twice.
+
+        Args:
+            job_id: Claim this job only
+            worker_id: Lock owner recorded on the job
+
+        Returns:
+            Claimed PreheatJob, or None if nothing is due
+        """
+        worker_id = worker_id or PreheatJobService.worker_id()
+        now = datetime.utcnow()
+        claimable = PreheatJobService._claimable(now)
+
+        query = db.session.query(PreheatJob.id).filter(claimable)
+        if job_id is not None:
+            query = query.filter(PreheatJob.id == job_id)
+        candidates = [row.id for row in query.order_by(PreheatJob.next_run_at, PreheatJob.id).limit(5)]
+
+        for candidate_id in candidates:
+            claimed = db.session.execute(
+                update(PreheatJob)
+                .where(PreheatJob.id == candidate_id, claimable)
+                .values(
+                    status=PreheatJob.STATUS_RUNNING,
+                    locked_by=worker_id,
+                    heartbeat_at=now,
+                    attempts=PreheatJob.attempts + 1,
+                    updated_at=now
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+
+            if claimed == 1:
+                return db.session.get(PreheatJob, candidate_id)
+
+        return None
+
+    @staticmethod
+    def _update_owned(job_id: int, worker_id: str, **values) -> bool:
+        """Update a job only while this worker still holds its lock"""
+        values.setdefault('updated_at', datetime.utcnow())
+        updated = db.session.execute(
+            update(PreheatJob)
+            .where(PreheatJob.id == job_id, PreheatJob.locked_by == worker_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        return updated == 1
+
+    @staticmethod
+    def run_job(job: PreheatJob, concurrency: int = 1, rate_limiter: Optional[TokenBucket] = None,
+                deadline: Optional[float] = None, verbose: bool = False) -> dict:
+        """
+        Run a claimed job, checkpointing progress and recording the outcome
+
+        Args:
+            job: Job returned by claim()
+            concurrency: Number of segments warmed in parallel
+            rate_limiter: Shared token bucket for segment requests
+            deadline: time.monotonic() value after which no new segment is started
+            verbose: Print per-segment failures (CLI usage)
+
+        Returns:
+            Result dictionary from VideoPreheatService.preheat_video plus the job status
+        """
+        job_id = job.id
+        worker_id = job.locked_by
+        attempts = job.attempts
+        max_attempts = int(current_app.config.get('PREHEAT_JOB_MAX_ATTEMPTS', 5))
+        last_checkpoint = time.monotonic()
+
+        def checkpoint(done: int, total: int):
+            nonlocal last_checkpoint
+            if time.monotonic() - last_checkpoint < CHECKPOINT_INTERVAL:
+                return
+            last_checkpoint = time.monotonic()
+            PreheatJobService._update_owned(
+                job_id, worker_id,
+                segments_done=done,
+                segments_total=total,
+                heartbeat_at=datetime.utcnow()
+            )
+
+        video_preheat_service.set_hls_state(job.file_id, File.HLS_WARMING, only_if_not_ready=True)
+
+        result = video_preheat_service.preheat_video(
+            job.s3_key,
+            verbose=verbose,
+            concurrency=concurrency,
+            rate_limiter=rate_limiter,
+            deadline=deadline,
+            start_segment=job.segments_done,
+            on_progress=checkpoint
+        )
+
+        now = datetime.utcnow()
+        segments_total = result['segments_total']
+        segments_done = result['segments_done']
+        values = {
+            'segments_total': segments_total,
+            'locked_by': None,
+            'heartbeat_at': None
+        }
+
+        if result['interrupted']:
+            # 中断不算失败：保留进度；停机中断立即可再次领取，超时中断推迟到下一轮
+            values.update(
+                status=PreheatJob.STATUS_PENDING,
+                attempts=max(attempts - 1, 0),
+                segments_done=segments_done,
+                next_run_at=now if result['interrupted'] == 'shutdown'
+                else now + PreheatJobService._retry_delay(1)
+            )
+        elif result['success']:
+            values.update(
+                status=PreheatJob.STATUS_SUCCEEDED,
+                segments_done=segments_total,
+                last_error=None,
+                finished_at=now,
+                last_preheated_at=now
+            )
+        else:
+            values['last_error'] = result['message']
+            # 所有分片都已尝试但全部失败时，下次从头开始
+            values['segments_done'] = 0 if segments_done >= segments_total else segments_done
+            if attempts >= max_attempts:
+                values.update(status=PreheatJob.STATUS_FAILED, finished_at=now)
+            else:
+                values.update(
+                    status=PreheatJob.STATUS_PENDING,
+                    next_run_at=now + PreheatJobService._retry_delay(attempts)
+                )
+
+        if not PreheatJobService._update_owned(job_id, worker_id, **values):
+            current_app.logger.warning(f'[Preheat] Lost lock on job {job_id} ({job.s3_key}), result discarded')
+        elif values.get('status') == PreheatJob.STATUS_SUCCEEDED:
+            video_preheat_service.set_hls_state(job.file_id, File.HLS_READY)
+        elif values.get('status') == PreheatJob.STATUS_FAILED:
+            video_preheat_service.set_hls_state(job.file_id, File.HLS_FAILED, only_if_not_ready=True)
+
+        result['status'] = values.get('status', PreheatJob.STATUS_RUNNING)
+        return result
+
+    @staticmethod
+    def run_worker(max_jobs: int = 0, max_duration: float = 0, video_timeout: float = 0,
+                   concurrency: int = 1, rate: float = 0, delay: float = 0, verbose: bool = False,
+                   on_result: Optional[Callable[[PreheatJob, dict], None]] = None) -> Dict:
+        """
+        Claim and run due jobs until the queue is empty or a limit is reached
+
+        Args:
+            max_jobs: Stop after this many jobs (0 = unlimited)
+            max_duration: Overall time limit in seconds (0 = unlimited)
+            video_timeout: Per-video time limit in seconds (0 = unlimited)
+            concurrency: Number of segments warmed in parallel per video
+            rate: Global segment requests per second (0 = unlimited)
+            delay: Pause between videos in seconds
+            verbose: Print per-segment failures
+            on_result: Called with (job, result) after each job
+
+        Returns:
+            Summary dictionary
+        """
+        rate_limiter = TokenBucket(rate, burst=max(concurrency, 1)) if rate > 0 else None
+        started = time.monotonic()
+        overall_deadline = started + max_duration if max_duration > 0 else None
+        worker_id = PreheatJobService.worker_id()
+
+        summary = {
+            'success': 0,
+            'failed': 0,
+            'interrupted': 0,
+            'segments_total': 0,
+            'segments_ok': 0,
+            'elapsed': 0.0
+        }
+
+        while not max_jobs or sum(summary[k] for k in ('success', 'failed', 'interrupted')) < max_jobs:
+            if overall_deadline is not None and time.monotonic() >= overall_deadline:
+                break
+
+            # 温和地等待，避免请求过快（视频之间的间隔）
+            if delay > 0 and any(summary[k] for k in ('success', 'failed', 'interrupted')):
+                time.sleep(delay)
+
+            job = PreheatJobService.claim(worker_id=worker_id)
+            if job is None:
+                break
+
+            deadlines = [d for d in (
+                overall_deadline,
+                time.monotonic() + video_timeout if video_timeout > 0 else None
+            ) if d is not None]
+
+            result = PreheatJobService.run_job(
+                job,
+                concurrency=concurrency,
+                rate_limiter=rate_limiter,
+                deadline=min(deadlines) if deadlines else None,
+                verbose=verbose
+            )
+
+            summary['segments_total'] += result.get('segments_total', 0)
+            summary['segments_ok'] += result.get('segments_ok', 0)
+            if result['interrupted']:
+                summary['interrupted'] += 1
+            elif result['success']:
+                summary['success'] += 1
+            else:
+                summary['failed'] += 1
+
+            if on_result is not None:
+                on_result(job, result)
+
+        summary['elapsed'] = time.monotonic() - started
+        return summary
+
+    @staticmethod
+    def _run_in_process(job_id: int) -> None:
+        """Executor task: claim and run one freshly queued job"""
+        job = PreheatJobService.claim(job_id=job_id)
+        if job is None:
+            return
+
+        current_app.logger.info(f'[Preheat] Triggering transcode for: {job.s3_key}')
+        result = PreheatJobService.run_job(job)
+
+        if result['success']:
+            current_app.logger.info(f'[Preheat] {job.s3_key}: {result["message"]}')
+        else:
+            current_app.logger.warning(f'[Preheat] {job.s3_key}: {result["message"]} ({result["status"]})')
+
+    @staticmethod
+    def trigger(file_id: int, s3_key: str) -> bool:
+        """
+        Queue a preheat job for an uploaded video and start it in the background
+
+        If the in-process executor is full the job stays pending in the
+        database and is picked up by ``flask preheat-worker``.
+
+        Args:
+            file_id: File ID of the video
+            s3_key: S3 object key of the video
+
+        Returns:
+            True if the job was handed to the in-process executor
+        """
+        job = PreheatJobService.enqueue(file_id, s3_key)
+        video_preheat_service.set_hls_state(file_id, File.HLS_WARMING, only_if_not_ready=True)
+        return preheat_executor.submit(job.id, PreheatJobService._run_in_process, job.id)
+
+    @staticmethod
+    def trigger_many(videos: Iterable) -> int:
+        """
+        Queue preheat jobs for several uploaded videos and start them in the background
+
+        Args:
+            videos: Iterable of (file_id, s3_key) pairs
+
+        Returns:
+            Number of jobs handed to the in-process executor
+        """
+        videos = dict(videos)
+        if not videos:
+            return 0
+
+        PreheatJobService.enqueue_many(videos.items())
+
+        submitted = 0
+        jobs = PreheatJob.query.filter(PreheatJob.file_id.in_(list(videos.keys()))).all()
+        for job in jobs:
+            video_preheat_service.set_hls_state(job.file_id, File.HLS_WARMING, only_if_not_ready=True)
+            if preheat_executor.submit(job.id, PreheatJobService._run_in_process, job.id):
+                submitted += 1
+        return submitted
+
+    @staticmethod
+    def queue_stats() -> Dict:
+        """
+        Queue state summary
+
+        Returns:
+            Dictionary with counts by status, due/stale counts and oldest due age
+        """
+        now = datetime.utcnow()
+        lease = int(current_app.config.get('PREHEAT_JOB_LEASE_SECONDS', 900))
+
+        by_status = dict(
+            db.session.query(PreheatJob.status, func.count(PreheatJob.id))
+            .group_by(PreheatJob.status)
+            .all()
+        )
+
+        due_query = PreheatJob.query.filter(
+            PreheatJob.status == PreheatJob.STATUS_PENDING,
+            PreheatJob.next_run_at <= now
+        )
+        oldest_due = due_query.with_entities(func.min(PreheatJob.next_run_at)).scalar()
+
+        stale = PreheatJob.query.filter(
+            PreheatJob.status == PreheatJob.STATUS_RUNNING,
+            PreheatJob.heartbeat_at < now - timedelta(seconds=lease)
+        ).count()
+
+        return {
+            'by_status': {
+                status: by_status.get(status, 0)
+                for status in (
+                    PreheatJob.STATUS_PENDING,
+                    PreheatJob.STATUS_RUNNING,
+                    PreheatJob.STATUS_SUCCEEDED,
+                    PreheatJob.STATUS_FAILED
+                )
+            },
+            'due': due_query.count(),
+            'stale_running': stale,
+            'oldest_due_seconds': round((now - oldest_due).total_seconds(), 1) if oldest_due else 0.0
+        }
+
+
+# Global preheat job service instance
+preheat_job_service = PreheatJobService()
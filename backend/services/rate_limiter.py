@@ -0,0 +1,61 @@
+"""
+Rate Limiter for LockCloud
+Thread-safe token bucket used to cap outbound request rates (e.g. Bitiful transcode preheat)
+"""
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Token bucket shared by all threads of a process
+
+    Tokens refill continuously at ``rate`` per second up to ``burst``; every
+    request takes one token and waits when the bucket is empty.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        """
+        Args:
+            rate: Tokens added per second (<= 0 disables limiting)
+            burst: Bucket capacity, defaults to max(1, rate)
+        """
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1, int(rate)))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """
+        Take one token, waiting until one is available
+
+        Args:
+            deadline: time.monotonic() value after which to give up
+
+        Returns:
+            True if a token was taken, False if the deadline passed first
+        """
+        if self.rate <= 0:
+            return True
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
@@ -7,7 +7,7 @@ import boto3
 from botocore.exceptions import ClientError
 from botocore.client import Config as BotoConfig
 from flask import current_app
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 
 
 class S3Service:
@@ -45,7 +45,8 @@ class S3Service:
             region_name=region_name,
             config=BotoConfig(
                 signature_version='s3v4',
-                s3={'addressing_style': 'virtual'}
+                s3={'addressing_style': 'virtual'},
+                max_pool_connections=int(current_app.config.get('S3_MAX_POOL_CONNECTIONS', 32))
             )
         )
         
@@ -166,6 +167,206 @@ class S3Service:
             current_app.logger.error(f'Failed to generate presigned upload URL with tags: {str(e)}')
             raise
     
+    def create_multipart_upload(self, key: str, content_type: Optional[str] = None) -> str:
+        """
+        Start a multipart upload
+        
+        Args:
+            key: S3 object key (file path in bucket)
+            content_type: MIME type of the file
+        
+        Returns:
+            S3 UploadId
+        
+        Raises:
+            ClientError: If the upload cannot be created
+        """
+        bucket = self.get_bucket_name()
+        
+        params = {
+            'Bucket': bucket,
+            'Key': key
+        }
+        if content_type:
+            params['ContentType'] = content_type
+        
+        try:
+            response = self.client.create_multipart_upload(**params)
+            current_app.logger.info(f'Created multipart upload for key: {key}')
+            return response['UploadId']
+            
+        except ClientError as e:
+            current_app.logger.error(f'Failed to create multipart upload for {key}: {str(e)}')
+            raise
+    
+    def generate_presigned_part_urls(
+        self,
+        key: str,
+        upload_id: str,
+        part_numbers: List[int],
+        expiration: int = 3600
+    ) -> Dict[int, str]:
+        """
+        Generate presigned PUT URLs for parts of a multipart upload
+        
+        Signing is local (no request to S3), so many parts can be signed at
+        once and uploaded in parallel by the client.
+        
+        Args:
+            key: S3 object key
+            upload_id: S3 UploadId
+            part_numbers: Part numbers (1-10000)
+            expiration: URL expiration time in seconds
+        
+        Returns:
+            Dictionary {part_number: presigned_url}
+        """
+        bucket = self.get_bucket_name()
+        
+        try:
+            return {
+                part_number: self.client.generate_presigned_url(
+                    ClientMethod='upload_part',
+                    Params={
+                        'Bucket': bucket,
+                        'Key': key,
+                        'UploadId': upload_id,
+                        'PartNumber': part_number
+                    },
+                    ExpiresIn=expiration,
+                    HttpMethod='PUT'
+                )
+                for part_number in part_numbers
+            }
+        except ClientError as e:
+            current_app.logger.error(f'Failed to generate part upload URLs for {key}: {str(e)}')
+            raise
+    
+    def list_uploaded_parts(self, key: str, upload_id: str) -> List[Dict]:
+        """
+        List the parts already uploaded to a multipart upload
+        
+        Args:
+            key: S3 object key
+            upload_id: S3 UploadId
+        
+        Returns:
+            List of {'part_number', 'etag', 'size'} sorted by part number
+        
+        Raises:
+            FileNotFoundError: If the multipart upload no longer exists
+            ClientError: If listing fails
+        """
+        bucket = self.get_bucket_name()
+        parts = []
+        
+        try:
+            paginator = self.client.get_paginator('list_parts')
+            for page in paginator.paginate(Bucket=bucket, Key=key, UploadId=upload_id):
+                for part in page.get('Parts', []):
+                    parts.append({
+                        'part_number': part['PartNumber'],
+                        'etag': part['ETag'],
+                        'size': part['Size']
+                    })
+            return parts
+            
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'NoSuchUpload':
+                raise FileNotFoundError(f'分片上传不存在: {upload_id}')
+            current_app.logger.error(f'Failed to list parts for {key}: {str(e)}')
+            raise
+    
+    def complete_multipart_upload(self, key: str, upload_id: str, parts: List[Dict]) -> None:
+        """
+        Assemble uploaded parts into the final object
+        
+        Args:
+            key: S3 object key
+            upload_id: S3 UploadId
+            parts: List of {'part_number', 'etag'} for every part
+        
+        Raises:
+            FileNotFoundError: If the multipart upload no longer exists
+            ClientError: If completion fails (e.g. missing or too small parts)
+        """
+        bucket = self.get_bucket_name()
+        
+        try:
+            self.client.complete_multipart_upload(
+                Bucket=bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={
+                    'Parts': [
+                        {'PartNumber': part['part_number'], 'ETag': part['etag']}
+                        for part in sorted(parts, key=lambda p: p['part_number'])
+                    ]
+                }
+            )
+            current_app.logger.info(f'Completed multipart upload for key: {key} ({len(parts)} parts)')
+            
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'NoSuchUpload':
+                raise FileNotFoundError(f'分片上传不存在: {upload_id}')
+            current_app.logger.error(f'Failed to complete multipart upload for {key}: {str(e)}')
+            raise
+    
+    def abort_multipart_upload(self, key: str, upload_id: str) -> bool:
+        """
+        Abort a multipart upload and free its stored parts
+        
+        Args:
+            key: S3 object key
+            upload_id: S3 UploadId
+        
+        Returns:
+            True if aborted, False if the upload no longer existed
+        
+        Raises:
+            ClientError: If the abort fails
+        """
+        bucket = self.get_bucket_name()
+        
+        try:
+            self.client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+            current_app.logger.info(f'Aborted multipart upload for key: {key}')
+            return True
+            
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'NoSuchUpload':
+                return False
+            current_app.logger.error(f'Failed to abort multipart upload for {key}: {str(e)}')
+            raise
+    
+    def list_multipart_uploads(self, prefix: str = '') -> List[Dict]:
+        """
+        List in-progress multipart uploads in the bucket
+        
+        Args:
+            prefix: Only uploads whose key starts with this prefix
+        
+        Returns:
+            List of {'key', 'upload_id', 'initiated'}
+        """
+        bucket = self.get_bucket_name()
+        uploads = []
+        
+        try:
+            paginator = self.client.get_paginator('list_multipart_uploads')
+            for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+                for upload in page.get('Uploads', []):
+                    uploads.append({
+                        'key': upload['Key'],
+                        'upload_id': upload['UploadId'],
+                        'initiated': upload['Initiated']
+                    })
+            return uploads
+            
+        except ClientError as e:
+            current_app.logger.error(f'Failed to list multipart uploads: {str(e)}')
+            raise
+    
     def get_object_tags(self, key: str) -> Dict[str, str]:
         """
         Get tags for a specific S3 object
@@ -335,6 +536,45 @@ class S3Service:
             current_app.logger.error(f'Failed to delete file {key}: {str(e)}')
             raise
     
+    def delete_files(self, keys: List[str]) -> Dict[str, str]:
+        """
+        Delete many files from S3 with multi-object delete
+        
+        Keys are sent in chunks of 1000 (the DeleteObjects limit); a chunk
+        whose request fails marks all of its keys as failed.
+        
+        Args:
+            keys: S3 object keys
+        
+        Returns:
+            Dictionary {key: error message} for keys that were not deleted
+            (empty if every key was deleted)
+        """
+        bucket = self.get_bucket_name()
+        keys = list(dict.fromkeys(keys))
+        errors = {}
+        
+        for start in range(0, len(keys), 1000):
+            chunk = keys[start:start + 1000]
+            try:
+                response = self.client.delete_objects(
+                    Bucket=bucket,
+                    Delete={
+                        'Objects': [{'Key': key} for key in chunk],
+                        'Quiet': True
+                    }
+                )
+            except ClientError as e:
+                current_app.logger.error(f'Failed to delete {len(chunk)} files: {str(e)}')
+                errors.update({key: str(e) for key in chunk})
+                continue
+            
+            for error in response.get('Errors', []):
+                errors[error['Key']] = f"{error.get('Code')}: {error.get('Message')}"
+        
+        current_app.logger.info(f'Deleted {len(keys) - len(errors)} files, {len(errors)} failed')
+        return errors
+    
     def list_files(
         self,
         prefix: str = '',
@@ -431,6 +671,43 @@ class S3Service:
                 current_app.logger.error(f'Failed to get metadata for {key}: {str(e)}')
                 raise
     
+    def get_object_range(self, key: str, start: int, end: int) -> Tuple[bytes, int]:
+        """
+        Read a byte range of an object
+        
+        Args:
+            key: S3 object key (file path in bucket)
+            start: First byte offset
+            end: Last byte offset (inclusive)
+        
+        Returns:
+            (data, total object size)
+        
+        Raises:
+            FileNotFoundError: If the object does not exist
+            ClientError: If the read fails
+        """
+        bucket = self.get_bucket_name()
+        
+        try:
+            response = self.client.get_object(
+                Bucket=bucket,
+                Key=key,
+                Range=f'bytes={start}-{end}'
+            )
+            data = response['Body'].read()
+            
+            # Content-Range: bytes 0-8388607/123456789
+            content_range = response.get('ContentRange')
+            total = int(content_range.rsplit('/', 1)[1]) if content_range else len(data)
+            return data, total
+            
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+                raise FileNotFoundError(f'文件不存在: {key}')
+            current_app.logger.error(f'Failed to read {key} bytes {start}-{end}: {str(e)}')
+            raise
+    
     def generate_signed_url(
         self,
         key: str,
@@ -0,0 +1,164 @@
+"""
+Tag Index for LockCloud
+Per-process autocomplete index over tag names and usage counts, so tag
+suggestions on every keystroke are answered from memory.
+
+Tags are kept in a list sorted by lowercase name: prefix lookups bisect to
+the first match and walk forward, substring lookups scan the names. The
+index is refreshed in the background, at most every TAG_INDEX_REFRESH_SECONDS,
+and only when the shared 'tags' cache version has moved; the refresh reloads
+only the tags stamped with a newer version, with their maintained
+``usage_count``. Only the first lookup in a process reads the database.
+"""
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from flask import current_app
+from extensions import db
+from services.background_executor import BackgroundExecutor
+from services.cache_version_service import cache_version_service
+
+
+# Name of the shared cache version bumped by every tag change
+TAG_CACHE = 'tags'
+
+# Single background thread per process that reloads changed tags
+refresh_executor = BackgroundExecutor('tag-index', max_workers=1, max_queue=1)
+
+
+class _Snapshot(NamedTuple):
+    """Immutable index state; lookups read one snapshot without locking"""
+    version: int
+    tags: Dict[int, Tuple[str, int]]  # id -> (name, count)
+    keys: List[Tuple[str, int]]  # (lowercase name, id), sorted
+
+
+class TagIndex:
+    """In-memory tag name index (per worker process)"""
+
+    def __init__(self):
+        self._snapshot: Optional[_Snapshot] = None
+        self._refresh_lock = threading.Lock()
+        self._checked_at = 0.0
+
+    def _current(self) -> _Snapshot:
+        """Snapshot for a lookup, scheduling a background refresh when due"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            # 进程内第一次查询：同步加载
+            self.refresh()
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+        interval = float(current_app.config.get('TAG_INDEX_REFRESH_SECONDS', 5))
+        if time.monotonic() - self._checked_at >= interval:
+            self._checked_at = time.monotonic()
+            refresh_executor.submit('refresh', self.refresh)
+        return snapshot
+
+    def invalidate(self) -> None:
+        """Check for changes on the next lookup (after a tag change in this process)"""
+        self._checked_at = 0.0
+
+    def refresh(self) -> bool:
+        """
+        Load tags changed since the loaded version
+
+        Runs inside an application context (refresh executor or first lookup).
+
+        Returns:
+            True if the index changed
+        """
+        from files.models import Tag
+
+        with self._refresh_lock:
+            snapshot = self._snapshot
+            version = cache_version_service.current(TAG_CACHE)
+            if snapshot is not None and version == snapshot.version:
+                return False
+
+            since = snapshot.version if snapshot is not None else -1
+            rows = db.session.query(
+                Tag.id,
+                Tag.name,
+                Tag.usage_count
+            ).filter(
+                Tag.version > since
+            ).all()
+
+            if snapshot is None:
+                tags = {tag_id: (name, count) for tag_id, name, count in rows}
+                keys = sorted((name.lower(), tag_id) for tag_id, (name, _) in tags.items())
+            else:
+                tags = dict(snapshot.tags)
+                keys = list(snapshot.keys)
+                for tag_id, name, count in rows:
+                    previous = tags.get(tag_id)
+                    if previous is None or previous[0] != name:
+                        if previous is not None:
+                            keys.remove((previous[0].lower(), tag_id))
+                        insort(keys, (name.lower(), tag_id))
+                    tags[tag_id] = (name, count)
+
+            self._snapshot = _Snapshot(version=version, tags=tags, keys=keys)
+
+        current_app.logger.debug(f'[TagIndex] Loaded {len(rows)} changed tags, version {version}')
+        return True
+
+    def search(self, query: str, limit: int = 10, mode: str = 'prefix',
+               case_sensitive: bool = False) -> List[Tuple[int, str, int]]:
+        """
+        Tags whose name starts with (or contains) ``query``, most used first
+
+        Args:
+            query: Search text
+            limit: Maximum number of results
+            mode: 'prefix' or 'substring'
+            case_sensitive: Match case exactly (default: ignore case)
+
+        Returns:
+            List of (id, name, count) ordered by count descending, then name
+        """
+        snapshot = self._current()
+        needle = query.lower()
+        keys = snapshot.keys
+
+        if mode == 'substring':
+            ids = [tag_id for key, tag_id in keys if needle in key]
+        else:
+            ids = []
+            for position in range(bisect_left(keys, (needle,)), len(keys)):
+                key, tag_id = keys[position]
+                if not key.startswith(needle):
+                    break
+                ids.append(tag_id)
+
+        matches = [(tag_id, *snapshot.tags[tag_id]) for tag_id in ids]
+        if case_sensitive:
+            matches = [
+                match for match in matches
+                if (query in match[1] if mode == 'substring' else match[1].startswith(query))
+            ]
+
+        return heapq.nsmallest(limit, matches, key=lambda match: (-match[2], match[1]))
+
+    def stats(self) -> Dict:
+        """
+        Index metrics for this process
+
+        Returns:
+            Dictionary with loaded version and tag count
+        """
+        snapshot = self._snapshot
+        return {
+            'loaded': snapshot is not None,
+            'version': snapshot.version if snapshot else None,
+            'tags': len(snapshot.tags) if snapshot else 0
+        }
+
+
+# Global tag index instance
+tag_index = TagIndex()
@@ -1,11 +1,93 @@
 """
 Tag Preset Service for LockCloud
 Handles management of predefined tag options for file categorization
+
+Request handlers resolve preset values and display names through a
+per-process ``{category: {value: display_name}}`` map of active presets.
+Every preset change bumps the shared 'tag_presets' cache version; each
+process compares it with the version it loaded at most every
+TAG_PRESET_CACHE_SECONDS and reloads the map when it has moved.
 """
-from typing import List, Optional
+import threading
+import time
+from types import MappingProxyType
+from typing import List, Mapping, NamedTuple, Optional
 from flask import current_app
 from extensions import db
 from files.models import TagPreset
+from services.cache_version_service import cache_version_service
+
+
+# Name of the shared cache version bumped by every preset change
+PRESET_CACHE = 'tag_presets'
+
+_EMPTY = MappingProxyType({})
+
+
+class _PresetSnapshot(NamedTuple):
+    """Loaded presets; replaced as a whole so readers never lock"""
+    version: int
+    display_names: Mapping[str, Mapping[str, str]]  # category -> {value: display_name}
+
+
+class _PresetCache:
+    """In-memory map of active presets (per worker process)"""
+    
+    def __init__(self):
+        self._snapshot: Optional[_PresetSnapshot] = None
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+    
+    def get(self) -> Mapping[str, Mapping[str, str]]:
+        """Current map, reloaded first if the shared version has moved"""
+        snapshot = self._snapshot
+        interval = float(current_app.config.get('TAG_PRESET_CACHE_SECONDS', 10))
+        if snapshot is not None and time.monotonic() - self._checked_at < interval:
+            return snapshot.display_names
+        
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or time.monotonic() - self._checked_at >= interval:
+                # 先读版本再加载：加载期间的修改会在下次检查时重新加载
+                version = cache_version_service.current(PRESET_CACHE)
+                if snapshot is None or snapshot.version != version:
+                    snapshot = self._load(version)
+                    self._snapshot = snapshot
+                self._checked_at = time.monotonic()
+        return snapshot.display_names
+    
+    @staticmethod
+    def _load(version: int) -> _PresetSnapshot:
+        """Read all active presets, ordered by display name within each category"""
+        rows = db.session.query(
+            TagPreset.category,
+            TagPreset.value,
+            TagPreset.display_name
+        ).filter_by(
+            is_active=True
+        ).order_by(
+            TagPreset.category,
+            TagPreset.display_name
+        ).all()
+        
+        display_names = {}
+        for category, value, display_name in rows:
+            display_names.setdefault(category, {})[value] = display_name
+        
+        current_app.logger.debug(f'[TagPreset] Loaded {len(rows)} active presets, version {version}')
+        return _PresetSnapshot(
+            version=version,
+            display_names=MappingProxyType({
+                category: MappingProxyType(values) for category, values in display_names.items()
+            })
+        )
+    
+    def invalidate(self) -> None:
+        """Check the version on the next lookup (after a change in this process)"""
+        self._checked_at = 0.0
+
+
+_preset_cache = _PresetCache()
 
 
 class TagPresetService:
@@ -24,6 +106,13 @@ class TagPresetService:
         {'value': 'none', 'display_name': '无'}
     ]
     
+    @staticmethod
+    def _commit_change() -> None:
+        """Commit a preset change, then publish it with a new 'tag_presets' cache version"""
+        db.session.commit()
+        cache_version_service.bump(PRESET_CACHE)
+        _preset_cache.invalidate()
+    
     @staticmethod
     def initialize_default_presets(admin_user_id: int) -> None:
         """
@@ -72,7 +161,7 @@ class TagPresetService:
                     f'Initialized default instructor: {preset_data["value"]}'
                 )
         
-        db.session.commit()
+        TagPresetService._commit_change()
         current_app.logger.info('Default tag presets initialized successfully')
     
     @staticmethod
@@ -103,6 +192,37 @@ class TagPresetService:
         
         return presets
     
+    @staticmethod
+    def get_display_names(category: str) -> Mapping[str, str]:
+        """
+        Active presets of a category as a read-only {value: display_name} map
+        
+        Served from the per-process cache, without a database query in the
+        common case. Iteration follows display name order, like
+        get_active_presets.
+        
+        Args:
+            category: Category name ('activity_type' or 'instructor')
+        
+        Returns:
+            Read-only mapping (empty for unknown categories)
+        """
+        return _preset_cache.get().get(category, _EMPTY)
+    
+    @staticmethod
+    def get_display_name(category: str, value: Optional[str]) -> Optional[str]:
+        """
+        Display name of a preset value, or the value itself if it is not an active preset
+        
+        Args:
+            category: Category name ('activity_type' or 'instructor')
+            value: Stored tag value
+        
+        Returns:
+            Display name, or ``value`` unchanged
+        """
+        return TagPresetService.get_display_names(category).get(value, value)
+    
     @staticmethod
     def add_preset(
         category: str,
@@ -144,7 +264,7 @@ class TagPresetService:
             if not existing.is_active:
                 # Reactivate deactivated preset
                 existing.is_active = True
-                db.session.commit()
+                TagPresetService._commit_change()
                 
                 current_app.logger.info(
                     f'Reactivated tag preset: {category}:{value}'
@@ -164,7 +284,7 @@ class TagPresetService:
         )
         
         db.session.add(preset)
-        db.session.commit()
+        TagPresetService._commit_change()
         
         current_app.logger.info(
             f'Created new tag preset: {category}:{value} (display: {display_name})'
@@ -204,7 +324,7 @@ class TagPresetService:
             return preset
         
         preset.is_active = False
-        db.session.commit()
+        TagPresetService._commit_change()
         
         current_app.logger.info(
             f'Deactivated tag preset: {preset.category}:{preset.value} (id: {preset_id})'
@@ -2,11 +2,15 @@
 Tag Service for LockCloud
 Handles management of free tags for file categorization
 """
-from typing import List, Optional, NamedTuple
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, NamedTuple
 from flask import current_app
-from sqlalchemy import func
+from sqlalchemy import delete, exists, func, insert, literal, select, true, update
 from extensions import db
 from files.models import Tag, FileTag, File
+from services.cache_version_service import cache_version_service
+from services.tag_index import TAG_CACHE, tag_index
 
 
 class TagWithCount(NamedTuple):
@@ -16,11 +20,136 @@ class TagWithCount(NamedTuple):
     count: int
 
 
+class TagChanges(NamedTuple):
+    """Associations changed by set_file_tags"""
+    added: int
+    removed: int
+
+
 class TagService:
-    """Service class for managing free tag operations"""
+    """
+    Service class for managing free tag operations
+    
+    Methods that write take ``commit`` (default True). Callers that combine
+    several tag operations with other changes pass ``commit=False`` (the
+    changes are written to the open transaction) and commit once themselves.
+    
+    Every change to a tag or to the files it is attached to goes through
+    _tags_changed, which adjusts ``Tag.usage_count`` by the exact number of
+    associations added or removed and, once the transaction commits, stamps
+    the tag with a new 'tags' cache version, which is how the per-process
+    autocomplete index finds what to reload. verify_usage_counts checks the
+    counts against ``file_tags``.
+    """
+    
+    @staticmethod
+    def _finish(commit: bool) -> None:
+        """Commit, or only flush when the caller owns the transaction"""
+        if commit:
+            db.session.commit()
+        else:
+            db.session.flush()
+    
+    @staticmethod
+    def _stamp_after_commit(tag_ids: Iterable[int]) -> None:
+        """
+        Stamp tags with a new 'tags' cache version once the transaction commits
+        
+        The bump and the stamps are written in their own short transaction
+        (see services/cache_version_service.py), so the shared counter is not
+        locked while the caller's transaction is open.
+        """
+        tags = Tag.__table__
+        tag_ids = list(tag_ids)
+        
+        def stamp(conn, version):
+            conn.execute(tags.update().where(tags.c.id.in_(tag_ids)).values(version=version))
+        
+        cache_version_service.bump_after_commit(TAG_CACHE, stamp, tag_index.invalidate)
+    
+    @staticmethod
+    def _tags_changed(deltas: Mapping[int, int]) -> None:
+        """
+        Apply usage count changes and stamp the tags with a new cache version
+        
+        Counts are adjusted relatively (usage_count + delta), one UPDATE per
+        distinct delta, in the caller's transaction; the version stamp is
+        written after the commit.
+        
+        Args:
+            deltas: {tag_id: associations added (positive) or removed (negative)};
+                0 only stamps the tag (e.g. new or renamed tags)
+        """
+        if not deltas:
+            return
+        
+        tag_ids_by_delta = defaultdict(list)
+        for tag_id, delta in deltas.items():
+            if delta:
+                tag_ids_by_delta[delta].append(tag_id)
+        
+        for delta, tag_ids in tag_ids_by_delta.items():
+            db.session.execute(
+                update(Tag).where(Tag.id.in_(tag_ids)).values(
+                    usage_count=Tag.usage_count + delta
+                ).execution_options(synchronize_session=False)
+            )
+        TagService._stamp_after_commit(deltas)
+    
+    @staticmethod
+    def _delete_file_tags(*criteria) -> Counter:
+        """
+        Delete the associations matching ``criteria``
+        
+        Uses DELETE ... RETURNING where the database supports it, so the
+        counts are exactly the rows this statement removed.
+        
+        Returns:
+            Counter {tag_id: associations removed}
+        """
+        if db.session.get_bind().dialect.delete_returning:
+            return Counter(db.session.scalars(
+                delete(FileTag).where(*criteria).returning(FileTag.tag_id)
+                .execution_options(synchronize_session=False)
+            ))
+        
+        removed = Counter()
+        tag_ids = [row.tag_id for row in db.session.query(FileTag.tag_id).filter(*criteria).distinct()]
+        for tag_id in tag_ids:
+            removed[tag_id] = FileTag.query.filter(
+                *criteria, FileTag.tag_id == tag_id
+            ).delete(synchronize_session=False)
+        return +removed
+    
+    @staticmethod
+    def detach_files(file_ids: Iterable[int]) -> int:
+        """
+        Remove all tag associations of files that are about to be deleted
+        (the caller deletes the files and commits)
+        
+        Deleting the associations explicitly instead of by cascade keeps
+        the usage counts of their tags exact.
+        
+        Returns:
+            Number of associations removed
+        """
+        file_ids = set(file_ids)
+        if not file_ids:
+            return 0
+        removed = TagService._delete_file_tags(FileTag.file_id.in_(file_ids))
+        TagService._tags_changed({tag_id: -count for tag_id, count in removed.items()})
+        TagService._expire_file_tags(file_ids)
+        return sum(removed.values())
     
     @staticmethod
-    def get_or_create_tag(name: str, user_id: int) -> Tag:
+    def _clean_names(names: Iterable[str]) -> List[str]:
+        """Trimmed, non-empty, deduplicated tag names in their original order"""
+        return list(dict.fromkeys(
+            name.strip() for name in names if isinstance(name, str) and name.strip()
+        ))
+    
+    @staticmethod
+    def get_or_create_tag(name: str, user_id: int, commit: bool = True) -> Tag:
         """
         Get an existing tag by name or create a new one.
         Whitespace is trimmed from the tag name.
@@ -28,6 +157,7 @@ class TagService:
         Args:
             name: Tag name (will be trimmed)
             user_id: User ID of the creator (used only if creating new tag)
+            commit: Commit the new tag (False = flush only)
         
         Returns:
             Tag object
@@ -57,14 +187,54 @@ class TagService:
             created_by=user_id
         )
         db.session.add(new_tag)
-        db.session.commit()
+        db.session.flush()
+        TagService._tags_changed({new_tag.id: 0})
+        TagService._finish(commit)
         
         current_app.logger.info(f'Created new tag: {trimmed_name} by user {user_id}')
         return new_tag
+    
+    @staticmethod
+    def get_or_create_tags(names: Iterable[str], user_id: int, commit: bool = True) -> Dict[str, Tag]:
+        """
+        Resolve many tag names at once, creating the missing ones
+        
+        Existing tags are loaded with one query and missing tags are
+        inserted with one INSERT ... RETURNING. Other pending changes in the
+        session are not flushed.
+        
+        Args:
+            names: Tag names (trimmed; empty names are ignored)
+            user_id: User ID of the creator of new tags
+            commit: Commit new tags (False = flush only)
+        
+        Returns:
+            Dictionary {trimmed name: Tag}
+        """
+        names = TagService._clean_names(names)
+        if not names:
+            return {}
+        
+        with db.session.no_autoflush:
+            tags = {tag.name: tag for tag in Tag.query.filter(Tag.name.in_(names)).all()}
+            
+            missing = [
+                {'name': name, 'created_by': user_id, 'created_at': datetime.utcnow()}
+                for name in names if name not in tags
+            ]
+            if missing:
+                created = db.session.scalars(insert(Tag).returning(Tag), missing).all()
+                tags.update({tag.name: tag for tag in created})
+                TagService._tags_changed({tag.id: 0 for tag in created})
+                current_app.logger.info(f'Created {len(created)} new tags by user {user_id}')
+        
+        if commit:
+            db.session.commit()
+        return tags
 
     
     @staticmethod
-    def add_tag_to_file(file_id: int, tag_name: str, user_id: int) -> FileTag:
+    def add_tag_to_file(file_id: int, tag_name: str, user_id: int, commit: bool = True) -> FileTag:
         """
         Add a tag to a file. Creates the tag if it doesn't exist.
         
@@ -72,6 +242,7 @@ class TagService:
             file_id: ID of the file to tag
             tag_name: Name of the tag to add
             user_id: User ID performing the operation
+            commit: Commit the change (False = flush only)
         
         Returns:
             FileTag junction record
@@ -91,7 +262,7 @@ class TagService:
             raise LookupError(f'File not found: {file_id}')
         
         # Get or create the tag
-        tag = TagService.get_or_create_tag(tag_name, user_id)
+        tag = TagService.get_or_create_tag(tag_name, user_id, commit=False)
         
         # Check if association already exists
         existing = FileTag.query.filter_by(
@@ -111,7 +282,8 @@ class TagService:
             tag_id=tag.id
         )
         db.session.add(file_tag)
-        db.session.commit()
+        TagService._tags_changed({tag.id: 1})
+        TagService._finish(commit)
         
         current_app.logger.info(
             f'Added tag {tag.name} to file {file_id}'
@@ -119,7 +291,7 @@ class TagService:
         return file_tag
     
     @staticmethod
-    def remove_tag_from_file(file_id: int, tag_id: int) -> bool:
+    def remove_tag_from_file(file_id: int, tag_id: int, commit: bool = True) -> bool:
         """
         Remove a tag from a file.
         The tag itself is retained for future use (Requirements 7.3).
@@ -127,6 +299,7 @@ class TagService:
         Args:
             file_id: ID of the file
             tag_id: ID of the tag to remove
+            commit: Commit the change (False = flush only)
         
         Returns:
             True if tag was removed, False if association didn't exist
@@ -139,20 +312,21 @@ class TagService:
         if not tag_id:
             raise ValueError('tag_id cannot be None')
         
-        # Find the association
-        file_tag = FileTag.query.filter_by(
+        # Delete the association (the row count tells whether it existed)
+        removed = FileTag.query.filter_by(
             file_id=file_id,
             tag_id=tag_id
-        ).first()
+        ).delete(synchronize_session=False)
         
-        if not file_tag:
+        if not removed:
             current_app.logger.debug(
                 f'Tag {tag_id} not found on file {file_id}'
             )
             return False
         
-        db.session.delete(file_tag)
-        db.session.commit()
+        TagService._tags_changed({tag_id: -removed})
+        TagService._expire_file_tags([file_id])
+        TagService._finish(commit)
         
         current_app.logger.info(
             f'Removed tag {tag_id} from file {file_id}'
@@ -185,43 +359,34 @@ class TagService:
 
     
     @staticmethod
-    def search_tags(prefix: str, limit: int = 10) -> List[TagWithCount]:
+    def search_tags(prefix: str, limit: int = 10, mode: str = 'prefix',
+                    case_sensitive: bool = False) -> List[TagWithCount]:
         """
-        Search tags by prefix with usage count, ordered by usage frequency.
+        Search tags by prefix (or substring) with usage count, ordered by usage frequency.
+        
+        Answered from the per-process tag index without a database query
+        (see services/tag_index.py).
         
         Args:
-            prefix: Search prefix (case-insensitive)
+            prefix: Search text
             limit: Maximum number of results to return
+            mode: 'prefix' (default) or 'substring'
+            case_sensitive: Match case exactly (default: case-insensitive)
         
         Returns:
             List of TagWithCount objects ordered by count descending
         
         Raises:
-            ValueError: If prefix is None
+            ValueError: If prefix is None or mode is unknown
         """
         if prefix is None:
             raise ValueError('prefix cannot be None')
-        
-        # Query tags with count, filtered by prefix
-        # Using LEFT JOIN to include tags with 0 files
-        results = db.session.query(
-            Tag.id,
-            Tag.name,
-            func.count(FileTag.file_id).label('count')
-        ).outerjoin(
-            FileTag, Tag.id == FileTag.tag_id
-        ).filter(
-            Tag.name.ilike(f'{prefix}%')
-        ).group_by(
-            Tag.id, Tag.name
-        ).order_by(
-            func.count(FileTag.file_id).desc(),
-            Tag.name
-        ).limit(limit).all()
+        if mode not in ('prefix', 'substring'):
+            raise ValueError(f'Unknown search mode: {mode}')
         
         return [
-            TagWithCount(id=r.id, name=r.name, count=r.count)
-            for r in results
+            TagWithCount(id=tag_id, name=name, count=count)
+            for tag_id, name, count in tag_index.search(prefix, limit, mode=mode, case_sensitive=case_sensitive)
         ]
     
     @staticmethod
@@ -229,27 +394,232 @@ class TagService:
         """
         Get all tags with their usage counts, ordered by usage frequency.
         
+        Reads the maintained ``usage_count`` column in the order of the
+        idx_tags_usage_count_name index, without touching ``file_tags``.
+        
         Returns:
             List of TagWithCount objects ordered by count descending
         """
         results = db.session.query(
             Tag.id,
             Tag.name,
-            func.count(FileTag.file_id).label('count')
-        ).outerjoin(
-            FileTag, Tag.id == FileTag.tag_id
-        ).group_by(
-            Tag.id, Tag.name
+            Tag.usage_count
         ).order_by(
-            func.count(FileTag.file_id).desc(),
+            Tag.usage_count.desc(),
             Tag.name
         ).all()
         
         return [
-            TagWithCount(id=r.id, name=r.name, count=r.count)
+            TagWithCount(id=r.id, name=r.name, count=r.usage_count)
             for r in results
         ]
     
+    @staticmethod
+    def verify_usage_counts(repair: bool = False,
+                            on_mismatch: Optional[Callable[[int, str, int, int], None]] = None) -> Dict:
+        """
+        Compare every tag's ``usage_count`` with its rows in ``file_tags``
+        
+        Args:
+            repair: Set mismatched counts to the actual value (and commit)
+            on_mismatch: Called with (tag_id, name, stored, actual) for each mismatch
+        
+        Returns:
+            Summary with the number of tags checked, mismatched and repaired
+        """
+        actual_count = select(func.count()).select_from(FileTag).where(
+            FileTag.tag_id == Tag.id
+        ).scalar_subquery()
+        
+        rows = db.session.query(
+            Tag.id, Tag.name, Tag.usage_count, actual_count.label('actual')
+        ).order_by(Tag.id).all()
+        
+        mismatched = {}
+        for row in rows:
+            if row.usage_count != row.actual:
+                mismatched[row.id] = row.actual - row.usage_count
+                if on_mismatch is not None:
+                    on_mismatch(row.id, row.name, row.usage_count, row.actual)
+        
+        repaired = 0
+        if repair and mismatched:
+            # Recount in the UPDATE itself, so changes since the check are included
+            repaired = db.session.execute(
+                update(Tag).where(Tag.id.in_(mismatched)).values(
+                    usage_count=actual_count
+                ).execution_options(synchronize_session=False)
+            ).rowcount
+            TagService._stamp_after_commit(mismatched)
+            db.session.commit()
+            current_app.logger.warning(f'Repaired usage counts of {repaired} tags')
+        
+        return {
+            'checked': len(rows),
+            'mismatched': len(mismatched),
+            'repaired': repaired
+        }
+    
+    @staticmethod
+    def existing_file_ids(file_ids: Iterable[int]) -> set:
+        """IDs among ``file_ids`` that belong to existing files (one query)"""
+        file_ids = set(file_ids)
+        if not file_ids:
+            return set()
+        return {
+            row.id for row in db.session.query(File.id).filter(File.id.in_(file_ids))
+        }
+    
+    @staticmethod
+    def attach_tag(tag_id: int, file_ids: Iterable[int]) -> int:
+        """
+        Attach a tag to many files with one INSERT ... SELECT statement
+        
+        Only existing files are tagged and existing associations are skipped
+        (ON CONFLICT DO NOTHING, or NOT EXISTS on other databases). The
+        caller commits.
+        
+        Args:
+            tag_id: ID of the tag
+            file_ids: IDs of the files to tag
+        
+        Returns:
+            Number of associations inserted
+        """
+        return TagService.attach_tags([tag_id], file_ids)
+    
+    @staticmethod
+    def attach_tags(tag_ids: Iterable[int], file_ids: Iterable[int]) -> int:
+        """
+        Attach every tag in ``tag_ids`` to every file in ``file_ids`` with one
+        INSERT ... SELECT statement (see attach_tag; the caller commits)
+        
+        The statement returns the tag of each inserted row where the database
+        supports INSERT ... RETURNING; elsewhere it runs once per tag. Either
+        way the usage counts grow by exactly the rows inserted.
+        
+        Returns:
+            Number of associations inserted
+        """
+        tag_ids = set(tag_ids)
+        file_ids = set(file_ids)
+        if not tag_ids or not file_ids:
+            return 0
+        
+        def insert_pairs(attach_ids):
+            """INSERT ... SELECT of every (file, tag) pair for the given tags"""
+            # Every (file, tag) pair: an explicit cross join
+            rows = select(
+                File.id, Tag.id, literal(datetime.utcnow())
+            ).select_from(File).join(Tag, true()).where(
+                File.id.in_(file_ids),
+                Tag.id.in_(attach_ids)
+            )
+            columns = ['file_id', 'tag_id', 'created_at']
+            
+            dialect_name = db.session.get_bind().dialect.name
+            if dialect_name in ('postgresql', 'sqlite'):
+                if dialect_name == 'postgresql':
+                    from sqlalchemy.dialects.postgresql import insert as dialect_insert
+                else:
+                    from sqlalchemy.dialects.sqlite import insert as dialect_insert
+                return dialect_insert(FileTag).from_select(columns, rows).on_conflict_do_nothing(
+                    index_elements=['file_id', 'tag_id']
+                )
+            return insert(FileTag).from_select(columns, rows.where(~exists().where(
+                FileTag.file_id == File.id,
+                FileTag.tag_id == Tag.id
+            )))
+        
+        if db.session.get_bind().dialect.insert_returning:
+            inserted = Counter(db.session.scalars(insert_pairs(tag_ids).returning(FileTag.tag_id)))
+        else:
+            inserted = Counter({
+                tag_id: db.session.execute(insert_pairs([tag_id])).rowcount
+                for tag_id in tag_ids
+            })
+        inserted = +inserted
+        
+        TagService._tags_changed(inserted)
+        TagService._expire_file_tags(file_ids)
+        return sum(inserted.values())
+    
+    @staticmethod
+    def _expire_file_tags(file_ids: Iterable[int]) -> None:
+        """Expire loaded ``File.tags`` collections changed by set-based statements"""
+        file_ids = set(file_ids)
+        for obj in list(db.session.identity_map.values()):
+            if isinstance(obj, File) and obj.id in file_ids:
+                db.session.expire(obj, ['tags'])
+    
+    @staticmethod
+    def detach_tag(tag_id: int, file_ids: Iterable[int]) -> int:
+        """
+        Remove a tag from many files with one DELETE statement (the caller commits)
+        
+        Returns:
+            Number of associations removed
+        """
+        file_ids = set(file_ids)
+        if not file_ids:
+            return 0
+        
+        count = FileTag.query.filter(
+            FileTag.file_id.in_(file_ids),
+            FileTag.tag_id == tag_id
+        ).delete(synchronize_session=False)
+        if count:
+            TagService._tags_changed({tag_id: -count})
+        TagService._expire_file_tags(file_ids)
+        return count
+    
+    @staticmethod
+    def set_file_tags(file_ids: Iterable[int], names: Iterable[str], user_id: int,
+                      replace: bool = True, commit: bool = True) -> TagChanges:
+        """
+        Make the tags of many files match a list of names
+        
+        Names are resolved with get_or_create_tags, then one DELETE removes
+        tags not in the list (when ``replace``) and one INSERT ... SELECT adds
+        the missing associations. Other pending changes in the session are
+        not flushed, so callers can still validate them afterwards.
+        
+        Args:
+            file_ids: IDs of the files
+            names: Wanted tag names (trimmed; empty names are ignored)
+            user_id: User ID performing the operation
+            replace: Remove tags that are not in ``names`` (False = only add)
+            commit: Commit the changes (False = flush only)
+        
+        Returns:
+            TagChanges with the number of associations added and removed
+        """
+        file_ids = set(file_ids)
+        if not file_ids:
+            return TagChanges(added=0, removed=0)
+        
+        tag_ids = {tag.id for tag in TagService.get_or_create_tags(names, user_id, commit=False).values()}
+        
+        with db.session.no_autoflush:
+            removed = 0
+            if replace:
+                removed_by_tag = TagService._delete_file_tags(
+                    FileTag.file_id.in_(file_ids),
+                    FileTag.tag_id.notin_(tag_ids)
+                )
+                removed = sum(removed_by_tag.values())
+                TagService._tags_changed({tag_id: -count for tag_id, count in removed_by_tag.items()})
+            
+            added = TagService.attach_tags(tag_ids, file_ids)
+        
+        if commit:
+            db.session.commit()
+        
+        current_app.logger.info(
+            f'Set tags on {len(file_ids)} files: {added} added, {removed} removed'
+        )
+        return TagChanges(added=added, removed=removed)
+    
     @staticmethod
     def batch_add_tag(file_ids: List[int], tag_name: str, user_id: int) -> int:
         """
@@ -261,7 +631,8 @@ class TagService:
             user_id: User ID performing the operation
         
         Returns:
-            Number of files successfully tagged
+            Number of files newly tagged (missing files and files that
+            already had the tag are skipped)
         
         Raises:
             ValueError: If file_ids is empty or tag_name is invalid
@@ -274,24 +645,7 @@ class TagService:
         # Get or create the tag
         tag = TagService.get_or_create_tag(tag_name, user_id)
         
-        count = 0
-        for file_id in file_ids:
-            # Check if file exists
-            file = File.query.get(file_id)
-            if not file:
-                current_app.logger.warning(f'File not found for batch tag: {file_id}')
-                continue
-            
-            # Check if association already exists
-            existing = FileTag.query.filter_by(
-                file_id=file_id,
-                tag_id=tag.id
-            ).first()
-            
-            if not existing:
-                file_tag = FileTag(file_id=file_id, tag_id=tag.id)
-                db.session.add(file_tag)
-                count += 1
+        count = TagService.attach_tag(tag.id, file_ids)
         
         db.session.commit()
         current_app.logger.info(
@@ -319,11 +673,7 @@ class TagService:
         if not tag_id:
             raise ValueError('tag_id cannot be None')
         
-        # Delete all matching associations
-        result = FileTag.query.filter(
-            FileTag.file_id.in_(file_ids),
-            FileTag.tag_id == tag_id
-        ).delete(synchronize_session=False)
+        result = TagService.detach_tag(tag_id, file_ids)
         
         db.session.commit()
         current_app.logger.info(
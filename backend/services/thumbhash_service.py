@@ -0,0 +1,394 @@
+"""
+Thumbhash Service for LockCloud
+Generates ThumbHash blur placeholders for images and videos off the request
+path: uploads queue files on a bounded background executor with retries, and
+``flask backfill-thumbhash`` fills in files that are still missing one.
+
+Thumbhashes come from Bitiful's ``fmt=thumbhash`` endpoint, or for images
+from the local encoder (``services.thumbhash_encoder``) applied to a small
+rendition when THUMBHASH_LOCAL_ENCODE is enabled.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import bindparam, or_, update
+
+from extensions import db
+from services.background_executor import BackgroundExecutor
+from services.http_client import http_client
+from services.rate_limiter import TokenBucket
+from services.s3_service import s3_service
+from services import thumbhash_encoder
+
+
+# Per-process bounded executor for thumbhash generation after upload
+thumbhash_executor = BackgroundExecutor(
+    'thumbhash',
+    max_workers=4,
+    max_queue=1000,
+    config_prefix='THUMBHASH_EXECUTOR'
+)
+
+
+class ThumbhashService:
+    """Service class for thumbhash generation"""
+
+    @staticmethod
+    def is_media(content_type: Optional[str]) -> bool:
+        """Whether a thumbhash can be generated for the content type"""
+        return bool(content_type) and (content_type.startswith('image/') or content_type.startswith('video/'))
+
+    @staticmethod
+    def fetch(s3_key: str, content_type: str, timeout: float = 5) -> Optional[str]:
+        """
+        Fetch a ThumbHash from Bitiful's thumbhash service
+
+        Args:
+            s3_key: S3 object key
+            content_type: MIME type (images and videos only)
+            timeout: Request timeout in seconds
+
+        Returns:
+            ThumbHash string, or None if the file is not media
+
+        Raises:
+            Exception: If the request fails or Bitiful returns an error
+        """
+        if not ThumbhashService.is_media(content_type):
+            return None
+
+        bucket = s3_service.get_bucket_name()
+        # For video, use frame extraction; for image, direct thumbhash
+        thumbhash_url = f"https://{bucket}.s3.bitiful.net/{s3_key}?fmt=thumbhash"
+        if content_type.startswith('video/'):
+            thumbhash_url = f"https://{bucket}.s3.bitiful.net/{s3_key}?frame=100&fmt=thumbhash"
+
+        resp = http_client.get(thumbhash_url, timeout=timeout)
+        if resp.status_code != 200:
+            raise Exception(f'HTTP {resp.status_code}')
+
+        thumbhash = resp.text.strip()
+        if not thumbhash:
+            raise Exception('empty response')
+        return thumbhash
+
+    @staticmethod
+    def fetch_rendition(s3_key: str, timeout: float = 10) -> bytes:
+        """
+        Download a small styled rendition of an image for local encoding
+
+        Args:
+            s3_key: S3 object key
+            timeout: Request timeout in seconds
+
+        Returns:
+            Encoded image bytes
+
+        Raises:
+            Exception: If the request fails or Bitiful returns an error
+        """
+        bucket = s3_service.get_bucket_name()
+        params = current_app.config.get('THUMBHASH_RENDITION_PARAMS', 'w=100&cs=srgb')
+        resp = http_client.get(f"https://{bucket}.s3.bitiful.net/{s3_key}?{params}", timeout=timeout)
+        if resp.status_code != 200:
+            raise Exception(f'HTTP {resp.status_code}')
+        return resp.content
+
+    @staticmethod
+    def encodes_locally(content_type: Optional[str], local: Optional[bool] = None) -> bool:
+        """
+        Whether the file's thumbhash is computed with the local encoder
+
+        Args:
+            content_type: MIME type
+            local: Override for THUMBHASH_LOCAL_ENCODE
+        """
+        if local is None:
+            local = current_app.config.get('THUMBHASH_LOCAL_ENCODE', False)
+        return bool(local) and bool(content_type) and content_type.startswith('image/') \
+            and thumbhash_encoder.is_available()
+
+    @staticmethod
+    def _with_retry(fn: Callable, retries: int = 0, rate_limiter: Optional[TokenBucket] = None,
+                    should_stop: Optional[Callable[[], bool]] = None) -> Tuple[Optional[object], Optional[str]]:
+        """Call fn, retrying failures with exponential backoff; returns (value, error)"""
+        base = float(current_app.config.get('THUMBHASH_RETRY_BASE', 2))
+        error = None
+
+        for attempt in range(retries + 1):
+            if attempt:
+                if should_stop and should_stop():
+                    break
+                time.sleep(base * 2 ** (attempt - 1))
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            try:
+                return fn(), None
+            except Exception as e:
+                error = str(e)
+
+        return None, error
+
+    @staticmethod
+    def fetch_with_retry(s3_key: str, content_type: str, retries: int = 0,
+                         rate_limiter: Optional[TokenBucket] = None,
+                         should_stop: Optional[Callable[[], bool]] = None) -> Dict:
+        """
+        Fetch a thumbhash from Bitiful, retrying failures with exponential backoff
+
+        Does not touch the database, so it can run on any thread.
+
+        Args:
+            s3_key: S3 object key
+            content_type: MIME type
+            retries: Additional attempts after the first failure
+            rate_limiter: Optional shared token bucket (one token per request)
+            should_stop: Callable that aborts remaining retries when it returns True
+
+        Returns:
+            dict with thumbhash (or None) and error (or None)
+        """
+        thumbhash, error = ThumbhashService._with_retry(
+            lambda: ThumbhashService.fetch(s3_key, content_type),
+            retries=retries, rate_limiter=rate_limiter, should_stop=should_stop
+        )
+        return {'thumbhash': thumbhash, 'error': error}
+
+    @staticmethod
+    def encode_with_retry(s3_key: str, retries: int = 0,
+                          should_stop: Optional[Callable[[], bool]] = None) -> Dict:
+        """
+        Download an image rendition and encode its thumbhash locally
+
+        Args:
+            s3_key: S3 object key
+            retries: Additional download attempts after the first failure
+            should_stop: Callable that aborts remaining retries when it returns True
+
+        Returns:
+            dict with thumbhash (or None) and error (or None)
+        """
+        data, error = ThumbhashService._with_retry(
+            lambda: ThumbhashService.fetch_rendition(s3_key),
+            retries=retries, should_stop=should_stop
+        )
+        if error:
+            return {'thumbhash': None, 'error': error}
+        try:
+            return {'thumbhash': thumbhash_encoder.image_to_thumbhash(data), 'error': None}
+        except Exception as e:
+            return {'thumbhash': None, 'error': f'encode failed: {str(e)}'}
+
+    @staticmethod
+    def save_results(results: Dict[int, Dict]) -> int:
+        """
+        Store fetched thumbhashes and count failed attempts
+
+        Args:
+            results: file_id -> fetch_with_retry() result
+
+        Returns:
+            Number of files that got a thumbhash
+        """
+        from files.models import File
+
+        filled = [
+            {'file_id': file_id, 'file_thumbhash': result['thumbhash']}
+            for file_id, result in results.items() if result['thumbhash']
+        ]
+        failed_ids = [file_id for file_id, result in results.items() if not result['thumbhash']]
+
+        if filled:
+            # Plain executemany UPDATE: files deleted during the fetch are skipped
+            files = File.__table__
+            db.session.execute(
+                files.update()
+                .where(files.c.id == bindparam('file_id'))
+                .values(thumbhash=bindparam('file_thumbhash')),
+                filled
+            )
+        if failed_ids:
+            db.session.execute(
+                update(File)
+                .where(File.id.in_(failed_ids), File.thumbhash.is_(None))
+                .values(thumbhash_attempts=File.thumbhash_attempts + 1)
+            )
+        db.session.commit()
+        return len(filled)
+
+    @staticmethod
+    def _generate(file_id: int) -> None:
+        """Executor task: fetch and store the thumbhash of one file"""
+        from files.models import File
+
+        file = db.session.get(File, file_id)
+        if file is None or file.thumbhash is not None or not ThumbhashService.is_media(file.content_type):
+            return
+
+        s3_key = file.s3_key
+        content_type = file.content_type
+        # Release the pooled connection before the (retried) HTTP calls
+        db.session.remove()
+
+        retries = int(current_app.config.get('THUMBHASH_RETRIES', 3))
+        if ThumbhashService.encodes_locally(content_type):
+            result = ThumbhashService.encode_with_retry(
+                s3_key, retries=retries, should_stop=thumbhash_executor.is_stopping
+            )
+        else:
+            result = ThumbhashService.fetch_with_retry(
+                s3_key, content_type, retries=retries, should_stop=thumbhash_executor.is_stopping
+            )
+
+        try:
+            ThumbhashService.save_results({file_id: result})
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning(f'Failed to save thumbhash for {s3_key}: {str(e)}')
+            return
+
+        if result['thumbhash']:
+            current_app.logger.info(f'Got thumbhash for {s3_key}: {result["thumbhash"][:20]}...')
+        else:
+            current_app.logger.warning(f'Failed to get thumbhash for {s3_key}: {result["error"]}')
+
+    @staticmethod
+    def schedule(file_ids: Iterable[int]) -> int:
+        """
+        Queue thumbhash generation for uploaded files
+
+        Files rejected by a full queue keep a NULL thumbhash and are picked up
+        by ``flask backfill-thumbhash``.
+
+        Args:
+            file_ids: IDs of newly confirmed image/video files
+
+        Returns:
+            Number of files queued
+        """
+        queued = 0
+        for file_id in file_ids:
+            if thumbhash_executor.submit(file_id, ThumbhashService._generate, file_id):
+                queued += 1
+        return queued
+
+    @staticmethod
+    def missing_query(max_attempts: int = 0):
+        """
+        Query of media files without a thumbhash
+
+        Args:
+            max_attempts: Skip files that already failed this many times (0 = no limit)
+        """
+        from files.models import File
+
+        query = File.query.filter(
+            File.thumbhash.is_(None),
+            or_(File.content_type.like('image/%'), File.content_type.like('video/%'))
+        )
+        if max_attempts:
+            query = query.filter(File.thumbhash_attempts < max_attempts)
+        return query
+
+    @staticmethod
+    def backfill(batch_size: int = 200, concurrency: int = 8, rate: float = 10.0,
+                 max_attempts: int = 0, retries: int = 1, limit: int = 0,
+                 local: Optional[bool] = None, processes: int = 0,
+                 on_batch: Optional[Callable[[int, int], None]] = None) -> Dict:
+        """
+        Fill in missing thumbhashes in batches
+
+        Files are read with keyset pagination on id; each batch is fetched in
+        parallel on a thread pool (HTTP only) and written back with one bulk
+        UPDATE. With local encoding, image renditions are downloaded on the
+        thread pool and encoded on a process pool.
+
+        Args:
+            batch_size: Files per batch
+            concurrency: Parallel requests per batch
+            rate: Global request rate limit per second (0 = unlimited)
+            max_attempts: Skip files that already failed this many times (0 = no limit)
+            retries: Retries per file within this run
+            limit: Maximum number of files to process (0 = no limit)
+            local: Encode images locally (defaults to THUMBHASH_LOCAL_ENCODE)
+            processes: Encoder processes for local encoding (0 = CPU count)
+            on_batch: Callback(processed, filled) after each batch
+
+        Returns:
+            Summary with processed, filled, failed and elapsed
+        """
+        from files.models import File
+
+        if local is None:
+            local = current_app.config.get('THUMBHASH_LOCAL_ENCODE', False)
+        if local and not thumbhash_encoder.is_available():
+            raise RuntimeError('本地 thumbhash 编码需要安装 numpy 和 Pillow')
+
+        rate_limiter = TokenBucket(rate)
+        app = current_app._get_current_object()
+        started = time.monotonic()
+        summary = {'processed': 0, 'filled': 0, 'failed': 0}
+
+        def fetch(row):
+            with app.app_context():
+                if ThumbhashService.encodes_locally(row.content_type, local):
+                    data, error = ThumbhashService._with_retry(
+                        lambda: ThumbhashService.fetch_rendition(row.s3_key),
+                        retries=retries, rate_limiter=rate_limiter
+                    )
+                    return row.id, {'thumbhash': None, 'data': data, 'error': error}
+                return row.id, ThumbhashService.fetch_with_retry(
+                    row.s3_key, row.content_type, retries=retries, rate_limiter=rate_limiter
+                )
+
+        last_id = 0
+        encoder_pool = ProcessPoolExecutor(max_workers=processes or None) if local else None
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='thumbhash-backfill') as pool:
+                while True:
+                    size = batch_size
+                    if limit:
+                        size = min(size, limit - summary['processed'])
+                        if size <= 0:
+                            break
+
+                    rows: List = ThumbhashService.missing_query(max_attempts).filter(
+                        File.id > last_id
+                    ).order_by(File.id).with_entities(
+                        File.id, File.s3_key, File.content_type
+                    ).limit(size).all()
+                    if not rows:
+                        break
+                    last_id = rows[-1].id
+
+                    results = dict(pool.map(fetch, rows))
+
+                    # Encode downloaded renditions in worker processes
+                    pending = [(file_id, result) for file_id, result in results.items() if result.get('data')]
+                    if pending:
+                        encoded = thumbhash_encoder.encode_batch(
+                            [result.pop('data') for _, result in pending], pool=encoder_pool
+                        )
+                        for (file_id, result), thumbhash in zip(pending, encoded):
+                            result['thumbhash'] = thumbhash
+                            result['error'] = None if thumbhash else 'encode failed'
+
+                    filled = ThumbhashService.save_results(results)
+
+                    summary['processed'] += len(rows)
+                    summary['filled'] += filled
+                    summary['failed'] += len(rows) - filled
+                    if on_batch:
+                        on_batch(len(rows), filled)
+        finally:
+            if encoder_pool is not None:
+                encoder_pool.shutdown()
+
+        summary['elapsed'] = time.monotonic() - started
+        return summary
+
+
+# Global thumbhash service instance
+thumbhash_service = ThumbhashService()
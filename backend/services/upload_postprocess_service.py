@@ -0,0 +1,119 @@
+"""
+Upload Post-processing Service for LockCloud
+Side work after an upload is confirmed (S3 object tagging, thumbhash), run
+off the request path on bounded background executors so confirm requests
+never wait for an S3 write.
+"""
+import time
+from typing import Dict, Iterable, List
+
+from flask import current_app
+
+from extensions import db
+from services.background_executor import BackgroundExecutor
+from services.s3_service import s3_service
+from services.thumbhash_service import thumbhash_service
+
+
+# Per-process bounded executor for post-upload side work
+postprocess_executor = BackgroundExecutor(
+    'upload-postprocess',
+    max_workers=4,
+    max_queue=1000,
+    config_prefix='UPLOAD_POSTPROCESS_EXECUTOR'
+)
+
+
+class UploadPostprocessService:
+    """Service class for post-upload side work"""
+
+    @staticmethod
+    def build_tags(file, uploader_name: str) -> Dict[str, str]:
+        """
+        S3 tags for a confirmed file (same keys as the upload-url response)
+
+        Args:
+            file: File instance
+            uploader_name: Display name of the uploader
+
+        Returns:
+            Dictionary of tags
+        """
+        return {
+            'activity_date': file.activity_date.isoformat() if file.activity_date else '',
+            'activity_type': file.activity_type or '',
+            'activity_name': file.activity_name or '',
+            'uploader_name': uploader_name,
+            'upload_timestamp': file.uploaded_at.isoformat() + 'Z' if file.uploaded_at else '',
+            'original_filename': file.original_filename or ''
+        }
+
+    @staticmethod
+    def _tag_object(s3_key: str, tags: Dict[str, str]) -> None:
+        """Apply tags to one object, retrying transient failures with backoff"""
+        retries = int(current_app.config.get('UPLOAD_TAGGING_RETRIES', 2))
+
+        for attempt in range(retries + 1):
+            try:
+                s3_service.update_object_tags(s3_key, tags)
+                return
+            except Exception as e:
+                if attempt == retries or postprocess_executor.is_stopping():
+                    current_app.logger.warning(f'Failed to apply tags to {s3_key}: {str(e)}')
+                    return
+                time.sleep(2 ** attempt)
+
+    @staticmethod
+    def _process(file_ids: List[int]) -> None:
+        """Executor task: tag the S3 objects of a batch of files"""
+        from auth.models import User
+        from files.models import File
+
+        files = File.query.filter(File.id.in_(file_ids)).order_by(File.id).all()
+        uploader_ids = {file.uploader_id for file in files}
+        uploader_names = {
+            user.id: user.name
+            for user in User.query.filter(User.id.in_(uploader_ids)).all()
+        } if uploader_ids else {}
+
+        # 打标签期间不占用数据库连接
+        tags = [
+            (file.s3_key, UploadPostprocessService.build_tags(
+                file, uploader_names.get(file.uploader_id, str(file.uploader_id))
+            ))
+            for file in files
+        ]
+        db.session.remove()
+
+        for s3_key, file_tags in tags:
+            UploadPostprocessService._tag_object(s3_key, file_tags)
+
+    @staticmethod
+    def schedule(file_ids: Iterable[int]) -> int:
+        """
+        Queue post-upload side work for confirmed files
+
+        Tagging is queued in batches of UPLOAD_TAGGING_BATCH_SIZE files (one
+        database read per batch); thumbhash generation is queued per file on
+        the thumbhash executor.
+
+        Args:
+            file_ids: IDs of newly confirmed files
+
+        Returns:
+            Number of files queued for tagging
+        """
+        file_ids = sorted(file_ids)
+        thumbhash_service.schedule(file_ids)
+
+        batch_size = int(current_app.config.get('UPLOAD_TAGGING_BATCH_SIZE', 20))
+        queued = 0
+        for start in range(0, len(file_ids), batch_size):
+            batch = file_ids[start:start + batch_size]
+            if postprocess_executor.submit(('tag', batch[0], batch[-1]), UploadPostprocessService._process, batch):
+                queued += len(batch)
+        return queued
+
+
+# Global upload post-processing service instance
+upload_postprocess_service = UploadPostprocessService()
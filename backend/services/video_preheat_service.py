@@ -0,0 +1,267 @@
+"""
+Video Preheat Service for LockCloud
+Warms Bitiful's HLS transcode cache so the first viewer does not hit a cold transcode
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Optional
+
+from flask import current_app
+
+from services.background_executor import BackgroundExecutor
+from services.http_client import http_client
+from services.rate_limiter import TokenBucket
+
+
+# Per-process bounded executor for upload-time preheat
+preheat_executor = BackgroundExecutor(
+    'preheat',
+    max_workers=2,
+    max_queue=100,
+    config_prefix='PREHEAT_EXECUTOR'
+)
+
+
+class VideoPreheatService:
+    """Service class for HLS transcode preheat operations"""
+
+    MASTER_PLAYLIST = 'medium/auto_medium.m3u8'
+    QUALITY_PLAYLIST = 'medium/1080p_medium.m3u8'
+
+    @staticmethod
+    def parse_segments(m3u8_content: str) -> list:
+        """
+        Extract .ts segment references from a media playlist
+
+        Args:
+            m3u8_content: Playlist text
+
+        Returns:
+            List of segment paths relative to the playlist
+        """
+        segments = []
+        for line in m3u8_content.split('\n'):
+            line = line.strip()
+            if line and not line.startswith('#'):
+                # 这是一个分片引用
+                if line.endswith('.ts') or '.ts' in line:
+                    segments.append(line)
+        return segments
+
+    @staticmethod
+    def set_hls_state(file_id: int, state: str, only_if_not_ready: bool = False) -> None:
+        """
+        Record a video's HLS transcode readiness on its File row
+
+        Args:
+            file_id: File ID of the video
+            state: One of File.HLS_UNKNOWN/HLS_WARMING/HLS_READY/HLS_FAILED
+            only_if_not_ready: Leave videos already marked ready untouched
+                (a routine re-warm should not show a "processing" badge)
+        """
+        from sqlalchemy import or_, update
+        from extensions import db
+        from files.models import File
+
+        stmt = update(File).where(File.id == file_id)
+        if only_if_not_ready:
+            stmt = stmt.where(or_(File.hls_state.is_(None), File.hls_state != File.HLS_READY))
+
+        db.session.execute(
+            stmt.values(hls_state=state, hls_checked_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+    @staticmethod
+    def _warm_segment(s3_key: str, segment: str) -> Optional[str]:
+        """
+        Request the first byte of one 1080p segment so Bitiful transcodes it
+
+        Returns:
+            None on success, otherwise a short failure description
+        """
+        import requests
+        from services.s3_service import s3_service
+
+        try:
+            # 分片路径是相对于 1080p_medium.m3u8 的，需要加上目录前缀
+            segment_key = f"{s3_key}!style:medium/{segment}"
+            segment_url = s3_service.generate_signed_url(key=segment_key, expiration=600)
+
+            # 使用 Range 请求只获取前 1 字节，减少带宽消耗
+            seg_resp = http_client.get(
+                segment_url,
+                timeout=180,  # 单个分片转码可能需要较长时间
+                headers={'Range': 'bytes=0-0'}
+            )
+
+            if seg_resp.status_code in (200, 206):
+                return None
+            return f'failed: {seg_resp.status_code}'
+
+        except requests.Timeout:
+            return 'timeout'
+        except Exception as e:
+            return f'error: {str(e)}'
+
+    @staticmethod
+    def preheat_video(s3_key: str, verbose: bool = False, concurrency: int = 1,
+                      rate_limiter: Optional[TokenBucket] = None,
+                      deadline: Optional[float] = None, start_segment: int = 0,
+                      on_progress: Optional[Callable[[int, int], None]] = None) -> dict:
+        """
+        预热单个视频的 1080p 转码（全量预热所有 .ts 分片）
+
+        Args:
+            s3_key: S3 object key of the video
+            verbose: Print per-segment failures (CLI usage)
+            concurrency: Number of segments warmed in parallel
+            rate_limiter: Shared token bucket; one token per segment request
+            deadline: time.monotonic() value after which no new segment is started
+            start_segment: Skip segments before this index (resume a previous run)
+            on_progress: Called in the calling thread as on_progress(segments_done, segments_total)
+                whenever the contiguous prefix of attempted segments grows
+
+        Returns:
+            Result dictionary with success, message, segments_total, segments_ok,
+            segments_done, interrupted and elapsed
+        """
+        import requests
+        from services.s3_service import s3_service
+
+        started = time.monotonic()
+        result = {
+            's3_key': s3_key,
+            'success': False,
+            'message': '',
+            'segments_total': 0,
+            'segments_ok': 0,
+            'segments_done': start_segment,
+            'interrupted': None,
+            'elapsed': 0.0
+        }
+
+        try:
+            # 1. 请求主播放列表
+            hls_key = f"{s3_key}!style:{VideoPreheatService.MASTER_PLAYLIST}"
+            signed_url = s3_service.generate_signed_url(key=hls_key, expiration=300)
+
+            resp = http_client.get(signed_url, timeout=30)
+            if resp.status_code != 200:
+                result['message'] = f'Master playlist failed: {resp.status_code}'
+                return result
+
+            # 2. 请求 1080p 播放列表，获取分片列表
+            quality_key = f"{s3_key}!style:{VideoPreheatService.QUALITY_PLAYLIST}"
+            quality_url = s3_service.generate_signed_url(key=quality_key, expiration=600)
+            quality_resp = http_client.get(quality_url, timeout=120)
+
+            if quality_resp.status_code != 200:
+                result['message'] = f'1080p playlist failed: {quality_resp.status_code}'
+                return result
+
+            # 3. 解析 m3u8 获取所有 .ts 分片
+            segments = VideoPreheatService.parse_segments(quality_resp.text)
+            result['segments_total'] = len(segments)
+
+            if not segments:
+                result['success'] = True
+                result['message'] = 'No segments found (possibly already cached)'
+                return result
+
+            # 播放列表变短（重新转码）时从头开始
+            if start_segment >= len(segments):
+                start_segment = 0
+            pending = segments[start_segment:]
+
+            if verbose:
+                resumed = f' (resuming at {start_segment + 1})' if start_segment else ''
+                print(f'    Found {len(segments)} segments to preheat{resumed}')
+
+            # 4. 预热所有 .ts 分片（可并发，受全局令牌桶限速）
+            app = current_app._get_current_object()
+
+            def warm(index: int, segment: str) -> Optional[bool]:
+                """Returns True/False for an attempted segment, None if not started"""
+                if preheat_executor.is_stopping():
+                    result['interrupted'] = 'shutdown'
+                    return None
+                if deadline is not None and time.monotonic() >= deadline:
+                    result['interrupted'] = 'time limit'
+                    return None
+                if rate_limiter is not None and not rate_limiter.acquire(deadline=deadline):
+                    result['interrupted'] = 'time limit'
+                    return None
+
+                with app.app_context():
+                    error = VideoPreheatService._warm_segment(s3_key, segment)
+
+                if error is not None and verbose:
+                    print(f'    Segment {index+1}/{len(segments)} {error}')
+                return error is None
+
+            indexes = range(start_segment, len(segments))
+            segments_ok = 0
+            attempted = 0
+            prefix_open = True
+
+            def consume(outcomes):
+                # 按顺序消费结果，已尝试分片的连续前缀即为可恢复的进度
+                nonlocal segments_ok, attempted, prefix_open
+                for index, outcome in zip(indexes, outcomes):
+                    if outcome is None:
+                        prefix_open = False
+                        continue
+                    attempted += 1
+                    segments_ok += int(outcome)
+                    if prefix_open:
+                        result['segments_done'] = index + 1
+                        if on_progress is not None:
+                            on_progress(index + 1, len(segments))
+
+            if concurrency <= 1:
+                def serial():
+                    for index, segment in zip(indexes, pending):
+                        outcome = warm(index, segment)
+                        yield outcome
+                        if outcome is None:
+                            return
+                consume(serial())
+            else:
+                with ThreadPoolExecutor(
+                    max_workers=concurrency,
+                    thread_name_prefix='lockcloud-preheat-segment'
+                ) as pool:
+                    consume(pool.map(warm, indexes, pending))
+
+            result['segments_ok'] = segments_ok
+
+            if result['interrupted']:
+                result['success'] = segments_ok > 0
+                result['message'] = (
+                    f'Interrupted by {result["interrupted"]} after '
+                    f'{result["segments_done"]}/{len(segments)} segments ({segments_ok} ok)'
+                )
+            elif segments_ok == attempted:
+                result['success'] = True
+                result['message'] = f'All {segments_ok} segments preheated'
+            elif segments_ok > 0:
+                result['success'] = True  # 部分成功也算成功
+                result['message'] = f'{segments_ok}/{attempted} segments preheated'
+            else:
+                result['message'] = f'All {attempted} segments failed'
+
+        except requests.Timeout:
+            result['message'] = 'Timeout'
+        except Exception as e:
+            result['message'] = str(e)
+        finally:
+            result['elapsed'] = round(time.monotonic() - started, 3)
+
+        return result
+
+
+# Global video preheat service instance
+video_preheat_service = VideoPreheatService()
@@ -66,13 +66,15 @@ def list_tags():
 @jwt_required()
 def search_tags():
     """
-    Search tags by prefix
+    Search tags by prefix (or substring), answered from the in-memory tag index
     
-    GET /api/tags/search?q=prefix&limit=10
+    GET /api/tags/search?q=prefix&limit=10&mode=prefix&case_sensitive=false
     Headers: Authorization: Bearer <token>
     Query Parameters:
-        - q: Search prefix (required)
+        - q: Search text (required)
         - limit: Maximum results (default: 10, max: 50)
+        - mode: 'prefix' (default) or 'substring'
+        - case_sensitive: 'true' to match case exactly (default: false)
     
     Returns:
         200: Search results retrieved successfully
@@ -102,7 +104,17 @@ def search_tags():
         if limit > 50:
             limit = 50
         
-        tags = tag_service.search_tags(prefix, limit)
+        mode = request.args.get('mode', 'prefix')
+        if mode not in ('prefix', 'substring'):
+            return jsonify({
+                'error': {
+                    'code': 'VALIDATION_001',
+                    'message': '搜索模式无效，可选: prefix, substring'
+                }
+            }), 400
+        case_sensitive = request.args.get('case_sensitive', 'false').lower() == 'true'
+        
+        tags = tag_service.search_tags(prefix, limit, mode=mode, case_sensitive=case_sensitive)
         
         current_app.logger.info(
             f'User {current_user_id} searched tags with prefix "{prefix}", found {len(tags)} results'
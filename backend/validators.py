@@ -390,15 +390,14 @@ def validate_activity_type(field_name='activity_type'):
                 raise InvalidActivityTypeError('活动类型不能为空')
             
             # Validate activity type is in preset list
-            presets = TagPresetService.get_active_presets('activity_type')
-            valid_values = [preset.value for preset in presets]
+            valid_values = TagPresetService.get_display_names('activity_type')
             
             if activity_type not in valid_values:
                 raise InvalidActivityTypeError(
                     f'活动类型无效，请从预设列表中选择',
                     details={
                         'provided': activity_type,
-                        'valid_options': valid_values
+                        'valid_options': list(valid_values)
                     }
                 )
             
@@ -443,15 +442,14 @@ def validate_instructor(field_name='instructor'):
                 raise InvalidInstructorError('带训老师不能为空')
             
             # Validate instructor is in preset list
-            presets = TagPresetService.get_active_presets('instructor')
-            valid_values = [preset.value for preset in presets]
+            valid_values = TagPresetService.get_display_names('instructor')
             
             if instructor not in valid_values:
                 raise InvalidInstructorError(
                     f'带训老师标签无效，请从预设列表中选择',
                     details={
                         'provided': instructor,
-                        'valid_options': valid_values
+                        'valid_options': list(valid_values)
                     }
                 )
             